@@ -35,6 +35,73 @@ class Settings(BaseSettings):
     ]
     UPLOAD_DIR: str = "/app/bills"
     
+    # CPU executor for blocking receipt extraction/OCR ("process" or "thread")
+    CPU_EXECUTOR: str = os.getenv("CPU_EXECUTOR", "process")
+    CPU_EXECUTOR_WORKERS: int = int(os.getenv("CPU_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+    CPU_EXECUTOR_MAX_QUEUE: int = int(os.getenv("CPU_EXECUTOR_MAX_QUEUE", "32"))
+    CPU_TASK_TIMEOUT_SECONDS: float = float(os.getenv("CPU_TASK_TIMEOUT_SECONDS", "60"))
+    # Second, small worker pool for cheap text-layer parsing (PDF text, xlsx, docx) so it
+    # never queues behind OCR; OCR stays on the executor
+    CPU_LIGHT_WORKERS: int = int(os.getenv("CPU_LIGHT_WORKERS", "2"))
+    
+    # OCR preprocessing for photographed receipts (downscale, binarize, deskew, crop)
+    OCR_TARGET_DPI: int = int(os.getenv("OCR_TARGET_DPI", "300"))
+    OCR_MAX_IMAGE_SIDE: int = int(os.getenv("OCR_MAX_IMAGE_SIDE", "2400"))
+    OCR_DESKEW_MAX_ANGLE: float = float(os.getenv("OCR_DESKEW_MAX_ANGLE", "10"))
+    OCR_TESSERACT_PSM: int = int(os.getenv("OCR_TESSERACT_PSM", "4"))
+    
+    # OCR worker pool, per process (warm tesserocr engines when installed, else the tesseract CLI).
+    # 0 splits the cores across the CPU executor's processes (see OCRPool.size), so
+    # CPU_EXECUTOR_WORKERS x OCR_POOL_WORKERS engines is the ceiling for the whole executor
+    OCR_POOL_WORKERS: int = int(os.getenv("OCR_POOL_WORKERS", "0"))
+    OCR_POOL_MAX_QUEUE: int = int(os.getenv("OCR_POOL_MAX_QUEUE", "16"))
+    OCR_POOL_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("OCR_POOL_QUEUE_TIMEOUT_SECONDS", "10"))
+    OCR_WORKER_MAX_JOBS: int = int(os.getenv("OCR_WORKER_MAX_JOBS", "200"))
+    OCR_LANGUAGE: str = os.getenv("OCR_LANGUAGE", "eng")
+    # Scanned PDFs: pages OCR'd (last page first) before giving up on the rest
+    OCR_PDF_MAX_PAGES: int = int(os.getenv("OCR_PDF_MAX_PAGES", "10"))
+    
+    # Adaptive OCR: a fast low-resolution pass first, then higher resolutions (and for
+    # images a faint-print enhancement) only while word confidence is below
+    # OCR_MIN_CONFIDENCE or no currency-tagged total was read
+    OCR_MIN_CONFIDENCE: float = float(os.getenv("OCR_MIN_CONFIDENCE", "70"))
+    OCR_IMAGE_SIDE_LEVELS: str = os.getenv("OCR_IMAGE_SIDE_LEVELS", "1600,2400")
+    OCR_PDF_DPI_LEVELS: str = os.getenv("OCR_PDF_DPI_LEVELS", "100,200,300")
+    
+    # Near-duplicate receipt text across all employees: estimated Jaccard similarity
+    # of MinHash signatures (a few OCR characters read differently stay above 0.8).
+    # Different bills on one vendor template can score as high (two guests' invoices
+    # from one hotel share its terms and address), so another employee's match is
+    # only a duplicate when amount and date agree as well; otherwise it goes to review
+    NEAR_DUPLICATE_TEXT_THRESHOLD: float = float(os.getenv("NEAR_DUPLICATE_TEXT_THRESHOLD", "0.8"))
+    # Re-photographed receipts: most bits (of 64) in which two image dHashes may differ
+    NEAR_DUPLICATE_IMAGE_DISTANCE: int = int(os.getenv("NEAR_DUPLICATE_IMAGE_DISTANCE", "6"))
+    
+    # Early duplicate gate: Bloom filter of stored receipt SHA-256 hashes in front of
+    # the indexed lookup (capacity/error rate size the filter; it grows less accurate,
+    # not incorrect, past capacity) and how often it catches up on other workers' saves
+    RECEIPT_HASH_BLOOM_CAPACITY: int = int(os.getenv("RECEIPT_HASH_BLOOM_CAPACITY", "1000000"))
+    RECEIPT_HASH_BLOOM_ERROR_RATE: float = float(os.getenv("RECEIPT_HASH_BLOOM_ERROR_RATE", "0.01"))
+    RECEIPT_HASH_REFRESH_SECONDS: float = float(os.getenv("RECEIPT_HASH_REFRESH_SECONDS", "5"))
+    # Client-side hash precheck (GET/HEAD /api/receipts/by-hash/{sha256}): requests per user per window
+    RECEIPT_PRECHECK_RATE_LIMIT: int = int(os.getenv("RECEIPT_PRECHECK_RATE_LIMIT", "30"))
+    RECEIPT_PRECHECK_RATE_WINDOW_SECONDS: float = float(os.getenv("RECEIPT_PRECHECK_RATE_WINDOW_SECONDS", "60"))
+    
+    # Extraction result cache (in-process LRU in front of the receipt_extractions table)
+    EXTRACTION_CACHE_LRU_SIZE: int = int(os.getenv("EXTRACTION_CACHE_LRU_SIZE", "256"))
+    
+    # Pipeline latency metrics (recent samples kept per stage and file type)
+    PIPELINE_METRICS_SAMPLES: int = int(os.getenv("PIPELINE_METRICS_SAMPLES", "1000"))
+    
+    # Asynchronous submission (opt-in per request via async_mode)
+    SUBMIT_ASYNC_WORKERS: int = int(os.getenv("SUBMIT_ASYNC_WORKERS", "4"))
+    SUBMIT_ASYNC_MAX_PENDING: int = int(os.getenv("SUBMIT_ASYNC_MAX_PENDING", "100"))
+    SUBMIT_JOB_TTL_SECONDS: int = int(os.getenv("SUBMIT_JOB_TTL_SECONDS", "3600"))
+    
+    # Batch submission (trip reports)
+    SUBMIT_BATCH_MAX_ITEMS: int = int(os.getenv("SUBMIT_BATCH_MAX_ITEMS", "30"))
+    SUBMIT_BATCH_CONCURRENCY: int = int(os.getenv("SUBMIT_BATCH_CONCURRENCY", "4"))
+    
     # Application
     APP_NAME: str = "Expense Reimbursement System"
     DEBUG: bool = os.getenv("DEBUG", "False") == "True"
@@ -1,12 +1,16 @@
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
-from app.database import get_db, SessionLocal
-from app.models import Base, User, Role, EmployeeGrade, ExpenseCategory, TransportationType, Notification
-from app.routes import auth, expense, approval, analytics, finance, notification
+from app.database import get_db, SessionLocal, Base, engine
+from app.models import User, Role, EmployeeGrade, ExpenseCategory, TransportationType, Notification
+from app.routes import auth, expense, approval, analytics, finance, notification, admin, receipt
 from app.config import settings
 from app.utils.security import hash_password
+from app.services.minhash_index_service import MinHashIndexService
+from app.services.image_hash_index_service import ImageHashIndexService
+from app.services.receipt_hash_gate_service import ReceiptHashGateService
+from app.utils.cpu_executor import CPUExecutor
 import logging
 import os
 
@@ -14,9 +18,40 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns added to existing tables by the duplicate-detection indexes (init.sql has
+# them for new databases; create_all does not alter tables that already exist)
+ADDED_COLUMNS = [
+    ("expenses", "text_minhash", "BLOB"),
+    ("expense_attachments", "image_hash", "VARCHAR(16)"),
+]
+
+def add_duplicate_detection_columns():
+    """Add ADDED_COLUMNS to a database created before them"""
+    try:
+        inspector = inspect(engine)
+    except Exception as e:
+        logger.error(f"Could not inspect the schema for new columns: {e}")
+        return
+    for table_name, column_name, column_type in ADDED_COLUMNS:
+        try:
+            if not inspector.has_table(table_name):
+                continue
+            if column_name in {column["name"] for column in inspector.get_columns(table_name)}:
+                continue
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+            logger.info(f"Added column {table_name}.{column_name}")
+        except Exception as e:
+            logger.error(f"Could not add column {table_name}.{column_name}: {e}")
+
 # Create tables at startup
 try:
     Base.metadata.create_all(bind=engine)
+    add_duplicate_detection_columns()
+    # create_all skips tables that already exist; add indexes declared since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 except Exception as e:
     # Silently fail if database isn't ready yet
     pass
@@ -175,6 +210,23 @@ app = FastAPI(
 async def startup_event():
     """Initialize database on startup"""
     init_db()
+    try:
+        MinHashIndexService.rebuild()
+    except Exception as e:
+        logger.error(f"Could not build the near-duplicate text index: {e}")
+    try:
+        ImageHashIndexService.rebuild()
+    except Exception as e:
+        logger.error(f"Could not build the receipt image hash index: {e}")
+    try:
+        ReceiptHashGateService.rebuild()
+    except Exception as e:
+        logger.error(f"Could not build the duplicate receipt filter: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop receipt-processing worker processes"""
+    CPUExecutor.shutdown()
 
 # Add CORS middleware
 app.add_middleware(
@@ -192,6 +244,8 @@ app.include_router(approval.router)
 app.include_router(analytics.router)
 app.include_router(finance.router)
 app.include_router(notification.router)
+app.include_router(admin.router)
+app.include_router(receipt.router)
 
 @app.get("/")
 async def root():
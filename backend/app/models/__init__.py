@@ -3,6 +3,7 @@ from app.models.expense import Expense, ExpenseAttachment, ExpenseCategory, Tran
 from app.models.approval import ExpenseApproval
 from app.models.audit import AuditLog
 from app.models.notification import Notification
+from app.models.receipt_extraction import ReceiptExtraction
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -18,5 +19,6 @@ __all__ = [
     "TransportationType",
     "ExpenseApproval",
     "AuditLog",
-    "Notification"
+    "Notification",
+    "ReceiptExtraction"
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, ForeignKey, DECIMAL, Text, Date, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, ForeignKey, DECIMAL, Text, Date, JSON, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -38,6 +38,11 @@ class TransportationType(Base):
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Duplicate-bill candidates: a user's expenses in a date window and amount band
+        Index("idx_expenses_user_date_amount", "user_id", "expense_date", "amount"),
+        Index("idx_expenses_text_hash", "extracted_text_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -55,6 +60,7 @@ class Expense(Base):
     # AI Cross-checking fields
     file_hash = Column(String(64), nullable=True)  # For duplicate detection
     extracted_text_hash = Column(String(32), nullable=True)  # For text similarity
+    text_minhash = Column(LargeBinary(512), nullable=True)  # MinHash signature of the receipt text (near duplicates)
     validation_score = Column(DECIMAL(5, 2), nullable=True)  # AI confidence score
     is_ai_validated = Column(Boolean, default=False)  # AI approval status
     risk_factors = Column(Text, nullable=True)  # JSON string of risk factors
@@ -71,6 +77,9 @@ class Expense(Base):
 
 class ExpenseAttachment(Base):
     __tablename__ = "expense_attachments"
+    __table_args__ = (
+        Index("idx_attachments_file_hash", "file_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False)
@@ -79,6 +88,7 @@ class ExpenseAttachment(Base):
     file_path = Column(Text, nullable=False)
     file_type = Column(String(50), nullable=False)
     file_hash = Column(String(64), nullable=True)  # For duplicate file detection
+    image_hash = Column(String(16), nullable=True)  # Perceptual dHash (re-photographed receipts)
     file_size = Column(Integer, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     
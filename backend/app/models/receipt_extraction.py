@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, DECIMAL, LargeBinary, JSON, UniqueConstraint
+from app.database import Base
+from datetime import datetime
+
+class ReceiptExtraction(Base):
+    """Cached extraction result for a receipt file, keyed by file hash and extractor version"""
+    __tablename__ = "receipt_extractions"
+    __table_args__ = (
+        UniqueConstraint("file_hash", "extractor_version", name="uq_receipt_extraction_hash_version"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of the receipt file
+    extractor_version = Column(String(20), nullable=False)
+    file_type = Column(String(50), nullable=False)
+    
+    # zlib-compressed JSON of the parsed ReceiptDocument (pages, tables, candidates...)
+    payload = Column(LargeBinary(16 * 1024 * 1024), nullable=False)  # MEDIUMBLOB on MySQL
+    
+    # Summary columns for inspection without decompressing the payload
+    amount = Column(DECIMAL(10, 2), nullable=True)
+    confidence = Column(String(20), nullable=True)
+    date_strings = Column(JSON, nullable=True)
+    text_length = Column(Integer, nullable=True)
+    ocr_used = Column(Boolean, default=False)
+    extraction_ms = Column(Integer, nullable=True)  # Time the original extraction took
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
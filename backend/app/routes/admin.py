@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.models.user import User, RoleEnum
+from app.utils.dependencies import get_current_user
+from app.utils.stage_metrics import StageMetrics
+from app.utils.cpu_executor import CPUExecutor
+from app.services.receipt_hash_gate_service import ReceiptHashGateService
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+def _require_admin(current_user: User):
+    if not current_user.role or current_user.role.role_name != RoleEnum.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only Admin users can access pipeline metrics"
+        )
+
+@router.get("/metrics/pipeline")
+async def get_pipeline_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Latency of each submission pipeline stage (upload, precheck, extraction, llm, validation,
+    cross_check, policy, db_write, notification, total) as p50/p95/p99 in milliseconds,
+    broken down by file type. Extraction labels also show OCR use and cache hits
+    (e.g. "jpg/ocr", "pdf/cached"); LLM calls cancelled by a deterministic rejection
+    are reported as "<type>/cancelled".
+    """
+    _require_admin(current_user)
+    metrics = StageMetrics.snapshot()
+    metrics["cpu_executor"] = CPUExecutor.stats()
+    metrics["receipt_hash_gate"] = ReceiptHashGateService.stats()
+    return metrics
+
+@router.delete("/metrics/pipeline")
+async def reset_pipeline_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    """Clear the collected pipeline latency samples"""
+    _require_admin(current_user)
+    StageMetrics.reset()
+    return {"message": "Pipeline metrics reset"}
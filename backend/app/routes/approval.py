@@ -409,8 +409,11 @@ async def analyze_bill_with_ai(
 ):
     """Analyze expense bill for genuineness using Llama AI"""
     import logging
+    import os
     from app.services.bill_analysis_service import BillAnalysisService
     from app.utils.file_handler import FileHandler
+    from app.services.extraction_cache_service import ExtractionCacheService
+    from app.utils.receipt_backends import ReceiptBackends
     
     logger = logging.getLogger(__name__)
     
@@ -436,11 +439,15 @@ async def analyze_bill_with_ai(
         extracted_text = ""
         if expense.attachments:
             attachment = expense.attachments[0]
-            file_path = attachment.file_path
+            file_path = FileHandler.get_full_path(attachment.file_path)
+            # Sniffed from the content at upload (older attachments are sniffed now)
+            file_type = ReceiptBackends.resolve(file_path, attachment.file_type)
             
-            # Try to extract text from PDF or image
+            # Try to extract text from the receipt (cached after the first extraction)
             try:
-                extracted_text = FileHandler.extract_text_from_file(file_path)
+                if os.path.exists(file_path):
+                    document = await ExtractionCacheService.get_document(file_path, file_type, attachment.file_hash)
+                    extracted_text = document.text
                 logger.info(f"[AI-ANALYZE] Extracted {len(extracted_text)} characters from receipt")
             except Exception as e:
                 logger.warning(f"[AI-ANALYZE] Could not extract text: {str(e)}")
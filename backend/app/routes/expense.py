@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas.expense import (
@@ -6,27 +8,29 @@ from app.schemas.expense import (
     ExpenseDetailResponse, ExpenseWithAttachments
 )
 from app.services.expense_service import ExpenseService
-from app.services.approval_service import ApprovalService
-from app.services.notification_service import NotificationService
+from app.services.expense_submission_service import ExpenseSubmissionService
+from app.services.submission_job_service import SubmissionJobService
 from app.utils.file_handler import FileHandler
+from app.utils.receipt_backends import ReceiptBackends
 from app.utils.receipt_extractor import ReceiptExtractor
 from app.utils.improved_receipt_extractor import ImprovedReceiptExtractor
 from app.services.receipt_validation_service import ReceiptValidationService
-from app.services.expense_cross_check_service import ExpenseCrossCheckService
-from app.services.llm_receipt_agent import LLMReceiptAgent
 from app.services.policy_service import PolicyService
+from app.services.extraction_cache_service import ExtractionCacheService
 from app.utils.audit_logger import AuditLogger
+from app.utils.stage_metrics import StageMetrics
 from app.utils.dependencies import get_current_user
 from app.models.expense import Expense, ExpenseAttachment
 from app.models.user import User
+from app.config import settings
 from typing import List
 from datetime import datetime
 import os
 from decimal import Decimal
 import os
-import tempfile
 import logging
-import hashlib
+import asyncio
+import json
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +90,7 @@ async def submit_expense(
     date: str = Form(...),
     amount: str = Form(None),
     receipt: UploadFile = File(None),
+    async_mode: bool = Form(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -97,408 +102,179 @@ async def submit_expense(
         date: Date when the expense was incurred (YYYY-MM-DD format)
         amount: Amount in INR (optional if receipt is provided - will be extracted from receipt)
         receipt: Receipt file (optional if amount is provided)
+        async_mode: If true, return 202 with a job id and process the receipt in the background
+                    (poll GET /api/expenses/jobs/{job_id} for progress and the final result)
     """
+    upload = None
     try:
-        print(f"Received: category={category}, description={description}, date={date}, amount={amount}, receipt={receipt}")
+        print(f"Received: category={category}, description={description}, date={date}, amount={amount}, receipt={receipt}, async_mode={async_mode}")
         
-        # Validate required fields
-        if not category or not description or not date:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Missing required fields. Got: category={category}, description={description}, date={date}"
-            )
-        
-        # Amount validation: required if no receipt, optional if receipt provided
-        if not amount and not receipt:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Amount is required when no receipt is provided"
-            )
-        
-        # Map category name to category_id (aligns with frontend categoryMap)
-        # Strip whitespace from category name for robustness
-        category = category.strip() if category else ""
-        
-        category_map = {
-            'Travel': 1,
-            'Food': 2,
-            'Food & Meals': 2,  # Alternative name
-            'Accommodation': 3,
-            'Office Supplies': 4,
-            'Communication': 5,
-            'Miscellaneous': 6,
-            'Equipment': 7,
-            'Meals': 8,
-            'Meals & Drinks': 8,  # Alternative name
-            'Other': 9,
-            'Fuel': 10,
-        }
-        
-        category_id = category_map.get(category)
-        if not category_id:
-            # Log available categories for debugging
-            print(f"[DEBUG] Invalid category received: '{category}'")
-            print(f"[DEBUG] Available categories: {list(category_map.keys())}")
-            print(f"[DEBUG] Category length: {len(category)}, repr: {repr(category)}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid category: {category}. Valid options are: {', '.join(category_map.keys())}"
-            )
-        
-        # Handle amount:
-        # - If amount is provided, use it
-        # - If receipt is provided but no amount, try to extract from receipt
-        # - If extraction fails, use 0 as placeholder and let user update manually
-        # - If neither amount nor receipt, error (already validated above)
-        extracted_amount = None
-        extraction_note = ""
-        extraction_confidence = "none"
-        
-        parsed_amount = None
-        if amount is not None and str(amount).strip() != "":
-            try:
-                parsed_amount = float(amount)
-            except (ValueError, TypeError):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid amount provided"
-                )
-
-        if parsed_amount is not None and parsed_amount > 0:
-            amount_value = parsed_amount
-        else:
-            # Receipt is provided (or amount is 0/blank) - try to extract amount from it
-            if receipt and receipt.filename:
-                try:
-                    # Save receipt temporarily to extract amount
-                    file_extension = receipt.filename.split('.')[-1].lower()
-                    
-                    # Create temp file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_extension}") as tmp_file:
-                        content = await receipt.read()
-                        tmp_file.write(content)
-                        tmp_path = tmp_file.name
-                        await receipt.seek(0)  # Reset file pointer for later use
-                    
-                    # Try to extract amount using improved extractor
-                    extracted_amount, confidence, extraction_note = ImprovedReceiptExtractor.extract_amount(tmp_path, file_extension)
-                    extraction_confidence = confidence
-                    
-                    # Perform receipt validation
-                    validation_service = ReceiptValidationService()
-                    
-                    # Get full text for validation
-                    if file_extension == 'pdf':
-                        try:
-                            import pdfplumber
-                            with pdfplumber.open(tmp_path) as pdf:
-                                full_text = ""
-                                for page in pdf.pages:
-                                    full_text += (page.extract_text() or "") + "\n"
-                        except:
-                            full_text = extraction_note
-                    elif file_extension in ['docx', 'doc']:
-                        try:
-                            from docx import Document
-                            doc = Document(tmp_path)
-                            full_text = ""
-                            for paragraph in doc.paragraphs:
-                                full_text += paragraph.text + " "
-                            for table in doc.tables:
-                                for row in table.rows:
-                                    for cell in row.cells:
-                                        full_text += cell.text + " "
-                        except:
-                            full_text = extraction_note
-                    else:
-                        full_text = extraction_note
-
-                    # LLM agent validation (free local Ollama if enabled)
-                    llm_result = await LLMReceiptAgent.evaluate_receipt(
-                        extracted_text=full_text,
-                        amount=float(extracted_amount or 0),
-                        category=category,
-                        description=description,
-                        expense_date=date,
-                    )
-                    print(f"[LLM] decision={llm_result.get('decision')} risk={llm_result.get('risk_level')} reasons={llm_result.get('reasons')}")
-
-                    # Hard gate: block on explicit block, and block on review if strict mode
-                    from app.config import settings
-                    if llm_result.get('decision') == 'block' or (settings.OLLAMA_STRICT and llm_result.get('decision') == 'review'):
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail={
-                                "error": "Receipt rejected by AI",
-                                "ai": llm_result,
-                            }
-                        )
-                    
-                    # Validate receipt genuineness
-                    validation_results = validation_service.validate_receipt(
-                        tmp_path, full_text, extracted_amount or 0
-                    )
-                    
-                    print(f"[VALIDATION] {validation_service.get_validation_summary(validation_results)}")
-                    
-                    # Perform AI cross-checking
-                    cross_check_service = ExpenseCrossCheckService()
-                    cross_check_results = cross_check_service.cross_check_expense(
-                        file_path=tmp_path,
-                        extracted_text=full_text,
-                        amount=extracted_amount or 0,
-                        category=category,
-                        description=description,
-                        date=date,
-                        user_id=current_user.id,
-                        db=db
-                    )
-                    
-                    print(f"[CROSS-CHECK] {cross_check_service.get_validation_summary(cross_check_results)}")
-                    
-                    # Combine validation results
-                    overall_confidence = (validation_results['confidence_score'] + cross_check_results['confidence_score']) / 2
-                    is_approved = validation_results['is_genuine'] and cross_check_results['is_approved']
-                    
-                    # Combine risk factors and recommendations
-                    all_risk_factors = validation_results['risk_factors'] + cross_check_results['risk_factors']
-                    all_recommendations = validation_results['recommendations'] + cross_check_results['recommendations']
-                    
-                    # If cross-check fails, reject the submission
-                    if not cross_check_results['is_approved']:
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail={
-                                "error": "Expense validation failed",
-                                "message": f"AI cross-check detected issues: {cross_check_service.get_validation_summary(cross_check_results)}",
-                                "risk_factors": all_risk_factors,
-                                "recommendations": all_recommendations,
-                                "confidence_score": overall_confidence
-                            }
-                        )
-                    
-                    # Clean up temp file
-                    if os.path.exists(tmp_path):
-                        os.remove(tmp_path)
-                    
-                    # Prepare AI validation data
-                    ai_validation_data = {
-                        'file_hash': cross_check_results.get('file_hash', ''),
-                        'extracted_text_hash': cross_check_results.get('text_hash', ''),
-                        'validation_score': overall_confidence,
-                        'is_ai_validated': cross_check_results['is_approved'],
-                        'risk_factors': cross_check_results['risk_factors'][:500],  # Limit length
-                        'validation_timestamp': datetime.now().isoformat()
-                    }
-                    
-                    if extracted_amount and extracted_amount > 0:
-                        amount_value = extracted_amount
-                        print(f"[SUCCESS] Extracted amount ₹{extracted_amount:.2f} from receipt ({confidence} confidence): {extraction_note}")
-                    else:
-                        # Extraction failed or returned 0 - use placeholder 0, user will update manually
-                        amount_value = 0
-                        print(f"[INFO] Could not extract amount from receipt: {extraction_note}. Using 0 as placeholder.")
-
-                except HTTPException:
-                    # Do not swallow validation failures (duplicate/fraud/etc)
-                    raise
-                except Exception as extract_err:
-                    # If extraction fails, use placeholder amount 0
-                    print(f"[ERROR] Receipt extraction error: {extract_err}")
-                    amount_value = 0
-            else:
-                # No receipt and no amount - should not reach here (validation above)
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Amount is required when no receipt is provided"
-                )
-        
-        expense_data = ExpenseCreate(
-            amount=amount_value,
-            category_id=category_id,
+        has_receipt = bool(receipt and receipt.filename)
+        category, category_id, parsed_amount = ExpenseSubmissionService.validate_submission(
+            category=category,
             description=description,
-            expense_date=date  # This is the date the expense was incurred
+            date=date,
+            amount=amount,
+            has_receipt=has_receipt
         )
         
-        # Policy Enforcement Check
-        try:
-            expense_date_obj = datetime.strptime(date, '%Y-%m-%d').date()
-        except ValueError:
+        if async_mode and SubmissionJobService.is_full():
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid date format. Use YYYY-MM-DD"
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many submissions are being processed. Please retry shortly."
             )
-
-        today = datetime.utcnow().date()
-        if expense_date_obj > today:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Expense date cannot be in the future"
+        
+        # Stream the receipt to its final location once; every later stage reuses its path and hash
+        if has_receipt:
+            with StageMetrics.span("upload", receipt.filename.split('.')[-1].lower()):
+                upload = await FileHandler.ingest_upload(receipt)
+            # Known receipts are turned away before any extraction or LLM work
+            ExpenseSubmissionService.reject_known_receipt(db, upload)
+        
+        if async_mode:
+            job = SubmissionJobService.enqueue(
+                user_id=current_user.id,
+                category=category,
+                category_id=category_id,
+                description=description,
+                date=date,
+                parsed_amount=parsed_amount,
+                upload=upload
             )
-
-        if (today - expense_date_obj).days > 31:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Expense date is older than 1 month. Please submit within 31 days of the bill date."
+            # The job now owns the stored receipt
+            upload = None
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={
+                    "job_id": job["job_id"],
+                    "status": job["status"],
+                    "status_url": f"/api/expenses/jobs/{job['job_id']}"
+                }
             )
         
-        policy_result = PolicyService.check_expense_policy(
-            db=db,
-            user=current_user,
-            category_id=category_id,
-            amount=Decimal(str(amount_value)),
-            expense_date=expense_date_obj,
-            transport_type_id=None  # TODO: Add transport_type_id if needed
+        with StageMetrics.span("total", upload.file_type if upload else "none"):
+            return await ExpenseSubmissionService.process_submission(
+                db=db,
+                user=current_user,
+                category=category,
+                category_id=category_id,
+                description=description,
+                date=date,
+                parsed_amount=parsed_amount,
+                upload=upload
+            )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Exception: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error submitting expense: {str(e)}"
         )
-        
-        if not policy_result.is_compliant:
-            # Store policy violations in expense record
-            policy_check_result = {
-                "is_compliant": False,
-                "violations": policy_result.violations,
-                "allowed_amount": float(policy_result.allowed_amount) if policy_result.allowed_amount else None,
-                "policy_details": policy_result.policy_details
-            }
-            # We'll still allow submission but mark as POLICY_EXCEPTION
-            expense_data.policy_check_result = policy_check_result
-            print(f"[POLICY] Violations: {policy_result.violations}")
-        else:
-            policy_check_result = {
-                "is_compliant": True,
-                "violations": [],
-                "policy_details": policy_result.policy_details
-            }
-            expense_data.policy_check_result = policy_check_result
-        
-        # Create expense
-        expense, error = ExpenseService.create_expense(
-            db=db,
-            user_id=current_user.id,
-            expense_data=expense_data,
-            performed_by=current_user.id,
-            ai_validation_data=ai_validation_data if 'ai_validation_data' in locals() else None
+    finally:
+        # Remove the stored receipt unless it was attached to the expense
+        if upload:
+            upload.discard()
+
+@router.post("/submit-batch")
+async def submit_expense_batch(
+    items: str = Form(...),
+    receipts: List[UploadFile] = File(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Submit several expenses in one request (e.g. all receipts from a trip)
+    
+    Args:
+        items: JSON array of {"category", "description", "date", "amount"?, "receipt_index"?};
+               receipt_index points into receipts (amount is then optional, as in /submit)
+        receipts: Receipt files referenced by the items
+    
+    Receipts are processed concurrently, accepted expenses are saved in one transaction,
+    and the manager gets a single notification. Returns a result per item; a rejected
+    item does not affect the others.
+    """
+    receipts = receipts or []
+    try:
+        parsed_items = json.loads(items)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="items must be a JSON array"
         )
-        
-        if error:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error
-            )
-        
-        # Handle file upload if provided
-        if receipt and receipt.filename:
+    if not isinstance(parsed_items, list) or not parsed_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="items must be a non-empty JSON array"
+        )
+    if len(parsed_items) > settings.SUBMIT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can contain at most {settings.SUBMIT_BATCH_MAX_ITEMS} expenses"
+        )
+    
+    rejected = []
+    batch = []
+    try:
+        for index, raw in enumerate(parsed_items):
             try:
-                await receipt.seek(0)
-                file_content = await receipt.read()
-                file_hash = hashlib.sha256(file_content).hexdigest()
-                # Check for duplicate receipt by hash
-                existing_attachment = db.query(ExpenseAttachment).filter(ExpenseAttachment.file_hash == file_hash).first()
-                if existing_attachment:
-                    raise HTTPException(
-                        status_code=status.HTTP_409_CONFLICT,
-                        detail="Duplicate receipt detected. This file has already been submitted."
-                    )
-                # Reset file pointer for saving
-                await receipt.seek(0)
-                file_path, saved_hash, file_size, file_type = await FileHandler.save_file(
-                    file=receipt,
-                    expense_id=expense.id
-                )
-                # Ensure saved hash matches computed hash; if not, use computed
-                final_hash = saved_hash if saved_hash else file_hash
-                await receipt.seek(0)
+                if not isinstance(raw, dict):
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Each item must be an object")
+                receipt = None
+                receipt_index = raw.get("receipt_index")
+                if receipt_index is not None:
+                    if not isinstance(receipt_index, int) or not 0 <= receipt_index < len(receipts):
+                        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="receipt_index does not match an uploaded receipt")
+                    receipt = receipts[receipt_index]
                 
-                # Link attachment to expense
-                expense_attachment = ExpenseAttachment(
-                    expense_id=expense.id,
-                    file_path=file_path,
-                    file_name=receipt.filename,
-                    file_type=file_type,
-                    file_size=file_size,
-                    file_hash=final_hash
+                amount = raw.get("amount")
+                category, category_id, parsed_amount = ExpenseSubmissionService.validate_submission(
+                    category=raw.get("category") or "",
+                    description=raw.get("description") or "",
+                    date=raw.get("date") or "",
+                    amount=str(amount) if amount is not None else None,
+                    has_receipt=bool(receipt and receipt.filename)
                 )
-                db.add(expense_attachment)
-                db.commit()
-                print(f"Receipt saved for expense {expense.id}: {receipt.filename}")
-
-                # If amount is still placeholder (0), attempt extraction from the saved file
-                try:
-                    current_amount = float(expense.amount or 0)
-                except Exception:
-                    current_amount = 0
-
-                if current_amount == 0:
-                    extracted_after_save, conf_after_save, note_after_save = ImprovedReceiptExtractor.extract_amount(
-                        file_path,
-                        file_type
-                    )
-                    if extracted_after_save and extracted_after_save > 0:
-                        old_amount = expense.amount
-                        expense.amount = extracted_after_save
-                        expense.updated_at = datetime.utcnow()
-                        db.commit()
-                        db.refresh(expense)
-
-                        AuditLogger.log(
-                            db=db,
-                            entity_type="expense",
-                            entity_id=expense.id,
-                            action="amount_extracted_from_receipt",
-                            performed_by=current_user.id,
-                            old_value={"amount": str(old_amount)},
-                            new_value={"amount": str(extracted_after_save), "confidence": conf_after_save, "note": note_after_save}
-                        )
-            except HTTPException:
-                raise
-            except Exception as file_err:
-                # Log error but don't fail the expense submission
-                print(f"File upload error: {file_err}")
-                pass
-        
-        # Create approval records - for both manager and HR
-        ApprovalService.submit_for_manager_approval(db=db, expense_id=expense.id)
-        ApprovalService.submit_for_hr_approval(db=db, expense_id=expense.id)
-        
-        # Run pre-screen checks and store flags
-        _apply_pre_screen_checks(db, expense)
-        
-        # Notify manager about new expense
-        await NotificationService.notify_expense_submitted(
-            db=db,
-            expense=expense,
-            employee=current_user
-        )
-        
-        # Refresh expense to ensure attachments are loaded
-        db.refresh(expense)
-        
-        # Return response with attachments safely handled
-        return {
-            "id": expense.id,
-            "category_id": expense.category_id,
-            "transport_type_id": expense.transport_type_id,
-            "amount": float(expense.amount),
-            "expense_date": expense.expense_date,
-            "description": expense.description,
-            "status": expense.status.value if hasattr(expense.status, 'value') else str(expense.status),
-            "created_at": expense.created_at,
-            "updated_at": expense.updated_at,
-            "user_id": expense.user_id,
-            "first_name": expense.employee.first_name if expense.employee else None,
-            "last_name": expense.employee.last_name if expense.employee else None,
-            "attachments": [
-                {
-                    "id": att.id,
-                    "file_name": att.file_name,
-                    "file_type": att.file_type,
-                    "file_size": att.file_size,
-                    "uploaded_at": att.uploaded_at,
-                    "file_path": att.file_path
+                
+                item = {
+                    "index": index,
+                    "category": category,
+                    "category_id": category_id,
+                    "description": raw.get("description"),
+                    "date": raw.get("date"),
+                    "parsed_amount": parsed_amount,
+                    "upload": None
                 }
-                for att in expense.attachments
-            ] if expense.attachments else [],
-            "policy_check_result": None
-        }
+                if receipt and receipt.filename:
+                    await receipt.seek(0)
+                    with StageMetrics.span("upload", receipt.filename.split('.')[-1].lower()):
+                        item["upload"] = await FileHandler.ingest_upload(receipt)
+                    # Known receipts are turned away before any extraction or LLM work
+                    try:
+                        ExpenseSubmissionService.reject_known_receipt(db, item["upload"])
+                    except HTTPException:
+                        item["upload"].discard()
+                        raise
+                batch.append(item)
+            except HTTPException as e:
+                rejected.append({
+                    "index": index,
+                    "status": "rejected",
+                    "expense": None,
+                    "error": {"status_code": e.status_code, "detail": e.detail}
+                })
+        
+        results = await ExpenseSubmissionService.process_batch(db=db, user=current_user, items=batch) if batch else []
+        results = sorted(results + rejected, key=lambda result: result["index"])
+        
+        return jsonable_encoder({
+            "submitted": sum(1 for result in results if result["status"] == "accepted"),
+            "rejected": sum(1 for result in results if result["status"] == "rejected"),
+            "results": results
+        })
     
     except HTTPException:
         raise
@@ -508,8 +284,32 @@ async def submit_expense(
         traceback.print_exc()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error submitting expense: {str(e)}"
+            detail=f"Error submitting expenses: {str(e)}"
         )
+    finally:
+        # Remove stored receipts that were not attached to an expense
+        for item in batch:
+            if item["upload"]:
+                item["upload"].discard()
+
+@router.get("/jobs/{job_id}")
+async def get_submission_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get progress of an asynchronous submission
+    
+    Reports each pipeline stage and, once finished, the created expense
+    or the rejection payload (status_code + detail) the synchronous endpoint would have returned.
+    """
+    job = SubmissionJobService.get_job(job_id)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission job not found"
+        )
+    
+    return jsonable_encoder(SubmissionJobService.serialize_job(job))
 
 @router.get("/{expense_id}", response_model=ExpenseWithAttachments)
 async def get_expense(
@@ -631,8 +431,9 @@ async def extract_receipt_amount(
         attachment = expense.attachments[0]
         
         # Get the file path
-        file_path = attachment.file_path
-        file_type = attachment.file_name.split('.')[-1].lower()
+        file_path = FileHandler.get_full_path(attachment.file_path)
+        # Sniffed from the content at upload (older attachments are sniffed now)
+        file_type = ReceiptBackends.resolve(file_path, attachment.file_type)
         
         if not os.path.exists(file_path):
             raise HTTPException(
@@ -640,8 +441,15 @@ async def extract_receipt_amount(
                 detail=f"Receipt file not found: {attachment.file_name}"
             )
         
-        # Extract amount
-        extracted_amount, confidence, extraction_note = ImprovedReceiptExtractor.extract_amount(file_path, file_type)
+        # Extract amount (off the event loop); only the amount is needed, so skipped PDF pages stay unread
+        try:
+            document = await ExtractionCacheService.get_document(file_path, file_type, attachment.file_hash, full_text=False)
+            extracted_amount, confidence, extraction_note = document.amount, document.confidence, document.note
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Timed out extracting amount from receipt"
+            )
         
         if not extracted_amount or extracted_amount <= 0:
             raise HTTPException(
@@ -764,42 +572,21 @@ async def validate_expense_receipt(
     for attachment in attachments:
         try:
             # Get file path
-            file_path = attachment.file_path
+            file_path = FileHandler.get_full_path(attachment.file_path)
+            # Sniffed type, not the file name: a renamed file is still read by the right backend
+            file_extension = ReceiptBackends.resolve(file_path, attachment.file_type)
             
-            # Extract text based on file type
-            file_extension = attachment.filename.split('.')[-1].lower()
-            full_text = ""
-            
-            if file_extension == 'pdf':
-                try:
-                    import pdfplumber
-                    with pdfplumber.open(file_path) as pdf:
-                        for page in pdf.pages:
-                            full_text += (page.extract_text() or "") + "\n"
-                except Exception as e:
-                    full_text = f"Error extracting PDF text: {str(e)}"
-            
-            elif file_extension in ['docx', 'doc']:
-                try:
-                    from docx import Document
-                    doc = Document(file_path)
-                    for paragraph in doc.paragraphs:
-                        full_text += paragraph.text + " "
-                    for table in doc.tables:
-                        for row in table.rows:
-                            for cell in row.cells:
-                                full_text += cell.text + " "
-                except Exception as e:
-                    full_text = f"Error extracting Word text: {str(e)}"
+            # Parse once; validation reuses the document's text and dates
+            document = await ExtractionCacheService.get_document(file_path, file_extension, attachment.file_hash)
             
             # Validate receipt
             validation_results = validation_service.validate_receipt(
-                file_path, full_text, expense.amount
+                file_path, document.text_for_validation(), float(expense.amount), document=document
             )
             
             # Add attachment info
             validation_results['attachment_id'] = attachment.id
-            validation_results['filename'] = attachment.filename
+            validation_results['filename'] = attachment.file_name
             validation_results['file_type'] = file_extension
             
             all_validation_results.append(validation_results)
@@ -807,7 +594,7 @@ async def validate_expense_receipt(
         except Exception as e:
             all_validation_results.append({
                 "attachment_id": attachment.id,
-                "filename": attachment.filename,
+                "filename": attachment.file_name,
                 "error": f"Validation failed: {str(e)}",
                 "is_genuine": False,
                 "confidence_score": 0,
@@ -953,69 +740,3 @@ async def get_file(
             detail=f"Error serving file: {str(e)}"
         )
 
-
-def _apply_pre_screen_checks(db: Session, expense: Expense):
-    """
-    Compute and store rule-based pre-screen flags and recommendation.
-    This does not call Llama; it only uses deterministic rules.
-    """
-    flags = []
-    score = 100.0
-
-    # Date flag (already enforced on submit, but store for visibility)
-    today = datetime.utcnow().date()
-    if expense.expense_date:
-        days_old = (today - expense.expense_date).days
-        if days_old > 31:
-            flags.append("DATE_TOO_OLD")
-            score -= 30.0
-        elif days_old < 0:
-            flags.append("DATE_IN_FUTURE")
-            score -= 30.0
-
-    # Policy violation flag
-    if expense.policy_check_result:
-        try:
-            policy_data = isinstance(expense.policy_check_result, dict) and expense.policy_check_result or {}
-            violations = policy_data.get("violations")
-            if isinstance(violations, list) and violations:
-                flags.append("POLICY_VIOLATION")
-                score -= 20.0
-        except Exception:
-            pass
-
-    # Receipt quality flag
-    if not expense.extracted_text or len(expense.extracted_text.strip()) < 10:
-        flags.append("NO_TEXT_EXTRACTED")
-        score -= 25.0
-
-    # Amount sanity
-    try:
-        amt = float(expense.amount)
-        if amt <= 0:
-            flags.append("AMOUNT_MISSING_OR_ZERO")
-            score -= 20.0
-    except Exception:
-        flags.append("AMOUNT_MISSING_OR_ZERO")
-        score -= 20.0
-
-    score = max(0.0, min(100.0, score))
-
-    # Derive recommendation
-    if score >= 80:
-        recommendation = "✅ SAFE TO APPROVE"
-    elif score >= 60:
-        recommendation = "⚠️ NEEDS REVIEW"
-    else:
-        recommendation = "❌ RECOMMEND REJECTION"
-
-    # Store on expense
-    expense.validation_score = score
-    expense.risk_factors = {"flags": flags}
-    expense.ai_analysis = {
-        "source": "pre_screen",
-        "recommendation": recommendation,
-        "flags": flags,
-        "score": score
-    }
-    db.commit()
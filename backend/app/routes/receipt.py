@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.services.receipt_hash_gate_service import ReceiptHashGateService
+from app.utils.dependencies import get_current_user
+from app.utils.rate_limiter import RateLimiter
+from app.models.expense import Expense, ExpenseAttachment
+from app.models.user import User, RoleEnum
+from app.config import settings
+import re
+
+router = APIRouter(prefix="/api/receipts", tags=["receipts"])
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+_precheck_limiter = RateLimiter(settings.RECEIPT_PRECHECK_RATE_LIMIT, settings.RECEIPT_PRECHECK_RATE_WINDOW_SECONDS)
+
+@router.api_route("/by-hash/{sha256}", methods=["GET", "HEAD"])
+async def get_receipt_by_hash(
+    sha256: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Check whether the caller can already see a receipt with this SHA-256
+
+    Lets clients hash a receipt locally and skip uploading a known duplicate.
+    Only receipts the caller could view are reported (their own; managers and
+    finance see all, as for GET /api/expenses/receipts/{attachment_id}); any
+    other hash answers 404 exactly like an unknown one, so the endpoint cannot
+    be used to probe for other employees' files. A 404 therefore does not
+    promise the upload will be accepted: POST /api/expenses/submit still
+    rejects a receipt already attached to anyone's expense with 409.
+    Returns 200 with the matching expense when found (HEAD: status only).
+    Rate-limited per user (RECEIPT_PRECHECK_RATE_LIMIT per window).
+    """
+    _precheck_limiter.check(str(current_user.id))
+
+    file_hash = sha256.lower()
+    if not SHA256_PATTERN.match(file_hash):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sha256 must be 64 hexadecimal characters"
+        )
+
+    # Hashes the filter has never seen need no database lookup
+    ReceiptHashGateService.refresh(db)
+    match = None
+    if ReceiptHashGateService.might_contain(file_hash):
+        query = (
+            db.query(ExpenseAttachment.id, ExpenseAttachment.expense_id, ExpenseAttachment.uploaded_at)
+            .join(Expense, Expense.id == ExpenseAttachment.expense_id)
+            .filter(ExpenseAttachment.file_hash == file_hash)
+        )
+        # Owner, managers, and finance can view
+        if not current_user.role or current_user.role.role_name not in [RoleEnum.MANAGER, RoleEnum.FINANCE]:
+            query = query.filter(Expense.user_id == current_user.id)
+        match = query.first()
+
+    if match is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No submitted receipt with this hash"
+        )
+
+    return {
+        "sha256": file_hash,
+        "exists": True,
+        "attachment_id": match.id,
+        "expense_id": match.expense_id,
+        "uploaded_at": match.uploaded_at
+    }
@@ -9,6 +9,29 @@ from typing import Optional, Tuple
 
 class ApprovalService:
     
+    @staticmethod
+    def create_pending_approvals(db: Session, expense: Expense, commit: bool = True) -> Tuple[bool, Optional[str]]:
+        """
+        Add the pending MANAGER and HR approval rows for a newly created expense.
+        Unlike submit_for_*_approval this skips the status/existing-approval lookups,
+        so it can run inside the submission unit of work (commit=False) without extra queries.
+        """
+        try:
+            for role in (ApprovalRole.MANAGER, ApprovalRole.HR):
+                db.add(ExpenseApproval(
+                    expense_id=expense.id,
+                    approval_role=role,
+                    decision=ApprovalDecision.PENDING
+                ))
+            if commit:
+                db.commit()
+            return True, None
+        
+        except Exception as e:
+            if commit:
+                db.rollback()
+            return False, f"Error submitting for approval: {str(e)}"
+    
     @staticmethod
     def submit_for_hr_approval(db: Session, expense_id: int) -> Tuple[bool, Optional[str]]:
         """Submit expense to HR for receipt genuineness approval"""
@@ -6,13 +6,20 @@ Implements multiple checks to prevent duplicate submissions and validate genuine
 import hashlib
 import os
 from typing import Dict, List, Tuple, Optional, Set
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date as date_type
 from pathlib import Path
 import re
 from decimal import Decimal
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from app.models.expense import Expense, ExpenseAttachment
 from app.models.user import User
+from app.config import settings
+from app.services.image_hash_index_service import ImageHashIndexService
+from app.services.minhash_index_service import MinHashIndexService
+from app.utils.image_hash import ReceiptImageHash
+from app.utils.receipt_document import ReceiptDocument
+from app.utils.text_minhash import TextMinHash
 
 class ExpenseCrossCheckService:
     """
@@ -24,7 +31,21 @@ class ExpenseCrossCheckService:
     - Pattern recognition
     """
     
+    # Date window and amount band around a submission that can still score as a
+    # duplicate on date and amount alone: at the 85% threshold that is the same
+    # day within 50, or within 7 days at the same amount (see _days_similarity
+    # and _calculate_amount_similarity). Widen these if the threshold is lowered.
+    DUPLICATE_WINDOW_DAYS = 7
+    DUPLICATE_AMOUNT_BAND = 50
+    
+    # Pre-screen flag raised for each kind of review match (see review_matches)
+    REVIEW_FLAGS = {
+        'near_duplicate_text': 'SIMILAR_RECEIPT_TEXT',
+        'near_duplicate_image': 'SIMILAR_RECEIPT_IMAGE',
+    }
+    
     def __init__(self):
+        self._document: Optional[ReceiptDocument] = None
         self.duplicate_threshold = 0.85  # Similarity threshold for duplicate detection
         self.reasonable_amount_ranges = {
             'Travel': (500, 50000),      # Min-max for travel
@@ -56,13 +77,20 @@ class ExpenseCrossCheckService:
                          description: str, 
                          date: str,
                          user_id: int,
-                         db: Session) -> Dict:
+                         db: Session,
+                         document: Optional[ReceiptDocument] = None) -> Dict:
         """
         Perform comprehensive AI cross-checks on expense submission.
         
+        When a parsed ReceiptDocument is given, its text, dates and file hash are
+        reused instead of re-reading the file and re-scanning the text.
+        
         Returns:
             Dict with validation results and recommendations
         """
+        self._document = document
+        if document is not None:
+            extracted_text = document.text_for_validation()
         
         validation_results = {
             'is_approved': True,
@@ -70,6 +98,8 @@ class ExpenseCrossCheckService:
             'risk_factors': [],
             'recommendations': [],
             'duplicate_matches': [],
+            'review_matches': [],
+            'review_flags': [],
             'date_validation': {},
             'amount_validation': {},
             'vendor_validation': {},
@@ -79,13 +109,29 @@ class ExpenseCrossCheckService:
         
         # 1. Duplicate Bill Detection
         duplicate_check = self._check_duplicate_bills(file_path, extracted_text, amount, date, user_id, db)
+        validation_results['file_hash'] = duplicate_check['file_hash']
+        validation_results['text_hash'] = duplicate_check['text_hash']
+        validation_results['text_minhash'] = duplicate_check['text_minhash']
+        validation_results['image_hash'] = duplicate_check['image_hash']
         validation_results['duplicate_matches'] = duplicate_check['matches']
+        validation_results['review_matches'] = duplicate_check['review_matches']
         validation_results['cross_checks']['duplicate_similarity'] = duplicate_check['max_similarity']
         
         if duplicate_check['is_duplicate']:
             validation_results['risk_factors'].append(f"High similarity ({duplicate_check['max_similarity']:.1f}%) with existing bills")
             validation_results['recommendations'].append("This appears to be a duplicate submission")
             validation_results['is_approved'] = False
+        elif duplicate_check['review_matches']:
+            # A look-alike receipt is a lead for the approver, not proof of a duplicate
+            for similarity_type, flag in self.REVIEW_FLAGS.items():
+                similar = [match for match in duplicate_check['review_matches'] if match['similarity_type'] == similarity_type]
+                if not similar:
+                    continue
+                expense_ids = ", ".join(f"#{match['expense_id']}" for match in similar)
+                kind = "image" if similarity_type == 'near_duplicate_image' else "text"
+                validation_results['risk_factors'].append(f"Receipt {kind} closely resembles expense {expense_ids}")
+                validation_results['review_flags'].append(flag)
+            validation_results['recommendations'].append("Compare with the similar receipt before approving")
         
         # 2. Date Validation
         date_check = self._validate_expense_date(date, extracted_text)
@@ -139,18 +185,96 @@ class ExpenseCrossCheckService:
         return validation_results
     
     def _check_duplicate_bills(self, file_path: str, extracted_text: str, amount: float, date: str, user_id: int, db: Session) -> Dict:
-        """Check for duplicate or similar bills using multiple methods."""
-        
-        # Get file hash
-        file_hash = self._get_file_hash(file_path)
+        """
+        Check for duplicate or similar bills using multiple methods.
+
+        Only the user's expenses that can reach the duplicate threshold are
+        fetched: the ones sharing the file hash or text hash, plus those inside
+        the date window and amount band (see DUPLICATE_WINDOW_DAYS). The lookups
+        are served by the file_hash, extracted_text_hash and
+        (user_id, expense_date, amount) indexes, so the cost does not grow with
+        the length of the user's history.
+
+        Near-duplicate text (MinHash LSH, MinHashIndexService) is matched across
+        all employees, so the same bill submitted by a colleague, or re-scanned
+        with a few characters read differently, is caught as well.
+
+        Bills printed on one vendor template share most of their text (terms,
+        address, tax ids), so another employee's near-duplicate text is only a
+        duplicate when the amount and the date agree too; otherwise it is
+        returned in review_matches, which flags the expense for manual review
+        instead of rejecting it.
+        
+        A receipt image within NEAR_DUPLICATE_IMAGE_DISTANCE of another
+        (ImageHashIndexService) is never a duplicate by itself: receipts
+        printed on the same template look alike at hash resolution. When the
+        amount and the date or text agree as well it is returned in
+        review_matches. Date and amount alone only count against the user's
+        own expenses.
+        """
         
-        # Get text similarity hash
-        text_hash = self._get_text_hash(extracted_text)
+        if self._document is not None:
+            file_hash = self._document.compute_file_hash() or ""
+            text_hash = self._document.text_hash or ""
+        else:
+            # Get file hash
+            file_hash = self._get_file_hash(file_path)
+            
+            # Get text similarity hash
+            text_hash = self._get_text_hash(extracted_text) if extracted_text.strip() else ""
+        
+        # Expenses of this user with an attachment identical to the uploaded file
+        file_match_ids: Set[int] = set()
+        if file_hash:
+            file_match_ids = {
+                row.expense_id for row in db.query(ExpenseAttachment.expense_id)
+                .join(Expense, Expense.id == ExpenseAttachment.expense_id)
+                .filter(Expense.user_id == user_id, ExpenseAttachment.file_hash == file_hash)
+                .all()
+            }
         
-        # Query existing expenses for this user
-        existing_expenses = db.query(Expense).filter(Expense.user_id == user_id).all()
+        # Expenses of any user whose receipt text is nearly the same. Only text read
+        # from the receipt is signed: without it extracted_text is the extraction
+        # note, which is identical for every receipt that failed the same way
+        text_minhash = None
+        if self._document is not None and self._document.has_text:
+            text_minhash = TextMinHash.signature(self._document.text)
+        near_duplicates: Dict[int, float] = {}
+        if text_minhash:
+            near_duplicates = dict(MinHashIndexService.query(db, text_minhash, settings.NEAR_DUPLICATE_TEXT_THRESHOLD))
+        
+        # Expenses of any user with a receipt image that looks nearly the same
+        image_hash = self._document.image_hash if self._document is not None else None
+        similar_images: Dict[int, int] = {}
+        if image_hash:
+            similar_images = dict(ImageHashIndexService.query(db, image_hash, settings.NEAR_DUPLICATE_IMAGE_DISTANCE))
+        
+        candidate_filters = []
+        if file_match_ids:
+            candidate_filters.append(Expense.id.in_(file_match_ids))
+        if text_hash:
+            candidate_filters.append(Expense.extracted_text_hash == text_hash)
+        
+        expense_date = self._parse_date(date)
+        amount_value = self._to_float(amount)
+        if expense_date is not None and amount_value is not None:
+            window = timedelta(days=self.DUPLICATE_WINDOW_DAYS)
+            candidate_filters.append(and_(
+                Expense.expense_date.between(expense_date - window, expense_date + window),
+                Expense.amount.between(amount_value - self.DUPLICATE_AMOUNT_BAND, amount_value + self.DUPLICATE_AMOUNT_BAND),
+            ))
+        
+        scopes = []
+        if candidate_filters:
+            scopes.append(and_(Expense.user_id == user_id, or_(*candidate_filters)))
+        if near_duplicates or similar_images:
+            scopes.append(Expense.id.in_(list(set(near_duplicates) | set(similar_images))))
+        existing_expenses = []
+        if scopes:
+            existing_expenses = db.query(Expense).filter(or_(*scopes)).all()
         
         matches = []
+        review_matches = []
         max_similarity = 0.0
         
         for expense in existing_expenses:
@@ -158,32 +282,75 @@ class ExpenseCrossCheckService:
             text_similarity = 0.0
             
             # Check exact file hash match
-            for attachment in expense.attachments:
-                if hasattr(attachment, 'file_hash') and attachment.file_hash == file_hash:
-                    similarity_score = 100.0
-                    matches.append({
+            if expense.id in file_match_ids:
+                similarity_score = 100.0
+                matches.append({
+                    'expense_id': expense.id,
+                    'similarity_type': 'exact_file_match',
+                    'similarity_score': 100.0,
+                    'date': expense.expense_date.strftime('%Y-%m-%d'),
+                    'amount': expense.amount,
+                    'description': expense.description
+                })
+            
+            # Check amount and date similarity
+            date_similarity = 0.0
+            if expense_date is not None:
+                date_similarity = self._days_similarity(abs((expense_date - expense.expense_date).days))
+            amount_similarity = self._calculate_amount_similarity(amount, expense.amount)
+            same_bill_details = amount_similarity >= 90 and date_similarity == 100.0
+            
+            # Check text similarity
+            text_similarity = self._calculate_text_similarity(text_hash, expense.extracted_text_hash)
+            if expense.id in near_duplicates and text_similarity < 100.0:
+                near_similarity = near_duplicates[expense.id] * 100
+                if expense.user_id == user_id or same_bill_details:
+                    text_similarity = near_similarity
+                    # The index threshold only picks candidates; rejecting takes duplicate_threshold
+                    if text_similarity >= self.duplicate_threshold * 100:
+                        matches.append({
+                            'expense_id': expense.id,
+                            'similarity_type': 'near_duplicate_text',
+                            'similarity_score': text_similarity,
+                            'user_id': expense.user_id,
+                            'date': expense.expense_date.strftime('%Y-%m-%d'),
+                            'amount': expense.amount,
+                            'description': expense.description
+                        })
+                elif near_similarity >= self.duplicate_threshold * 100:
+                    # Another employee's bill from the same vendor template (shared terms,
+                    # address, GSTIN) with a different amount or date: review only
+                    review_matches.append({
                         'expense_id': expense.id,
-                        'similarity_type': 'exact_file_match',
-                        'similarity_score': 100.0,
+                        'similarity_type': 'near_duplicate_text',
+                        'similarity_score': near_similarity,
+                        'user_id': expense.user_id,
                         'date': expense.expense_date.strftime('%Y-%m-%d'),
                         'amount': expense.amount,
                         'description': expense.description
                     })
-                    break
+            similarity_score = max(similarity_score, text_similarity)
             
-            # Check text similarity
-            if hasattr(expense, 'extracted_text_hash'):
-                text_similarity = self._calculate_text_similarity(text_hash, expense.extracted_text_hash)
-                similarity_score = max(similarity_score, text_similarity)
-            
-            # Check amount and date similarity
-            date_similarity = self._calculate_date_similarity(date, expense.expense_date.strftime('%Y-%m-%d'))
-            amount_similarity = self._calculate_amount_similarity(amount, expense.amount)
+            # Same-looking receipt image with the same amount and the same date or text: review only
+            if expense.id in similar_images and expense.id not in file_match_ids and amount_similarity >= 90:
+                if date_similarity == 100.0 or expense.id in near_duplicates:
+                    review_matches.append({
+                        'expense_id': expense.id,
+                        'similarity_type': 'near_duplicate_image',
+                        'similarity_score': (1 - similar_images[expense.id] / ReceiptImageHash.BITS) * 100,
+                        'user_id': expense.user_id,
+                        'date': expense.expense_date.strftime('%Y-%m-%d'),
+                        'amount': expense.amount,
+                        'description': expense.description
+                    })
             
-            # Combine similarities
+            # Combine similarities (date and amount alone only against the user's own expenses)
+            date_amount_similarity = 0.0
+            if expense.user_id == user_id:
+                date_amount_similarity = (date_similarity * 0.6) + (amount_similarity * 0.4)
             combined_similarity = max(
                 similarity_score,
-                (date_similarity * 0.6) + (amount_similarity * 0.4),
+                date_amount_similarity,
                 text_similarity,
             )
             
@@ -202,7 +369,12 @@ class ExpenseCrossCheckService:
         return {
             'is_duplicate': len(matches) > 0,
             'matches': matches,
-            'max_similarity': max_similarity
+            'review_matches': review_matches,
+            'max_similarity': max_similarity,
+            'file_hash': file_hash,
+            'text_hash': text_hash,
+            'text_minhash': text_minhash,
+            'image_hash': image_hash
         }
     
     def _validate_expense_date(self, date: str, extracted_text: str) -> Dict:
@@ -467,32 +639,48 @@ class ExpenseCrossCheckService:
     
     def _calculate_date_similarity(self, date1: str, date2: str) -> float:
         """Calculate similarity between two dates."""
-        try:
-            d1 = datetime.strptime(date1, '%Y-%m-%d')
-            d2 = datetime.strptime(date2, '%Y-%m-%d')
-            
-            days_diff = abs((d1 - d2).days)
-            if days_diff == 0:
-                return 100.0
-            elif days_diff <= 7:
-                return 80.0
-            elif days_diff <= 30:
-                return 50.0
-            else:
-                return 20.0
-        except:
+        d1 = self._parse_date(date1)
+        d2 = self._parse_date(date2)
+        if d1 is None or d2 is None:
             return 0.0
+        return self._days_similarity(abs((d1 - d2).days))
+    
+    @staticmethod
+    def _days_similarity(days_diff: int) -> float:
+        """Similarity of two dates that are days_diff days apart."""
+        if days_diff == 0:
+            return 100.0
+        elif days_diff <= 7:
+            return 80.0
+        elif days_diff <= 30:
+            return 50.0
+        else:
+            return 20.0
+    
+    @staticmethod
+    def _parse_date(value) -> Optional[date_type]:
+        """A YYYY-MM-DD string (or date) as a date, None when it cannot be parsed."""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date_type):
+            return value
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def _to_float(value) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError, ArithmeticError):
+            return None
     
     def _calculate_amount_similarity(self, amount1: float, amount2: float) -> float:
         """Calculate similarity between two amounts."""
-        try:
-            if isinstance(amount1, Decimal):
-                amount1 = float(amount1)
-            if isinstance(amount2, Decimal):
-                amount2 = float(amount2)
-            amount1 = float(amount1)
-            amount2 = float(amount2)
-        except Exception:
+        amount1 = self._to_float(amount1)
+        amount2 = self._to_float(amount2)
+        if amount1 is None or amount2 is None:
             return 0.0
 
         if amount1 == amount2:
@@ -508,6 +696,9 @@ class ExpenseCrossCheckService:
     
     def _extract_dates_from_text(self, text: str) -> List[datetime]:
         """Extract all dates from text."""
+        if self._document is not None:
+            return self._document.dates
+        
         date_patterns = [
             r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',  # DD/MM/YYYY
             r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b',  # YYYY/MM/DD
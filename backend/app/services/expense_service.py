@@ -56,9 +56,10 @@ class ExpenseService:
         user_id: int,
         expense_data: ExpenseCreate,
         performed_by: int,
-        ai_validation_data: Optional[dict] = None
+        ai_validation_data: Optional[dict] = None,
+        commit: bool = True
     ) -> Tuple[Optional[Expense], Optional[str]]:
-        """Create a new expense"""
+        """Create a new expense (commit=False only flushes, leaving the transaction to the caller)"""
         try:
             # Validate user exists
             user = db.query(User).filter(User.id == user_id).first()
@@ -89,6 +90,7 @@ class ExpenseService:
                 # AI validation fields
                 file_hash=ai_validation_data.get('file_hash') if ai_validation_data else None,
                 extracted_text_hash=ai_validation_data.get('extracted_text_hash') if ai_validation_data else None,
+                text_minhash=ai_validation_data.get('text_minhash') if ai_validation_data else None,
                 validation_score=ai_validation_data.get('validation_score') if ai_validation_data else None,
                 is_ai_validated=ai_validation_data.get('is_ai_validated', False) if ai_validation_data else False,
                 risk_factors=json.dumps(ai_validation_data.get('risk_factors', [])) if ai_validation_data else None
@@ -111,12 +113,14 @@ class ExpenseService:
                 }
             )
             
-            db.commit()
-            db.refresh(new_expense)
+            if commit:
+                db.commit()
+                db.refresh(new_expense)
             return new_expense, None
         
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             return None, f"Error creating expense: {str(e)}"
     
     @staticmethod
@@ -0,0 +1,858 @@
+"""
+Expense submission pipeline.
+
+Runs receipt extraction, AI checks, policy enforcement and persistence for a
+single expense submission. Shared by the synchronous submit endpoint and the
+background submission workers (see SubmissionJobService), and run for several
+items at once by the batch submit endpoint.
+"""
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.schemas.expense import ExpenseCreate
+from app.services.expense_service import ExpenseService
+from app.services.approval_service import ApprovalService
+from app.services.notification_service import NotificationService
+from app.services.receipt_validation_service import ReceiptValidationService
+from app.services.expense_cross_check_service import ExpenseCrossCheckService
+from app.services.llm_receipt_agent import LLMReceiptAgent
+from app.services.policy_service import PolicyService
+from app.services.extraction_cache_service import ExtractionCacheService
+from app.services.receipt_hash_gate_service import ReceiptHashGateService
+from app.utils.cpu_executor import CPUExecutor
+from app.utils.file_handler import StoredUpload
+from app.utils.image_hash import ReceiptImageHash
+from app.utils.receipt_document import ReceiptDocument
+from app.utils.stage_metrics import StageMetrics
+from app.models.expense import Expense, ExpenseAttachment
+from app.models.user import User
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
+import asyncio
+import json
+import time
+
+# Ordered stages reported to progress callbacks
+SUBMISSION_STAGES = [
+    "extraction",
+    "llm",
+    "validation",
+    "cross_check",
+    "policy",
+    "save",
+    "approval",
+    "notification",
+]
+
+# Map category name to category_id (aligns with frontend categoryMap)
+CATEGORY_MAP = {
+    'Travel': 1,
+    'Food': 2,
+    'Food & Meals': 2,  # Alternative name
+    'Accommodation': 3,
+    'Office Supplies': 4,
+    'Communication': 5,
+    'Miscellaneous': 6,
+    'Equipment': 7,
+    'Meals': 8,
+    'Meals & Drinks': 8,  # Alternative name
+    'Other': 9,
+    'Fuel': 10,
+}
+
+# Called as progress(stage, state); validation and cross-check report from a worker thread
+ProgressCallback = Callable[[str, str], None]
+
+
+def _noop_progress(stage: str, state: str) -> None:
+    pass
+
+
+async def _timed_llm_review(file_type: str, **kwargs) -> Dict:
+    """LLMReceiptAgent.evaluate_receipt, timed for the pipeline metrics (cancelled calls are tracked separately)"""
+    started = time.perf_counter()
+    try:
+        result = await LLMReceiptAgent.evaluate_receipt(**kwargs)
+    except asyncio.CancelledError:
+        StageMetrics.record("llm", time.perf_counter() - started, f"{file_type}/cancelled")
+        raise
+    StageMetrics.record("llm", time.perf_counter() - started, file_type)
+    return result
+
+
+async def _image_hash(upload: StoredUpload) -> Optional[str]:
+    """Perceptual hash of an image/PDF receipt on the light lane; None when it cannot be computed"""
+    if not ReceiptImageHash.supports(upload.file_type):
+        return None
+    try:
+        return await CPUExecutor.run_light(ReceiptImageHash.for_file, upload.full_path, upload.file_type)
+    except Exception as e:
+        print(f"[IMAGE-HASH] Skipped for {upload.file_name}: {e}")
+        return None
+
+
+class ExpenseSubmissionService:
+
+    @staticmethod
+    def validate_submission(
+        category: str,
+        description: str,
+        date: str,
+        amount: Optional[str],
+        has_receipt: bool
+    ) -> Tuple[str, int, Optional[float]]:
+        """
+        Validate submitted form fields before any receipt processing.
+        Returns: (category, category_id, parsed_amount)
+        """
+        # Validate required fields
+        if not category or not description or not date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Missing required fields. Got: category={category}, description={description}, date={date}"
+            )
+
+        # Amount validation: required if no receipt, optional if receipt provided
+        if not amount and not has_receipt:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Amount is required when no receipt is provided"
+            )
+
+        # Strip whitespace from category name for robustness
+        category = category.strip() if category else ""
+
+        category_id = CATEGORY_MAP.get(category)
+        if not category_id:
+            # Log available categories for debugging
+            print(f"[DEBUG] Invalid category received: '{category}'")
+            print(f"[DEBUG] Available categories: {list(CATEGORY_MAP.keys())}")
+            print(f"[DEBUG] Category length: {len(category)}, repr: {repr(category)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid category: {category}. Valid options are: {', '.join(CATEGORY_MAP.keys())}"
+            )
+
+        parsed_amount = None
+        if amount is not None and str(amount).strip() != "":
+            try:
+                parsed_amount = float(amount)
+            except (ValueError, TypeError):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid amount provided"
+                )
+
+        if not (parsed_amount is not None and parsed_amount > 0) and not has_receipt:
+            # No receipt and no amount
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Amount is required when no receipt is provided"
+            )
+
+        ExpenseSubmissionService.parse_expense_date(date)
+
+        return category, category_id, parsed_amount
+
+    @staticmethod
+    def parse_expense_date(date: str):
+        """Parse and bound-check the expense date (YYYY-MM-DD, not future, within 31 days)"""
+        try:
+            expense_date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid date format. Use YYYY-MM-DD"
+            )
+
+        today = datetime.utcnow().date()
+        if expense_date_obj > today:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expense date cannot be in the future"
+            )
+
+        if (today - expense_date_obj).days > 31:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expense date is older than 1 month. Please submit within 31 days of the bill date."
+            )
+
+        return expense_date_obj
+
+    @staticmethod
+    def reject_known_receipt(db: Session, upload: StoredUpload):
+        """
+        Pre-admission duplicate gate, run right after the upload is stored: a
+        receipt whose SHA-256 is already attached to an expense is rejected with
+        409 before extraction, the LLM call or any validation runs.
+        """
+        with StageMetrics.span("precheck", upload.file_type):
+            known = ReceiptHashGateService.is_known(db, upload.file_hash)
+        if known:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Duplicate receipt detected. This file has already been submitted."
+            )
+
+    @staticmethod
+    def _run_checks(
+        file_path: str,
+        file_type: str,
+        user_id: int,
+        category: str,
+        description: str,
+        date: str,
+        document: ReceiptDocument,
+        full_text: str,
+        amount: float,
+        progress: ProgressCallback
+    ) -> Tuple[Dict, ExpenseCrossCheckService, Dict]:
+        """
+        Receipt genuineness validation and cross-checking (blocking; analyze_receipt
+        runs it on a worker thread). Opens its own session, since a Session must not
+        be shared with the request's thread.
+        Returns: (validation_results, cross_check_service, cross_check_results)
+        """
+        db = SessionLocal()
+        try:
+            # Validate receipt genuineness
+            progress("validation", "running")
+            validation_service = ReceiptValidationService()
+            with StageMetrics.span("validation", file_type):
+                validation_results = validation_service.validate_receipt(
+                    file_path, full_text, amount, document=document
+                )
+            print(f"[VALIDATION] {validation_service.get_validation_summary(validation_results)}")
+            progress("validation", "done")
+
+            # Perform AI cross-checking
+            progress("cross_check", "running")
+            cross_check_service = ExpenseCrossCheckService()
+            with StageMetrics.span("cross_check", file_type):
+                cross_check_results = cross_check_service.cross_check_expense(
+                    file_path=file_path,
+                    extracted_text=full_text,
+                    amount=amount,
+                    category=category,
+                    description=description,
+                    date=date,
+                    user_id=user_id,
+                    db=db,
+                    document=document
+                )
+            print(f"[CROSS-CHECK] {cross_check_service.get_validation_summary(cross_check_results)}")
+            return validation_results, cross_check_service, cross_check_results
+        finally:
+            db.close()
+
+    @staticmethod
+    async def analyze_receipt(
+        db: Session,
+        user: User,
+        category: str,
+        description: str,
+        date: str,
+        upload: StoredUpload,
+        progress: ProgressCallback = _noop_progress
+    ) -> Tuple[float, Optional[dict], Optional[ReceiptDocument]]:
+        """
+        Extract the amount from a stored receipt and run the LLM, genuineness
+        and cross-check stages. Raises HTTPException when the receipt is rejected.
+        Returns: (amount_value, ai_validation_data, document)
+        """
+        ai_validation_data = None
+        document = None
+        receipt_path = upload.full_path
+        file_extension = upload.file_type
+        # The perceptual hash is a small decode, computed while the receipt is parsed
+        image_hash_task = asyncio.create_task(_image_hash(upload))
+        try:
+            progress("extraction", "running")
+            # Parse the receipt once (off the event loop) and cache it for later read paths;
+            # every later stage reuses this document
+            extraction_started = time.perf_counter()
+            try:
+                document = await ExtractionCacheService.get_document(receipt_path, file_extension, upload.file_hash)
+                StageMetrics.record("extraction", time.perf_counter() - extraction_started, document.metrics_label)
+                if document.ocr_level and not document.from_cache:
+                    # Which adaptive OCR pass was needed, to tune the OCR_*_LEVELS defaults
+                    StageMetrics.record("ocr_level", time.perf_counter() - extraction_started, f"{file_extension}/{document.ocr_level}")
+            except asyncio.TimeoutError:
+                StageMetrics.record("extraction", time.perf_counter() - extraction_started, f"{file_extension}/timeout")
+                document = ReceiptDocument(receipt_path, file_extension, file_hash=upload.file_hash)
+                document.note = "Receipt extraction timed out"
+            document.image_hash = await image_hash_task
+            extracted_amount, confidence, extraction_note = document.amount, document.confidence, document.note
+            full_text = document.text_for_validation()
+            progress("extraction", "done")
+
+            # LLM agent validation (free local Ollama if enabled) runs as a task while
+            # the deterministic checks below proceed; a deterministic rejection cancels it
+            progress("llm", "running")
+            llm_task = asyncio.create_task(_timed_llm_review(
+                file_extension,
+                extracted_text=full_text,
+                amount=float(extracted_amount or 0),
+                category=category,
+                description=description,
+                expense_date=date,
+            ))
+            try:
+                # Genuineness validation and cross-checking run on a worker thread (with
+                # their own session) while the event loop serves the LLM request
+                validation_results, cross_check_service, cross_check_results = await asyncio.to_thread(
+                    ExpenseSubmissionService._run_checks,
+                    file_path=receipt_path,
+                    file_type=file_extension,
+                    user_id=user.id,
+                    category=category,
+                    description=description,
+                    date=date,
+                    document=document,
+                    full_text=full_text,
+                    amount=extracted_amount or 0,
+                    progress=progress
+                )
+
+                # Combine validation results
+                overall_confidence = (validation_results['confidence_score'] + cross_check_results['confidence_score']) / 2
+
+                # Combine risk factors and recommendations
+                all_risk_factors = validation_results['risk_factors'] + cross_check_results['risk_factors']
+                all_recommendations = validation_results['recommendations'] + cross_check_results['recommendations']
+
+                # If cross-check fails, reject the submission
+                if not cross_check_results['is_approved']:
+                    progress("cross_check", "failed")
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail={
+                            "error": "Expense validation failed",
+                            "message": f"AI cross-check detected issues: {cross_check_service.get_validation_summary(cross_check_results)}",
+                            "risk_factors": all_risk_factors,
+                            "recommendations": all_recommendations,
+                            "confidence_score": overall_confidence
+                        }
+                    )
+                progress("cross_check", "done")
+
+                llm_result = await llm_task
+            except BaseException:
+                # Rejected (or failed) without the LLM verdict: stop the in-flight request
+                if not llm_task.done():
+                    llm_task.cancel()
+                    progress("llm", "cancelled")
+                raise
+            print(f"[LLM] decision={llm_result.get('decision')} risk={llm_result.get('risk_level')} reasons={llm_result.get('reasons')}")
+
+            # Hard gate: block on explicit block, and block on review if strict mode
+            if llm_result.get('decision') == 'block' or (settings.OLLAMA_STRICT and llm_result.get('decision') == 'review'):
+                progress("llm", "failed")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={
+                        "error": "Receipt rejected by AI",
+                        "ai": llm_result,
+                    }
+                )
+            progress("llm", "done")
+
+            # Prepare AI validation data
+            ai_validation_data = {
+                'file_hash': cross_check_results.get('file_hash', ''),
+                'extracted_text_hash': cross_check_results.get('text_hash', ''),
+                'text_minhash': cross_check_results.get('text_minhash'),
+                'image_hash': cross_check_results.get('image_hash'),
+                # Leads that need an approver's eye rather than a rejection (see apply_pre_screen_checks)
+                'review_flags': cross_check_results.get('review_flags', []),
+                'has_text': document.has_text,
+                'validation_score': overall_confidence,
+                'is_ai_validated': cross_check_results['is_approved'],
+                'risk_factors': cross_check_results['risk_factors'][:500],  # Limit length
+                'validation_timestamp': datetime.now().isoformat()
+            }
+
+            if extracted_amount and extracted_amount > 0:
+                print(f"[SUCCESS] Extracted amount ₹{extracted_amount:.2f} from receipt ({confidence} confidence): {extraction_note}")
+                return extracted_amount, ai_validation_data, document
+
+            # Extraction failed or returned 0 - use placeholder 0, user will update manually
+            print(f"[INFO] Could not extract amount from receipt: {extraction_note}. Using 0 as placeholder.")
+            return 0, ai_validation_data, document
+
+        except HTTPException:
+            # Do not swallow validation failures (duplicate/fraud/etc)
+            raise
+        except Exception as extract_err:
+            # If extraction fails, use placeholder amount 0
+            print(f"[ERROR] Receipt extraction error: {extract_err}")
+            return 0, ai_validation_data, document
+        finally:
+            if not image_hash_task.done():
+                image_hash_task.cancel()
+
+    @staticmethod
+    def build_expense_data(
+        db: Session,
+        user: User,
+        category_id: int,
+        description: str,
+        date: str,
+        amount_value: float
+    ) -> ExpenseCreate:
+        """Build the expense payload and attach the policy enforcement result"""
+        expense_data = ExpenseCreate(
+            amount=amount_value,
+            category_id=category_id,
+            description=description,
+            expense_date=date  # This is the date the expense was incurred
+        )
+
+        expense_date_obj = ExpenseSubmissionService.parse_expense_date(date)
+
+        policy_result = PolicyService.check_expense_policy(
+            db=db,
+            user=user,
+            category_id=category_id,
+            amount=Decimal(str(amount_value)),
+            expense_date=expense_date_obj,
+            transport_type_id=None  # TODO: Add transport_type_id if needed
+        )
+
+        if not policy_result.is_compliant:
+            # Store policy violations in expense record
+            # We'll still allow submission but mark as POLICY_EXCEPTION
+            expense_data.policy_check_result = {
+                "is_compliant": False,
+                "violations": policy_result.violations,
+                "allowed_amount": float(policy_result.allowed_amount) if policy_result.allowed_amount else None,
+                "policy_details": policy_result.policy_details
+            }
+            print(f"[POLICY] Violations: {policy_result.violations}")
+        else:
+            expense_data.policy_check_result = {
+                "is_compliant": True,
+                "violations": [],
+                "policy_details": policy_result.policy_details
+            }
+
+        return expense_data
+
+    @staticmethod
+    async def process_submission(
+        db: Session,
+        user: User,
+        category: str,
+        category_id: int,
+        description: str,
+        date: str,
+        parsed_amount: Optional[float] = None,
+        upload: Optional[StoredUpload] = None,
+        progress: ProgressCallback = _noop_progress
+    ) -> Dict:
+        """
+        Run the full submission pipeline for already-validated form fields.
+
+        Handle amount:
+        - If amount is provided, use it
+        - If receipt is provided but no amount, try to extract from receipt
+        - If extraction fails, use 0 as placeholder and let user update manually
+
+        The receipt (if any) has already been streamed into the upload directory by
+        FileHandler.ingest_upload; it is linked to the expense here, and the caller
+        discards it if the submission does not get that far.
+
+        Returns the serialized expense. Raises HTTPException on rejection.
+        """
+        ai_validation_data = None
+        document = None
+        has_receipt = upload is not None
+        metrics_label = upload.file_type if has_receipt else "none"
+
+        if parsed_amount is not None and parsed_amount > 0:
+            amount_value = parsed_amount
+            for stage in ("extraction", "llm", "validation", "cross_check"):
+                progress(stage, "skipped")
+        else:
+            # Receipt is provided (or amount is 0/blank) - try to extract amount from it
+            amount_value, ai_validation_data, document = await ExpenseSubmissionService.analyze_receipt(
+                db=db,
+                user=user,
+                category=category,
+                description=description,
+                date=date,
+                upload=upload,
+                progress=progress
+            )
+
+        # Policy Enforcement Check
+        progress("policy", "running")
+        with StageMetrics.span("policy", metrics_label):
+            expense_data = ExpenseSubmissionService.build_expense_data(
+                db=db,
+                user=user,
+                category_id=category_id,
+                description=description,
+                date=date,
+                amount_value=amount_value
+            )
+        progress("policy", "done")
+
+        # Authoritative duplicate check by the hash computed during upload (before anything is
+        # written); the early gate may not have seen a receipt another worker saved meanwhile
+        progress("save", "running")
+        if has_receipt:
+            existing_attachment = db.query(ExpenseAttachment.id).filter(ExpenseAttachment.file_hash == upload.file_hash).first()
+            if existing_attachment:
+                progress("save", "failed")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Duplicate receipt detected. This file has already been submitted."
+                )
+
+        # Unit of work: expense, audit row, attachment, approvals, pre-screen flags and the
+        # manager's in-app notification are flushed and committed once, so a failure leaves
+        # no half-created expense. Objects stay loaded after the commit for the response.
+        expire_on_commit = db.expire_on_commit
+        db.expire_on_commit = False
+        db_write_started = time.perf_counter()
+        try:
+            expense, error = ExpenseService.create_expense(
+                db=db,
+                user_id=user.id,
+                expense_data=expense_data,
+                performed_by=user.id,
+                ai_validation_data=ai_validation_data,
+                commit=False
+            )
+
+            if error:
+                progress("save", "failed")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=error
+                )
+
+            # Link attachment to expense
+            if has_receipt:
+                expense.attachments.append(ExpenseAttachment(
+                    file_path=upload.file_path,
+                    file_name=upload.file_name,
+                    file_type=upload.file_type,
+                    file_size=upload.file_size,
+                    file_hash=upload.file_hash,
+                    image_hash=ai_validation_data.get('image_hash') if ai_validation_data else None
+                ))
+            progress("save", "done")
+
+            # Create approval records - for both manager and HR
+            progress("approval", "running")
+            approved, error = ApprovalService.create_pending_approvals(db=db, expense=expense, commit=False)
+            if not approved:
+                progress("approval", "failed")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=error
+                )
+
+            # Run pre-screen checks and store flags
+            apply_pre_screen_checks(
+                db, expense, commit=False,
+                review_flags=ai_validation_data.get('review_flags') if ai_validation_data else None,
+                has_text=ai_validation_data.get('has_text') if ai_validation_data else None
+            )
+            progress("approval", "done")
+
+            # Notify manager about new expense (email goes out after the commit)
+            progress("notification", "running")
+            staged_email = NotificationService.stage_expense_submitted(db=db, expense=expense, employee=user)
+
+            db.commit()
+            if has_receipt:
+                upload.mark_attached()
+                ReceiptHashGateService.add(upload.file_hash)
+                print(f"Receipt saved for expense {expense.id}: {upload.file_name}")
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            db.expire_on_commit = expire_on_commit
+            StageMetrics.record("db_write", time.perf_counter() - db_write_started, metrics_label)
+
+        with StageMetrics.span("notification", metrics_label):
+            await NotificationService.send_staged_email(staged_email)
+        progress("notification", "done")
+
+        return serialize_submitted_expense(expense)
+
+    @staticmethod
+    async def process_batch(db: Session, user: User, items: List[Dict]) -> List[Dict]:
+        """
+        Run the submission pipeline for several already-validated items at once.
+
+        Each item is a dict with index, category, category_id, description, date,
+        parsed_amount and upload (StoredUpload or None). Receipts are analyzed
+        concurrently (at most SUBMIT_BATCH_CONCURRENCY at a time), accepted expenses
+        are written in a single transaction, and the approver gets one consolidated
+        notification instead of one per expense.
+
+        Returns one result per item: {index, status: accepted|rejected, expense, error}
+        """
+        results: Dict[int, Dict] = {}
+        semaphore = asyncio.Semaphore(max(1, settings.SUBMIT_BATCH_CONCURRENCY))
+
+        def reject(item: Dict, status_code: int, detail):
+            results[item["index"]] = {
+                "index": item["index"],
+                "status": "rejected",
+                "expense": None,
+                "error": {"status_code": status_code, "detail": detail}
+            }
+
+        async def analyze(item: Dict):
+            if item["parsed_amount"] is not None and item["parsed_amount"] > 0:
+                item["amount_value"], item["ai_validation_data"] = item["parsed_amount"], None
+                return
+            async with semaphore:
+                amount_value, ai_validation_data, _ = await ExpenseSubmissionService.analyze_receipt(
+                    db=db,
+                    user=user,
+                    category=item["category"],
+                    description=item["description"],
+                    date=item["date"],
+                    upload=item["upload"]
+                )
+            item["amount_value"], item["ai_validation_data"] = amount_value, ai_validation_data
+
+        outcomes = await asyncio.gather(*(analyze(item) for item in items), return_exceptions=True)
+
+        accepted = []
+        for item, outcome in zip(items, outcomes):
+            if isinstance(outcome, HTTPException):
+                reject(item, outcome.status_code, outcome.detail)
+            elif isinstance(outcome, Exception):
+                print(f"[BATCH] Item {item['index']} failed: {outcome}")
+                reject(item, 500, f"Error submitting expense: {str(outcome)}")
+            else:
+                accepted.append(item)
+
+        # Duplicate receipts: one lookup for the whole batch, plus repeats inside the batch
+        batch_hashes = [item["upload"].file_hash for item in accepted if item["upload"]]
+        existing_hashes = set()
+        if batch_hashes:
+            existing_hashes = {
+                row.file_hash for row in db.query(ExpenseAttachment.file_hash)
+                .filter(ExpenseAttachment.file_hash.in_(batch_hashes)).all()
+            }
+        seen_hashes = set()
+        to_save = []
+        for item in accepted:
+            upload = item["upload"]
+            if upload and (upload.file_hash in existing_hashes or upload.file_hash in seen_hashes):
+                reject(item, status.HTTP_409_CONFLICT, "Duplicate receipt detected. This file has already been submitted.")
+                continue
+            if upload:
+                seen_hashes.add(upload.file_hash)
+            to_save.append(item)
+
+        # Persist every accepted item in one transaction; a failing item only rolls back its savepoint
+        saved = []
+        for item in to_save:
+            savepoint = db.begin_nested()
+            try:
+                expense_data = ExpenseSubmissionService.build_expense_data(
+                    db=db,
+                    user=user,
+                    category_id=item["category_id"],
+                    description=item["description"],
+                    date=item["date"],
+                    amount_value=item["amount_value"]
+                )
+                expense, error = ExpenseService.create_expense(
+                    db=db,
+                    user_id=user.id,
+                    expense_data=expense_data,
+                    performed_by=user.id,
+                    ai_validation_data=item["ai_validation_data"],
+                    commit=False
+                )
+                if error:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+
+                upload = item["upload"]
+                if upload:
+                    db.add(ExpenseAttachment(
+                        expense_id=expense.id,
+                        file_path=upload.file_path,
+                        file_name=upload.file_name,
+                        file_type=upload.file_type,
+                        file_size=upload.file_size,
+                        file_hash=upload.file_hash,
+                        image_hash=item["ai_validation_data"].get('image_hash') if item["ai_validation_data"] else None
+                    ))
+
+                approved, error = ApprovalService.create_pending_approvals(db=db, expense=expense, commit=False)
+                if not approved:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+                apply_pre_screen_checks(
+                    db, expense, commit=False,
+                    review_flags=item["ai_validation_data"].get('review_flags') if item["ai_validation_data"] else None,
+                    has_text=item["ai_validation_data"].get('has_text') if item["ai_validation_data"] else None
+                )
+                savepoint.commit()
+                saved.append((item, expense))
+            except HTTPException as e:
+                savepoint.rollback()
+                reject(item, e.status_code, e.detail)
+            except Exception as e:
+                savepoint.rollback()
+                print(f"[BATCH] Item {item['index']} could not be saved: {e}")
+                reject(item, status.HTTP_400_BAD_REQUEST, f"Error submitting expense: {str(e)}")
+
+        if saved:
+            try:
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"[BATCH] Commit failed: {e}")
+                for item, _ in saved:
+                    reject(item, 500, f"Error submitting expense: {str(e)}")
+                saved = []
+
+        for item, expense in saved:
+            if item["upload"]:
+                item["upload"].mark_attached()
+                ReceiptHashGateService.add(item["upload"].file_hash)
+            db.refresh(expense)
+            results[item["index"]] = {
+                "index": item["index"],
+                "status": "accepted",
+                "expense": serialize_submitted_expense(expense),
+                "error": None
+            }
+
+        if saved:
+            await NotificationService.notify_expenses_submitted(
+                db=db,
+                expenses=[expense for _, expense in saved],
+                employee=user
+            )
+
+        return [results[index] for index in sorted(results)]
+
+
+def serialize_submitted_expense(expense: Expense) -> Dict:
+    """Build the submit response payload with attachments safely handled"""
+    return {
+        "id": expense.id,
+        "category_id": expense.category_id,
+        "transport_type_id": expense.transport_type_id,
+        "amount": float(expense.amount),
+        "expense_date": expense.expense_date,
+        "description": expense.description,
+        "status": expense.status.value if hasattr(expense.status, 'value') else str(expense.status),
+        "created_at": expense.created_at,
+        "updated_at": expense.updated_at,
+        "user_id": expense.user_id,
+        "first_name": expense.employee.first_name if expense.employee else None,
+        "last_name": expense.employee.last_name if expense.employee else None,
+        "attachments": [
+            {
+                "id": att.id,
+                "file_name": att.file_name,
+                "file_type": att.file_type,
+                "file_size": att.file_size,
+                "uploaded_at": att.uploaded_at,
+                "file_path": att.file_path
+            }
+            for att in expense.attachments
+        ] if expense.attachments else [],
+        "policy_check_result": None
+    }
+
+
+def apply_pre_screen_checks(
+    db: Session,
+    expense: Expense,
+    commit: bool = True,
+    review_flags: Optional[List[str]] = None,
+    has_text: Optional[bool] = None
+):
+    """
+    Compute and store rule-based pre-screen flags and recommendation.
+    This does not call Llama; it only uses deterministic rules.
+    review_flags are flags raised during submission (e.g. SIMILAR_RECEIPT_TEXT)
+    that should send the expense to manual review. has_text tells whether text
+    was read from the receipt (None when no receipt was read, e.g. the amount
+    was entered by hand).
+    """
+    flags = []
+    score = 100.0
+
+    # Submission-time leads: enough on their own to land in NEEDS REVIEW
+    for flag in review_flags or []:
+        flags.append(flag)
+        score -= 25.0
+
+    # Date flag (already enforced on submit, but store for visibility)
+    today = datetime.utcnow().date()
+    if expense.expense_date:
+        days_old = (today - expense.expense_date).days
+        if days_old > 31:
+            flags.append("DATE_TOO_OLD")
+            score -= 30.0
+        elif days_old < 0:
+            flags.append("DATE_IN_FUTURE")
+            score -= 30.0
+
+    # Policy violation flag
+    if expense.policy_check_result:
+        try:
+            policy_data = isinstance(expense.policy_check_result, dict) and expense.policy_check_result or {}
+            violations = policy_data.get("violations")
+            if isinstance(violations, list) and violations:
+                flags.append("POLICY_VIOLATION")
+                score -= 20.0
+        except Exception:
+            pass
+
+    # Receipt quality flag
+    if has_text is False:
+        flags.append("NO_TEXT_EXTRACTED")
+        score -= 25.0
+
+    # Amount sanity
+    try:
+        amt = float(expense.amount)
+        if amt <= 0:
+            flags.append("AMOUNT_MISSING_OR_ZERO")
+            score -= 20.0
+    except Exception:
+        flags.append("AMOUNT_MISSING_OR_ZERO")
+        score -= 20.0
+
+    score = max(0.0, min(100.0, score))
+
+    # Derive recommendation
+    if score >= 80:
+        recommendation = "✅ SAFE TO APPROVE"
+    elif score >= 60:
+        recommendation = "⚠️ NEEDS REVIEW"
+    else:
+        recommendation = "❌ RECOMMEND REJECTION"
+
+    # Store on expense
+    expense.validation_score = score
+    expense.risk_factors = json.dumps({"flags": flags})
+    expense.ai_analysis = {
+        "source": "pre_screen",
+        "recommendation": recommendation,
+        "flags": flags,
+        "score": score
+    }
+    if commit:
+        db.commit()
@@ -0,0 +1,162 @@
+"""
+Cache of receipt extraction results.
+
+Receipt files never change after upload, so the parsed ReceiptDocument for a
+given file hash is stored once (receipt_extractions table, compressed) with an
+in-process LRU in front of it. Entries are keyed by (file_hash, extractor
+version), so changing ImprovedReceiptExtractor.EXTRACTOR_VERSION invalidates
+every cached result without a cleanup job.
+
+load() and store() block (database round trip, zlib); get_document() runs
+them on the default thread pool so a cache lookup never stalls the event loop.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.database import SessionLocal
+from app.models.receipt_extraction import ReceiptExtraction
+from app.utils.cpu_executor import CPUExecutor
+from app.utils.improved_receipt_extractor import ImprovedReceiptExtractor
+from app.utils.receipt_backends import COST_OCR, ReceiptBackends
+from app.utils.receipt_document import ReceiptDocument
+
+
+class ExtractionCacheService:
+    _lru: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _key(file_hash: str) -> Tuple[str, str]:
+        return file_hash, ImprovedReceiptExtractor.EXTRACTOR_VERSION
+
+    @staticmethod
+    def _lru_get(file_hash: str) -> Optional[dict]:
+        key = ExtractionCacheService._key(file_hash)
+        with ExtractionCacheService._lock:
+            data = ExtractionCacheService._lru.get(key)
+            if data is not None:
+                ExtractionCacheService._lru.move_to_end(key)
+            return data
+
+    @staticmethod
+    def _lru_put(file_hash: str, data: dict):
+        key = ExtractionCacheService._key(file_hash)
+        with ExtractionCacheService._lock:
+            ExtractionCacheService._lru[key] = data
+            ExtractionCacheService._lru.move_to_end(key)
+            while len(ExtractionCacheService._lru) > max(0, settings.EXTRACTION_CACHE_LRU_SIZE):
+                ExtractionCacheService._lru.popitem(last=False)
+
+    @staticmethod
+    def load(file_path: str, file_hash: str) -> Optional[ReceiptDocument]:
+        """Cached document for a file hash (LRU first, then database), or None"""
+        data = ExtractionCacheService._lru_get(file_hash)
+        if data is None:
+            db = SessionLocal()
+            try:
+                row = db.query(ReceiptExtraction).filter(
+                    ReceiptExtraction.file_hash == file_hash,
+                    ReceiptExtraction.extractor_version == ImprovedReceiptExtractor.EXTRACTOR_VERSION
+                ).first()
+                if row is None:
+                    return None
+                data = json.loads(zlib.decompress(row.payload).decode("utf-8"))
+            except Exception as e:
+                print(f"[EXTRACTION-CACHE] Lookup failed for {file_hash[:12]}: {e}")
+                return None
+            finally:
+                db.close()
+            ExtractionCacheService._lru_put(file_hash, data)
+        return ReceiptDocument.from_dict(file_path, data)
+
+    @staticmethod
+    def store(document: ReceiptDocument, extraction_ms: Optional[int] = None):
+        """Persist a freshly extracted document (no-op if it is already cached)"""
+        file_hash = document.compute_file_hash()
+        if not file_hash:
+            return
+        data = document.to_dict()
+        ExtractionCacheService._lru_put(file_hash, data)
+
+        db = SessionLocal()
+        try:
+            db.add(ReceiptExtraction(
+                file_hash=file_hash,
+                extractor_version=ImprovedReceiptExtractor.EXTRACTOR_VERSION,
+                file_type=document.file_type,
+                payload=zlib.compress(json.dumps(data).encode("utf-8")),
+                amount=document.amount,
+                confidence=document.confidence,
+                date_strings=document.date_strings,
+                text_length=len(document.text),
+                ocr_used=document.ocr_used,
+                extraction_ms=extraction_ms
+            ))
+            db.commit()
+        except IntegrityError:
+            # Another request cached the same file first
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            print(f"[EXTRACTION-CACHE] Could not store {file_hash[:12]}: {e}")
+        finally:
+            db.close()
+
+    @staticmethod
+    async def get_document(
+        file_path: str,
+        file_type: str,
+        file_hash: Optional[str] = None,
+        full_text: bool = True
+    ) -> ReceiptDocument:
+        """
+        Parsed receipt for a stored file: from the cache when possible, otherwise
+        extracted and cached for the next caller. Formats whose backend is OCR
+        (see ReceiptBackends cost classes) run on the CPU process pool, the rest
+        on its light pool.
+        
+        PDFs are scanned last page first and extraction stops once the total is
+        found; with full_text=True (the default) the skipped pages are read on the
+        executor too. Callers that only need the amount pass full_text=False and
+        may get a partial document, which is not cached.
+        Raises asyncio.TimeoutError if extraction exceeds CPU_TASK_TIMEOUT_SECONDS.
+        """
+        if not file_hash:
+            file_hash = await asyncio.to_thread(ReceiptDocument(file_path, file_type).compute_file_hash)
+
+        if file_hash:
+            document = await asyncio.to_thread(ExtractionCacheService.load, file_path, file_hash)
+            if document is not None:
+                return document
+
+        started = time.perf_counter()
+        backend = ReceiptBackends.get(file_type)
+        if backend is not None and backend.cost == COST_OCR:
+            document = await CPUExecutor.run(
+                ImprovedReceiptExtractor.extract_document, file_path, file_type, file_hash=file_hash
+            )
+        else:
+            # Text-layer formats parse on the light lane; a scanned PDF comes back
+            # unread and is OCR'd on the process pool instead
+            document = await CPUExecutor.run_light(
+                ImprovedReceiptExtractor.extract_document, file_path, file_type, file_hash=file_hash, allow_ocr=False
+            )
+            if document.needs_ocr:
+                document = await CPUExecutor.run(
+                    ImprovedReceiptExtractor.extract_document, file_path, file_type, file_hash=file_hash
+                )
+        if full_text and document.pending_pages:
+            indexes = document.pending_pages
+            document.fill_pages(await CPUExecutor.run_light(ImprovedReceiptExtractor.read_pdf_pages, file_path, indexes), indexes)
+        extraction_ms = int((time.perf_counter() - started) * 1000)
+        # Empty results are not cached so that e.g. installing Tesseract takes effect
+        if not document.pending_pages and (document.has_text or document.amount):
+            await asyncio.to_thread(ExtractionCacheService.store, document, extraction_ms)
+        return document
@@ -0,0 +1,126 @@
+"""
+In-process BK-tree of receipt image hashes (re-photographed receipts).
+
+Hashes (ReceiptImageHash) are stored on expense_attachments.image_hash; this
+index is rebuilt from that column at startup and catches up on newer rows (by
+id) before each lookup, like MinHashIndexService. A BK-tree keys every child by
+its Hamming distance to the parent, so by the triangle inequality a lookup for
+"within distance k" only descends into children keyed d-k..d+k and skips the
+rest of the tree; at small k a query visits a small fraction of the nodes even
+with hundreds of thousands of receipts indexed.
+"""
+
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.expense import ExpenseAttachment
+
+
+class _BKNode:
+    __slots__ = ("value", "expense_ids", "children")
+
+    def __init__(self, value: int):
+        self.value = value
+        self.expense_ids: Set[int] = set()
+        self.children: Dict[int, "_BKNode"] = {}
+
+
+class ImageHashIndexService:
+    # Rows re-read below the highest indexed id, for transactions that committed out of id order
+    REFRESH_OVERLAP = 100
+
+    _root: Optional[_BKNode] = None
+    _size = 0
+    _last_id = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _distance(value1: int, value2: int) -> int:
+        return bin(value1 ^ value2).count("1")
+
+    @staticmethod
+    def _insert(value: int, expense_id: int):
+        if ImageHashIndexService._root is None:
+            ImageHashIndexService._root = _BKNode(value)
+        node = ImageHashIndexService._root
+        while True:
+            distance = ImageHashIndexService._distance(value, node.value)
+            if distance == 0:
+                break
+            child = node.children.get(distance)
+            if child is None:
+                child = node.children[distance] = _BKNode(value)
+                node = child
+                break
+            node = child
+        if expense_id not in node.expense_ids:
+            node.expense_ids.add(expense_id)
+            ImageHashIndexService._size += 1
+
+    @staticmethod
+    def add(attachment_id: int, expense_id: int, image_hash: str):
+        try:
+            value = int(image_hash, 16)
+        except (TypeError, ValueError):
+            return
+        with ImageHashIndexService._lock:
+            ImageHashIndexService._insert(value, expense_id)
+            ImageHashIndexService._last_id = max(ImageHashIndexService._last_id, attachment_id)
+
+    @staticmethod
+    def refresh(db: Session):
+        """Index attachments created since the last refresh (by this or any other process)"""
+        after = max(0, ImageHashIndexService._last_id - ImageHashIndexService.REFRESH_OVERLAP)
+        rows = (
+            db.query(ExpenseAttachment.id, ExpenseAttachment.expense_id, ExpenseAttachment.image_hash)
+            .filter(ExpenseAttachment.id > after, ExpenseAttachment.image_hash.isnot(None))
+            .order_by(ExpenseAttachment.id)
+            .all()
+        )
+        for attachment_id, expense_id, image_hash in rows:
+            ImageHashIndexService.add(attachment_id, expense_id, image_hash)
+
+    @staticmethod
+    def rebuild():
+        """Reload the whole index from the database (startup)"""
+        with ImageHashIndexService._lock:
+            ImageHashIndexService._root = None
+            ImageHashIndexService._size = 0
+            ImageHashIndexService._last_id = 0
+        db = SessionLocal()
+        try:
+            ImageHashIndexService.refresh(db)
+        finally:
+            db.close()
+        print(f"[IMAGE-HASH] Indexed {ImageHashIndexService._size} receipt image hashes")
+
+    @staticmethod
+    def query(db: Session, image_hash: str, max_distance: int) -> List[Tuple[int, int]]:
+        """[(expense_id, Hamming distance)] of indexed receipts within max_distance, closest first"""
+        if not image_hash:
+            return []
+        value = int(image_hash, 16)
+        ImageHashIndexService.refresh(db)
+
+        matches: Dict[int, int] = {}
+        with ImageHashIndexService._lock:
+            pending = [ImageHashIndexService._root] if ImageHashIndexService._root is not None else []
+            while pending:
+                node = pending.pop()
+                distance = ImageHashIndexService._distance(value, node.value)
+                if distance <= max_distance:
+                    for expense_id in node.expense_ids:
+                        matches[expense_id] = min(distance, matches.get(expense_id, distance))
+                for child_distance, child in node.children.items():
+                    if distance - max_distance <= child_distance <= distance + max_distance:
+                        pending.append(child)
+        return sorted(matches.items(), key=lambda match: match[1])
+
+    @staticmethod
+    def stats() -> dict:
+        with ImageHashIndexService._lock:
+            return {
+                "hashes": ImageHashIndexService._size,
+                "last_id": ImageHashIndexService._last_id,
+            }
@@ -0,0 +1,105 @@
+"""
+In-process LSH index of expense text signatures (near-duplicate receipts).
+
+Signatures (TextMinHash) are stored on expenses.text_minhash; this index is
+rebuilt from that column at startup and catches up on newer rows (by id) before
+each lookup, so expenses created by other workers are found too. Each
+signature is split into BANDS bands of ROWS slots; two receipts become
+candidates when any band is equal, and candidates are then scored by their
+estimated Jaccard similarity. With 20 bands of 6 rows, texts at 0.8
+similarity become candidates with >99% probability and unrelated texts
+(similarity below 0.3) almost never do, so a lookup touches a handful of
+expenses instead of the whole organization.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.expense import Expense
+from app.utils.text_minhash import TextMinHash
+
+
+class MinHashIndexService:
+    BANDS = 20
+    ROWS = 6
+    # Rows re-read below the highest indexed id, for transactions that committed out of id order
+    REFRESH_OVERLAP = 100
+
+    _buckets: Dict[int, Set[int]] = defaultdict(set)
+    _signatures: Dict[int, bytes] = {}
+    _last_id = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _band_keys(signature: bytes) -> List[int]:
+        width = MinHashIndexService.ROWS * 4
+        return [hash((band, signature[band * width:(band + 1) * width])) for band in range(MinHashIndexService.BANDS)]
+
+    @staticmethod
+    def add(expense_id: int, signature: bytes):
+        if len(signature) != TextMinHash.NUM_PERM * 4:
+            return
+        with MinHashIndexService._lock:
+            if expense_id in MinHashIndexService._signatures:
+                return
+            MinHashIndexService._signatures[expense_id] = signature
+            for key in MinHashIndexService._band_keys(signature):
+                MinHashIndexService._buckets[key].add(expense_id)
+            MinHashIndexService._last_id = max(MinHashIndexService._last_id, expense_id)
+
+    @staticmethod
+    def refresh(db: Session):
+        """Index expenses created since the last refresh (by this or any other process)"""
+        after = max(0, MinHashIndexService._last_id - MinHashIndexService.REFRESH_OVERLAP)
+        rows = (
+            db.query(Expense.id, Expense.text_minhash)
+            .filter(Expense.id > after, Expense.text_minhash.isnot(None))
+            .order_by(Expense.id)
+            .all()
+        )
+        for expense_id, signature in rows:
+            MinHashIndexService.add(expense_id, bytes(signature))
+
+    @staticmethod
+    def rebuild():
+        """Reload the whole index from the database (startup)"""
+        with MinHashIndexService._lock:
+            MinHashIndexService._buckets = defaultdict(set)
+            MinHashIndexService._signatures = {}
+            MinHashIndexService._last_id = 0
+        db = SessionLocal()
+        try:
+            MinHashIndexService.refresh(db)
+        finally:
+            db.close()
+        print(f"[MINHASH] Indexed {len(MinHashIndexService._signatures)} expense text signatures")
+
+    @staticmethod
+    def query(db: Session, signature: bytes, threshold: float) -> List[Tuple[int, float]]:
+        """[(expense_id, estimated similarity)] of indexed expenses at or above threshold, best first"""
+        if not signature:
+            return []
+        MinHashIndexService.refresh(db)
+        with MinHashIndexService._lock:
+            candidates = set()
+            for key in MinHashIndexService._band_keys(signature):
+                candidates.update(MinHashIndexService._buckets.get(key, ()))
+            stored = [(expense_id, MinHashIndexService._signatures[expense_id]) for expense_id in candidates]
+
+        matches = []
+        for expense_id, other in stored:
+            similarity = TextMinHash.similarity(signature, other)
+            if similarity >= threshold:
+                matches.append((expense_id, similarity))
+        return sorted(matches, key=lambda match: -match[1])
+
+    @staticmethod
+    def stats() -> dict:
+        with MinHashIndexService._lock:
+            return {
+                "signatures": len(MinHashIndexService._signatures),
+                "buckets": len(MinHashIndexService._buckets),
+                "last_id": MinHashIndexService._last_id,
+            }
@@ -2,7 +2,7 @@ from sqlalchemy.orm import Session
 from app.models.notification import Notification, NotificationTypeEnum
 from app.models.user import User
 from app.utils.email import send_email
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
 
 class NotificationService:
@@ -123,10 +123,21 @@ class NotificationService:
         """
         Notify manager when an expense is submitted
         """
+        staged = NotificationService.stage_expense_submitted(db, expense, employee)
+        db.commit()
+        await NotificationService.send_staged_email(staged)
+    
+    @staticmethod
+    def stage_expense_submitted(db: Session, expense, employee: User) -> Optional[Tuple[User, str, str]]:
+        """
+        Add the manager's in-app notification for a submitted expense to the current
+        transaction without committing. Returns (manager, subject, message) for
+        send_staged_email() once the transaction has committed, or None if there is no manager.
+        """
         # Find manager
         manager = db.query(User).filter(User.role_id == 2).first()
         if not manager:
-            return
+            return None
         
         subject = f"New Expense Submitted: ₹{expense.amount:.2f} by {employee.first_name}"
         message = f"""
@@ -142,6 +153,68 @@ Details:
 
 Please review and approve/reject at your earliest convenience.
 
+Best regards,
+ExpenseHub System
+        """.strip()
+        
+        db.add(Notification(
+            user_id=manager.id,
+            type=NotificationTypeEnum.INFO,
+            title=subject,
+            message=message
+        ))
+        return manager, subject, message
+    
+    @staticmethod
+    async def send_staged_email(staged: Optional[Tuple[User, str, str]]) -> bool:
+        """Send the email for a notification staged with stage_expense_submitted()"""
+        if not staged:
+            return False
+        user, subject, message = staged
+        try:
+            await send_email(
+                to_email=user.email,
+                subject=subject,
+                body=message
+            )
+            return True
+        except Exception as e:
+            print(f"Failed to send email to {user.email}: {e}")
+            return False
+    
+    @staticmethod
+    async def notify_expenses_submitted(db: Session, expenses: List, employee: User):
+        """
+        Notify manager once about several expenses submitted together (batch submit)
+        """
+        if not expenses:
+            return
+        if len(expenses) == 1:
+            await NotificationService.notify_expense_submitted(db=db, expense=expenses[0], employee=employee)
+            return
+        
+        manager = db.query(User).filter(User.role_id == 2).first()
+        if not manager:
+            return
+        
+        total = sum(float(expense.amount) for expense in expenses)
+        lines = "\n".join(
+            f"- ₹{expense.amount:.2f} | {expense.category.category_name if expense.category else 'Unknown'} | "
+            f"{expense.expense_date} | {expense.description or 'No description'}"
+            for expense in expenses
+        )
+        subject = f"{len(expenses)} Expenses Submitted: ₹{total:.2f} by {employee.first_name}"
+        message = f"""
+Dear {manager.first_name},
+
+{employee.first_name} {employee.last_name} has submitted {len(expenses)} expenses for your review:
+
+{lines}
+
+Total: ₹{total:.2f}
+
+Please review and approve/reject at your earliest convenience.
+
 Best regards,
 ExpenseHub System
         """.strip()
@@ -0,0 +1,145 @@
+"""
+Early duplicate-receipt gate.
+
+A resubmitted receipt used to be caught only when the expense was about to be
+saved, after extraction, the LLM call and every validation stage had run. The
+SHA-256 computed while the upload is streamed (FileHandler.ingest_upload) is
+checked here before any of that: an in-memory Bloom filter of every attachment
+hash answers "certainly new" for most uploads without a database round trip,
+and only possible hits are confirmed against the indexed
+expense_attachments.file_hash column.
+
+The filter is rebuilt at startup and catches up on newer attachments (by id)
+at most every RECEIPT_HASH_REFRESH_SECONDS, so it can briefly miss receipts
+saved by another worker; the hash check before the expense is written stays
+the authority.
+"""
+
+import math
+import threading
+import time
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.expense import ExpenseAttachment
+
+
+class ReceiptHashGateService:
+    # Rows re-read below the highest indexed id, for transactions that committed out of id order
+    REFRESH_OVERLAP = 100
+
+    _bits: bytearray = bytearray()
+    _size_bits = 0
+    _hash_count = 0
+    _items = 0
+    _last_id = 0
+    _refreshed_at = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _allocate():
+        """Size the filter for RECEIPT_HASH_BLOOM_CAPACITY hashes at RECEIPT_HASH_BLOOM_ERROR_RATE"""
+        capacity = max(1000, settings.RECEIPT_HASH_BLOOM_CAPACITY)
+        error_rate = min(max(settings.RECEIPT_HASH_BLOOM_ERROR_RATE, 1e-6), 0.5)
+        size_bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        ReceiptHashGateService._size_bits = size_bits
+        # A SHA-256 digest supplies eight independent 32-bit probe positions
+        ReceiptHashGateService._hash_count = max(1, min(8, round(size_bits / capacity * math.log(2))))
+        ReceiptHashGateService._bits = bytearray((size_bits + 7) // 8)
+        ReceiptHashGateService._items = 0
+
+    @staticmethod
+    def _positions(file_hash: str):
+        # The digest is already uniformly distributed: slice it instead of rehashing
+        size_bits = ReceiptHashGateService._size_bits
+        for index in range(ReceiptHashGateService._hash_count):
+            yield int(file_hash[index * 8:(index + 1) * 8], 16) % size_bits
+
+    @staticmethod
+    def _valid(file_hash: str) -> bool:
+        if not file_hash or len(file_hash) != 64:
+            return False
+        try:
+            int(file_hash, 16)
+        except ValueError:
+            return False
+        return True
+
+    @staticmethod
+    def add(file_hash: str, attachment_id: int = 0):
+        """Record a stored receipt hash (call after the attachment is committed)"""
+        if not ReceiptHashGateService._valid(file_hash):
+            return
+        with ReceiptHashGateService._lock:
+            if not ReceiptHashGateService._size_bits:
+                ReceiptHashGateService._allocate()
+            bits = ReceiptHashGateService._bits
+            new = False
+            for position in ReceiptHashGateService._positions(file_hash):
+                mask = 1 << (position & 7)
+                if not bits[position >> 3] & mask:
+                    bits[position >> 3] |= mask
+                    new = True
+            # Approximate count: hashes re-read by refresh() (or colliding) are not counted twice
+            if new:
+                ReceiptHashGateService._items += 1
+            ReceiptHashGateService._last_id = max(ReceiptHashGateService._last_id, attachment_id)
+
+    @staticmethod
+    def might_contain(file_hash: str) -> bool:
+        """False when the hash was certainly never stored; True means "check the database\""""
+        if not ReceiptHashGateService._valid(file_hash):
+            return True
+        with ReceiptHashGateService._lock:
+            if not ReceiptHashGateService._size_bits:
+                return True
+            bits = ReceiptHashGateService._bits
+            return all(bits[position >> 3] & (1 << (position & 7)) for position in ReceiptHashGateService._positions(file_hash))
+
+    @staticmethod
+    def refresh(db: Session, force: bool = False):
+        """Add attachments created since the last refresh (by this or any other process)"""
+        now = time.monotonic()
+        if not force and now - ReceiptHashGateService._refreshed_at < settings.RECEIPT_HASH_REFRESH_SECONDS:
+            return
+        ReceiptHashGateService._refreshed_at = now
+        after = max(0, ReceiptHashGateService._last_id - ReceiptHashGateService.REFRESH_OVERLAP)
+        rows = (
+            db.query(ExpenseAttachment.id, ExpenseAttachment.file_hash)
+            .filter(ExpenseAttachment.id > after, ExpenseAttachment.file_hash.isnot(None))
+            .order_by(ExpenseAttachment.id)
+            .all()
+        )
+        for attachment_id, file_hash in rows:
+            ReceiptHashGateService.add(file_hash, attachment_id)
+
+    @staticmethod
+    def rebuild():
+        """Reload the whole filter from the database (startup)"""
+        with ReceiptHashGateService._lock:
+            ReceiptHashGateService._allocate()
+            ReceiptHashGateService._last_id = 0
+        db = SessionLocal()
+        try:
+            ReceiptHashGateService.refresh(db, force=True)
+        finally:
+            db.close()
+        print(f"[HASH-GATE] Indexed {ReceiptHashGateService._items} receipt hashes")
+
+    @staticmethod
+    def is_known(db: Session, file_hash: str) -> bool:
+        """Whether a receipt with this SHA-256 is already attached to an expense"""
+        ReceiptHashGateService.refresh(db)
+        if not ReceiptHashGateService.might_contain(file_hash):
+            return False
+        return db.query(ExpenseAttachment.id).filter(ExpenseAttachment.file_hash == file_hash).first() is not None
+
+    @staticmethod
+    def stats() -> dict:
+        with ReceiptHashGateService._lock:
+            return {
+                "hashes": ReceiptHashGateService._items,
+                "size_bits": ReceiptHashGateService._size_bits,
+                "hash_count": ReceiptHashGateService._hash_count,
+                "last_id": ReceiptHashGateService._last_id,
+            }
@@ -4,6 +4,7 @@ from typing import Dict, Tuple, Optional
 from datetime import datetime
 import re
 from pathlib import Path
+from app.utils.receipt_document import ReceiptDocument, DATE_PATTERNS
 
 class ReceiptValidationService:
     """
@@ -12,6 +13,8 @@ class ReceiptValidationService:
     """
     
     def __init__(self):
+        self._document: Optional[ReceiptDocument] = None
+        
         self.suspicious_keywords = [
             'sample', 'demo', 'test', 'fake', 'template', 'example',
             'mock', 'dummy', 'placeholder', 'specimen', 'illustration'
@@ -29,7 +32,7 @@ class ReceiptValidationService:
             'email': r'[\w\.-]+@[\w\.-]+\.\w+',
         }
     
-    def validate_receipt(self, file_path: str, extracted_text: str, amount: float) -> Dict:
+    def validate_receipt(self, file_path: str, extracted_text: str, amount: float, document: Optional[ReceiptDocument] = None) -> Dict:
         """
         Validate receipt genuineness using multiple checks.
         
@@ -37,10 +40,15 @@ class ReceiptValidationService:
             file_path: Path to the receipt file
             extracted_text: Text extracted from the receipt
             amount: Amount extracted from the receipt
+            document: Already parsed receipt; its text and dates are reused instead of re-scanning
             
         Returns:
             Dict with validation results and confidence scores
         """
+        self._document = document
+        if document is not None:
+            extracted_text = document.text_for_validation()
+        
         validation_results = {
             'is_genuine': True,
             'confidence_score': 0.0,
@@ -140,17 +148,14 @@ class ReceiptValidationService:
         recommendations = []
         score = 100
         
-        # Extract dates from text
-        date_patterns = [
-            r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',  # DD/MM/YYYY
-            r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b',    # YYYY/MM/DD
-            r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4}\b'  # DD Month YYYY
-        ]
-        
-        dates_found = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            dates_found.extend(matches)
+        # Extract dates from text (reuse the parsed document when available)
+        if self._document is not None:
+            dates_found = self._document.date_strings
+        else:
+            dates_found = []
+            for pattern in DATE_PATTERNS:
+                matches = re.findall(pattern, text, re.IGNORECASE)
+                dates_found.extend(matches)
         
         if not dates_found:
             risk_factors.append("No clear date found in receipt")
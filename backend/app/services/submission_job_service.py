@@ -0,0 +1,196 @@
+"""
+Background processing for asynchronous expense submissions.
+
+Jobs are kept in-process: the submit endpoint stores the upload, registers a
+job and returns immediately, while a bounded pool of workers runs the
+submission pipeline and records per-stage progress for the job status API.
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Set
+from fastapi import HTTPException
+from app.config import settings
+from app.database import SessionLocal
+from app.models.user import User
+from app.utils.file_handler import StoredUpload
+from app.services.expense_submission_service import ExpenseSubmissionService, SUBMISSION_STAGES
+
+
+class SubmissionJobService:
+    _jobs: Dict[str, dict] = {}
+    _tasks: Set[asyncio.Task] = set()
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _get_semaphore() -> asyncio.Semaphore:
+        if SubmissionJobService._semaphore is None:
+            SubmissionJobService._semaphore = asyncio.Semaphore(max(1, settings.SUBMIT_ASYNC_WORKERS))
+        return SubmissionJobService._semaphore
+
+    @staticmethod
+    def _prune_expired_jobs():
+        """Drop finished jobs older than SUBMIT_JOB_TTL_SECONDS"""
+        cutoff = time.monotonic() - settings.SUBMIT_JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in SubmissionJobService._jobs.items()
+            if job["finished_monotonic"] is not None and job["finished_monotonic"] < cutoff
+        ]
+        for job_id in expired:
+            SubmissionJobService._jobs.pop(job_id, None)
+
+    @staticmethod
+    def pending_count() -> int:
+        """Number of jobs queued or running"""
+        return sum(
+            1 for job in SubmissionJobService._jobs.values()
+            if job["status"] in ("queued", "running")
+        )
+
+    @staticmethod
+    def is_full() -> bool:
+        return SubmissionJobService.pending_count() >= settings.SUBMIT_ASYNC_MAX_PENDING
+
+    @staticmethod
+    def enqueue(
+        user_id: int,
+        category: str,
+        category_id: int,
+        description: str,
+        date: str,
+        parsed_amount: Optional[float] = None,
+        upload: Optional[StoredUpload] = None
+    ) -> dict:
+        """
+        Register a job and schedule it on the worker pool.
+        The stored receipt is owned by the job and discarded if the submission does not complete.
+        """
+        SubmissionJobService._prune_expired_jobs()
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "user_id": user_id,
+            "status": "queued",
+            "stages": {stage: "pending" for stage in SUBMISSION_STAGES},
+            "current_stage": None,
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+            "finished_monotonic": None,
+        }
+        SubmissionJobService._jobs[job_id] = job
+
+        task = asyncio.create_task(
+            SubmissionJobService._run_job(
+                job_id=job_id,
+                user_id=user_id,
+                category=category,
+                category_id=category_id,
+                description=description,
+                date=date,
+                parsed_amount=parsed_amount,
+                upload=upload
+            )
+        )
+        # Keep a strong reference until the task completes
+        SubmissionJobService._tasks.add(task)
+        task.add_done_callback(SubmissionJobService._tasks.discard)
+        return job
+
+    @staticmethod
+    def get_job(job_id: str) -> Optional[dict]:
+        return SubmissionJobService._jobs.get(job_id)
+
+    @staticmethod
+    def serialize_job(job: dict) -> dict:
+        """Public view of a job for the status endpoint"""
+        return {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "current_stage": job["current_stage"],
+            "stages": [
+                {"stage": stage, "status": job["stages"][stage]}
+                for stage in SUBMISSION_STAGES
+            ],
+            "expense": job["result"],
+            "rejection": job["error"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        }
+
+    @staticmethod
+    def _update_stage(job_id: str, stage: str, state: str):
+        job = SubmissionJobService._jobs.get(job_id)
+        if not job or stage not in job["stages"]:
+            return
+        job["stages"][stage] = state
+        if state == "running":
+            job["current_stage"] = stage
+
+    @staticmethod
+    def _finish(job: dict, status: str):
+        if status != "completed" and job["current_stage"]:
+            if job["stages"][job["current_stage"]] == "running":
+                job["stages"][job["current_stage"]] = "failed"
+        job["status"] = status
+        job["current_stage"] = None
+        job["finished_at"] = datetime.utcnow()
+        job["finished_monotonic"] = time.monotonic()
+
+    @staticmethod
+    async def _run_job(
+        job_id: str,
+        user_id: int,
+        category: str,
+        category_id: int,
+        description: str,
+        date: str,
+        parsed_amount: Optional[float],
+        upload: Optional[StoredUpload]
+    ):
+        job = SubmissionJobService._jobs[job_id]
+        try:
+            async with SubmissionJobService._get_semaphore():
+                job["status"] = "running"
+                job["started_at"] = datetime.utcnow()
+                db = SessionLocal()
+                try:
+                    user = db.query(User).filter(User.id == user_id).first()
+                    if not user:
+                        job["error"] = {"status_code": 404, "detail": "User not found"}
+                        SubmissionJobService._finish(job, "failed")
+                        return
+
+                    result = await ExpenseSubmissionService.process_submission(
+                        db=db,
+                        user=user,
+                        category=category,
+                        category_id=category_id,
+                        description=description,
+                        date=date,
+                        parsed_amount=parsed_amount,
+                        upload=upload,
+                        progress=lambda stage, state: SubmissionJobService._update_stage(job_id, stage, state)
+                    )
+                    job["result"] = result
+                    SubmissionJobService._finish(job, "completed")
+                except HTTPException as e:
+                    db.rollback()
+                    job["error"] = {"status_code": e.status_code, "detail": e.detail}
+                    SubmissionJobService._finish(job, "rejected")
+                except Exception as e:
+                    db.rollback()
+                    print(f"[SUBMIT-JOB] Job {job_id} failed: {e}")
+                    job["error"] = {"status_code": 500, "detail": f"Error submitting expense: {str(e)}"}
+                    SubmissionJobService._finish(job, "failed")
+                finally:
+                    db.close()
+        finally:
+            if upload:
+                upload.discard()
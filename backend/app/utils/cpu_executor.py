@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+from fastapi import HTTPException, status
+from app.config import settings
+
+
+class CPUExecutor:
+    """
+    Runs blocking, CPU-heavy receipt work (pdfplumber, OCR, openpyxl, python-docx)
+    off the event loop so one slow receipt cannot stall every other request.
+
+    Uses a process pool by default and falls back to a thread pool when processes
+    are unavailable (CPU_EXECUTOR=thread forces threads). Workers are started by
+    forkserver (spawn where that is unavailable), never forked from the API
+    process: a fork taken while another thread holds a lock (an import lock,
+    logging, a database driver) hands the worker a lock nobody will release. Submissions beyond
+    CPU_EXECUTOR_MAX_QUEUE in-flight tasks are rejected with 503, and each task
+    is bounded by CPU_TASK_TIMEOUT_SECONDS.
+
+    Functions sent to the process pool must be importable module-level callables
+    (static methods are fine) with picklable arguments and results.
+
+    run_light() is the lane for cheap work (text-layer parsing, see the cost
+    classes in ReceiptBackends): a second, small pool of CPU_LIGHT_WORKERS
+    processes, so quick parses never queue behind OCR jobs and still do not
+    compete with the event loop for the GIL. It shares the in-flight limit and
+    timeout with run().
+
+    A task counts as in flight until its worker finishes it, not until its caller
+    stops waiting: a timed-out job still occupies a worker, so it keeps counting
+    against CPU_EXECUTOR_MAX_QUEUE.
+    """
+
+    _executor: Optional[Executor] = None
+    _light_executor: Optional[Executor] = None
+    _kind: Optional[str] = None
+    _light_kind: Optional[str] = None
+    _in_flight: int = 0
+    _in_flight_lock = threading.Lock()
+
+    @staticmethod
+    def _mp_context():
+        methods = multiprocessing.get_all_start_methods()
+        return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+    @staticmethod
+    def _create_pool(workers: int, thread_name_prefix: str) -> Tuple[Executor, str]:
+        """(executor, kind): a process pool unless CPU_EXECUTOR=thread or processes are unavailable"""
+        workers = max(1, workers)
+        if settings.CPU_EXECUTOR == "process":
+            try:
+                return ProcessPoolExecutor(max_workers=workers, mp_context=CPUExecutor._mp_context()), "process"
+            except (OSError, NotImplementedError, ImportError, ValueError) as e:
+                print(f"[CPU-EXECUTOR] Process pool unavailable ({e}); falling back to threads")
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix), "thread"
+
+    @staticmethod
+    def get_executor() -> Executor:
+        if CPUExecutor._executor is None:
+            CPUExecutor._executor, CPUExecutor._kind = CPUExecutor._create_pool(settings.CPU_EXECUTOR_WORKERS, "cpu-worker")
+        return CPUExecutor._executor
+
+    @staticmethod
+    def get_light_executor() -> Executor:
+        if CPUExecutor._light_executor is None:
+            CPUExecutor._light_executor, CPUExecutor._light_kind = CPUExecutor._create_pool(settings.CPU_LIGHT_WORKERS, "light-worker")
+        return CPUExecutor._light_executor
+
+    @staticmethod
+    def _fall_back_to_threads(light: bool = False):
+        """Replace a broken process pool with a thread pool"""
+        if light:
+            broken = CPUExecutor._light_executor
+            CPUExecutor._light_executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.CPU_LIGHT_WORKERS),
+                thread_name_prefix="light-worker"
+            )
+            CPUExecutor._light_kind = "thread"
+        else:
+            broken = CPUExecutor._executor
+            CPUExecutor._executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.CPU_EXECUTOR_WORKERS),
+                thread_name_prefix="cpu-worker"
+            )
+            CPUExecutor._kind = "thread"
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _check_capacity():
+        if CPUExecutor._in_flight >= settings.CPU_EXECUTOR_MAX_QUEUE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Receipt processing is busy. Please retry shortly."
+            )
+
+    @staticmethod
+    def _release(_future: Future):
+        # Runs in a worker or pool management thread once the job is finished or cancelled
+        with CPUExecutor._in_flight_lock:
+            CPUExecutor._in_flight -= 1
+
+    @staticmethod
+    async def _submit(executor: Executor, call: Callable[[], Any], timeout: float) -> Any:
+        """Submit call to executor, count it until the worker is done with it, and await it"""
+        with CPUExecutor._in_flight_lock:
+            CPUExecutor._in_flight += 1
+        try:
+            future = executor.submit(call)
+        except BaseException:
+            with CPUExecutor._in_flight_lock:
+                CPUExecutor._in_flight -= 1
+            raise
+        future.add_done_callback(CPUExecutor._release)
+        # On timeout wrap_future cancels a job that has not started; a running one keeps its worker
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+
+    @staticmethod
+    async def run(func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) on the CPU executor and await the result.
+
+        Raises:
+            HTTPException(503): too many CPU tasks already queued or running
+            asyncio.TimeoutError: the task exceeded its timeout
+        """
+        CPUExecutor._check_capacity()
+
+        if timeout is None:
+            timeout = settings.CPU_TASK_TIMEOUT_SECONDS
+
+        call = functools.partial(func, *args, **kwargs)
+        try:
+            return await CPUExecutor._submit(CPUExecutor.get_executor(), call, timeout)
+        except BrokenProcessPool as e:
+            # A worker died (OOM, crash in a native library); retry once on threads
+            print(f"[CPU-EXECUTOR] Process pool broken ({e}); retrying on thread pool")
+            CPUExecutor._fall_back_to_threads()
+            return await CPUExecutor._submit(CPUExecutor.get_executor(), call, timeout)
+
+    @staticmethod
+    async def run_light(func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run cheap blocking work on the light pool and await the result.
+
+        Raises:
+            HTTPException(503): too many CPU tasks already queued or running
+            asyncio.TimeoutError: the task exceeded its timeout
+        """
+        CPUExecutor._check_capacity()
+
+        if timeout is None:
+            timeout = settings.CPU_TASK_TIMEOUT_SECONDS
+        call = functools.partial(func, *args, **kwargs)
+        try:
+            return await CPUExecutor._submit(CPUExecutor.get_light_executor(), call, timeout)
+        except BrokenProcessPool as e:
+            print(f"[CPU-EXECUTOR] Light process pool broken ({e}); retrying on thread pool")
+            CPUExecutor._fall_back_to_threads(light=True)
+            return await CPUExecutor._submit(CPUExecutor.get_light_executor(), call, timeout)
+
+    @staticmethod
+    def shutdown():
+        if CPUExecutor._executor is not None:
+            CPUExecutor._executor.shutdown(wait=False, cancel_futures=True)
+            CPUExecutor._executor = None
+            CPUExecutor._kind = None
+        if CPUExecutor._light_executor is not None:
+            CPUExecutor._light_executor.shutdown(wait=False, cancel_futures=True)
+            CPUExecutor._light_executor = None
+            CPUExecutor._light_kind = None
+
+    @staticmethod
+    def stats() -> dict:
+        return {
+            "kind": CPUExecutor._kind,
+            "light_kind": CPUExecutor._light_kind,
+            "workers": settings.CPU_EXECUTOR_WORKERS,
+            "light_workers": settings.CPU_LIGHT_WORKERS,
+            "in_flight": CPUExecutor._in_flight,
+            "max_queue": settings.CPU_EXECUTOR_MAX_QUEUE,
+        }
@@ -1,9 +1,40 @@
 import os
+import uuid
 import hashlib
+import aiofiles
 from datetime import datetime
 from pathlib import Path
 from fastapi import UploadFile, HTTPException, status
 from app.config import settings
+from app.utils.receipt_backends import ReceiptBackends
+
+
+class StoredUpload:
+    """
+    A receipt that has been streamed into the upload directory but is not yet
+    linked to an expense. Until mark_attached() is called, discard() removes
+    the file so rejected or failed submissions leave nothing behind.
+    """
+    
+    def __init__(self, file_path: str, file_name: str, file_hash: str, file_size: int, file_type: str):
+        self.file_path = file_path  # relative to UPLOAD_DIR, as stored on the attachment
+        self.file_name = file_name
+        self.file_hash = file_hash
+        self.file_size = file_size
+        self.file_type = file_type
+        self.attached = False
+    
+    @property
+    def full_path(self) -> str:
+        return FileHandler.get_full_path(self.file_path)
+    
+    def mark_attached(self):
+        self.attached = True
+    
+    def discard(self):
+        if not self.attached:
+            FileHandler.delete_file(self.file_path)
+
 
 class FileHandler:
     
@@ -66,6 +97,80 @@ class FileHandler:
         relative_path = os.path.join(today, unique_filename)
         return relative_path, file_hash.hexdigest(), file_size, file_extension
     
+    @staticmethod
+    async def ingest_upload(file: UploadFile) -> "StoredUpload":
+        """
+        Stream an upload straight to its final location in the upload directory.
+        The size limit is enforced and the SHA-256 computed while reading, so the
+        bytes are written once and never re-read; a partial file is removed on failure.
+        The file type is sniffed from the content (ReceiptBackends) and files no
+        receipt parser supports are rejected with 400.
+        Returns: StoredUpload (path, hash, size, sniffed type) shared by every later stage
+        """
+        file_extension = file.filename.split('.')[-1].lower()
+        if file_extension not in settings.ALLOWED_FILE_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File type '{file_extension}' not allowed. Allowed: {', '.join(settings.ALLOWED_FILE_TYPES)}"
+            )
+        
+        today = datetime.utcnow().strftime("%Y-%m")
+        upload_dir = os.path.join(settings.UPLOAD_DIR, today)
+        Path(upload_dir).mkdir(parents=True, exist_ok=True)
+        
+        # The expense does not exist yet, so name the file uniquely instead of by expense id
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        unique_filename = f"receipt_{timestamp}_{uuid.uuid4().hex[:12]}.{file_extension}"
+        full_path = os.path.join(upload_dir, unique_filename)
+        
+        file_hash = hashlib.sha256()
+        file_size = 0
+        try:
+            # aiofiles runs each write on a thread, so other requests keep being served
+            async with aiofiles.open(full_path, "wb") as f:
+                while True:
+                    chunk = await file.read(64 * 1024)
+                    if not chunk:
+                        break
+                    file_size += len(chunk)
+                    if file_size > settings.MAX_FILE_SIZE:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"File size exceeds {settings.MAX_FILE_SIZE / 1024 / 1024}MB limit"
+                        )
+                    await f.write(chunk)
+                    file_hash.update(chunk)
+        except BaseException:
+            if os.path.exists(full_path):
+                os.remove(full_path)
+            raise
+        
+        # Route by content, not by name: a renamed JPEG is OCR'd rather than parsed as
+        # a PDF, and files no parser can read are rejected before any extraction
+        detected = ReceiptBackends.sniff(full_path)
+        reason = ReceiptBackends.unsupported_reason(detected)
+        if reason:
+            os.remove(full_path)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=reason
+            )
+        if ReceiptBackends.get(file_extension) is not ReceiptBackends.get(detected):
+            print(f"[UPLOAD] {file.filename}: content is {detected}, not {file_extension}")
+        
+        return StoredUpload(
+            file_path=os.path.join(today, unique_filename),
+            file_name=file.filename,
+            file_hash=file_hash.hexdigest(),
+            file_size=file_size,
+            file_type=detected
+        )
+    
+    @staticmethod
+    def get_full_path(file_path: str) -> str:
+        """Resolve a stored (relative) attachment path inside the upload directory"""
+        return os.path.join(settings.UPLOAD_DIR, file_path)
+    
     @staticmethod
     def delete_file(file_path: str) -> bool:
         """Delete file from disk"""
@@ -98,44 +203,23 @@ class FileHandler:
     @staticmethod
     def extract_text_from_file(file_path: str) -> str:
         """
-        Extract text from PDF or image files
+        Extract text from a stored receipt (any format ReceiptBackends supports)
+        The parser is chosen from the sniffed content, not the file name.
         Returns: Extracted text as string
         """
         try:
+            from app.utils.improved_receipt_extractor import ImprovedReceiptExtractor
+            
             full_path = os.path.join(settings.UPLOAD_DIR, file_path)
             
             if not os.path.exists(full_path):
                 return ""
             
-            file_extension = file_path.split('.')[-1].lower()
-            
-            # Extract from PDF
-            if file_extension == 'pdf':
-                try:
-                    import pdfplumber
-                    text = ""
-                    with pdfplumber.open(full_path) as pdf:
-                        for page in pdf.pages:
-                            text += page.extract_text() or ""
-                    return text
-                except Exception as e:
-                    print(f"Error extracting PDF text: {e}")
-                    return ""
-            
-            # Extract from images using OCR
-            elif file_extension in ['jpg', 'jpeg', 'png', 'gif', 'bmp']:
-                try:
-                    import pytesseract
-                    from PIL import Image
-                    
-                    img = Image.open(full_path)
-                    text = pytesseract.image_to_string(img)
-                    return text
-                except Exception as e:
-                    print(f"Error extracting image text: {e}")
-                    return ""
+            detected = ReceiptBackends.sniff(full_path)
+            if ReceiptBackends.get(detected) is None:
+                return ""
             
-            return ""
+            return ImprovedReceiptExtractor.extract_document(full_path, detected).text
         except Exception as e:
             print(f"Error in extract_text_from_file: {e}")
             return ""
\ No newline at end of file
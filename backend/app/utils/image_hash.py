@@ -0,0 +1,106 @@
+"""
+Perceptual hashes of receipt images for near-duplicate detection.
+
+The SHA-256 file hash only matches byte-identical files, so re-photographing,
+re-compressing or slightly cropping the same paper receipt gets past it. A
+difference hash (dHash) is taken from the image reduced to a 9x8 grid of block
+means: each bit records whether a cell is brighter than its right neighbour, so
+resolution, JPEG quality and moderate lighting changes leave most bits intact
+and two photos of the same receipt differ in only a few bits (Hamming
+distance). Images are hashed as uploaded; scanned PDFs by their first page
+rasterized at low resolution. PDFs with a text layer are not hashed: mostly
+white pages of text all reduce to nearly the same grid, and their text is
+compared instead (TextMinHash). Hashes are stored per attachment
+(ExpenseAttachment.image_hash) and indexed by ImageHashIndexService.
+
+A hash match is a lead, not proof: receipts printed on one template also hash
+alike, so ExpenseCrossCheckService only flags them for review.
+
+Changing GRID_WIDTH/GRID_HEIGHT or the reduction invalidates every stored hash.
+"""
+
+from typing import Optional
+from app.utils.lazy_backends import LazyBackends
+from app.utils.receipt_backends import ReceiptBackends
+
+IMAGE_SUPPORT = LazyBackends.available("PIL")
+NUMPY_SUPPORT = LazyBackends.available("numpy")
+PDF_SUPPORT = LazyBackends.available("pdfplumber")
+
+
+class ReceiptImageHash:
+    # 9x8 cells give 8 horizontal gradients per row: a 64-bit hash
+    GRID_WIDTH = 9
+    GRID_HEIGHT = 8
+    BITS = (GRID_WIDTH - 1) * GRID_HEIGHT
+    # Decode size before block averaging (JPEG draft mode makes this cheap)
+    DECODE_SIDE = 256
+    PDF_RASTER_DPI = 36
+
+    @staticmethod
+    def supports(file_type: str) -> bool:
+        backend = ReceiptBackends.get(file_type)
+        if backend is None or not (IMAGE_SUPPORT and NUMPY_SUPPORT):
+            return False
+        return backend.parser == "_extract_image" or (backend.parser == "_extract_pdf" and PDF_SUPPORT)
+
+    @staticmethod
+    def _load_gray(file_path: str, file_type: str):
+        """Grayscale PIL image of the receipt (first page of a scanned PDF), longest side about DECODE_SIDE; None for PDFs with text"""
+        Image = LazyBackends.load("PIL.Image")
+        ImageOps = LazyBackends.load("PIL.ImageOps")
+
+        if ReceiptBackends.get(file_type).parser == "_extract_pdf":
+            with LazyBackends.load("pdfplumber").open(file_path) as pdf:
+                if not pdf.pages or pdf.pages[0].chars:
+                    return None
+                image = pdf.pages[0].to_image(resolution=ReceiptImageHash.PDF_RASTER_DPI).original
+        else:
+            image = Image.open(file_path)
+            if image.format == "JPEG":
+                image.draft("L", (ReceiptImageHash.DECODE_SIDE, ReceiptImageHash.DECODE_SIDE))
+            # Phone photos store their orientation in EXIF
+            image = ImageOps.exif_transpose(image)
+        image = image.convert("L")
+        if max(image.size) > ReceiptImageHash.DECODE_SIDE:
+            image.thumbnail((ReceiptImageHash.DECODE_SIDE, ReceiptImageHash.DECODE_SIDE), Image.Resampling.BOX)
+        return image
+
+    @staticmethod
+    def dhash(gray) -> Optional[int]:
+        """64-bit difference hash of a 2-D grayscale array"""
+        np = LazyBackends.load("numpy")
+        pixels = np.asarray(gray, dtype=np.float64)
+        height, width = pixels.shape
+        if height < ReceiptImageHash.GRID_HEIGHT or width < ReceiptImageHash.GRID_WIDTH:
+            return None
+
+        # Mean of each grid cell (area average, so noise and JPEG artefacts cancel out)
+        row_edges = np.linspace(0, height, ReceiptImageHash.GRID_HEIGHT + 1).astype(np.int64)[:-1]
+        col_edges = np.linspace(0, width, ReceiptImageHash.GRID_WIDTH + 1).astype(np.int64)[:-1]
+        sums = np.add.reduceat(np.add.reduceat(pixels, row_edges, axis=0), col_edges, axis=1)
+        counts = np.outer(np.diff(np.append(row_edges, height)), np.diff(np.append(col_edges, width)))
+        cells = sums / counts
+
+        bits = (cells[:, 1:] > cells[:, :-1]).ravel()
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    @staticmethod
+    def for_file(file_path: str, file_type: str) -> Optional[str]:
+        """Hex dHash of an image or scanned PDF receipt, or None when it cannot (or should not) be hashed"""
+        if not ReceiptImageHash.supports(file_type):
+            return None
+        try:
+            gray = ReceiptImageHash._load_gray(file_path, file_type)
+            value = ReceiptImageHash.dhash(gray) if gray is not None else None
+        except Exception as e:
+            print(f"[IMAGE-HASH] Could not hash {file_path}: {e}")
+            return None
+        if value is None:
+            return None
+        return f"{value:0{ReceiptImageHash.BITS // 4}x}"
+
+    @staticmethod
+    def distance(hash1: str, hash2: str) -> int:
+        """Hamming distance between two hex hashes"""
+        return bin(int(hash1, 16) ^ int(hash2, 16)).count("1")
@@ -1,71 +1,22 @@
 import re
 import os
+from collections import deque
 from typing import Optional, Tuple, List
 from pathlib import Path
 from decimal import Decimal
+from app.config import settings
+from app.utils.lazy_backends import LazyBackends
+from app.utils.ocr_pool import OCRPool
+from app.utils.receipt_backends import ReceiptBackends
+from app.utils.receipt_document import AmountCandidate, ReceiptDocument
 
-try:
-    import pdfplumber
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
-
-try:
-    from PIL import Image
-    IMAGE_SUPPORT = True
-except ImportError:
-    IMAGE_SUPPORT = False
-
-try:
-    import pytesseract
-    import os
-    import platform
-    PYTESSERACT_SUPPORT = True
-    
-    # Auto-configure Tesseract path based on OS
-    if platform.system() == 'Windows':
-        # Try common Windows installation paths
-        tesseract_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-        ]
-        for path in tesseract_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.pytesseract_cmd = path
-                break
-    # For Linux/Mac, it should be in PATH automatically
-except ImportError:
-    PYTESSERACT_SUPPORT = False
-except Exception as e:
-    PYTESSERACT_SUPPORT = False
-
-try:
-    from openpyxl import load_workbook
-    EXCEL_SUPPORT = True
-except ImportError:
-    EXCEL_SUPPORT = False
-
-try:
-    from docx import Document
-    DOCX_SUPPORT = True
-except ImportError:
-    DOCX_SUPPORT = False
-    if platform.system() == 'Windows':
-        # Try common Windows installation paths
-        tesseract_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-        ]
-        for path in tesseract_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.pytesseract_cmd = path
-                break
-    # For Linux/Mac, it should be in PATH automatically
-except ImportError:
-    PYTESSERACT_SUPPORT = False
-except Exception as e:
-    PYTESSERACT_SUPPORT = False
-    print(f"Warning: Could not configure pytesseract: {e}")
+# Parsing libraries are imported on first use (see LazyBackends); importing this
+# module only checks that they are installed
+PDF_SUPPORT = LazyBackends.available("pdfplumber")
+IMAGE_SUPPORT = LazyBackends.available("PIL")
+PYTESSERACT_SUPPORT = LazyBackends.available("pytesseract")
+EXCEL_SUPPORT = LazyBackends.available("openpyxl")
+DOCX_SUPPORT = LazyBackends.available("docx")
 
 
 class ImprovedReceiptExtractor:
@@ -74,33 +25,50 @@ class ImprovedReceiptExtractor:
     Supports PDF and image files with multiple fallback strategies.
     """
     
-    # Comprehensive patterns for Indian currency amounts
-    AMOUNT_PATTERNS = [
-        # TIER 1: EXPLICIT RUPEE SYMBOL - HIGHEST PRIORITY (must have ₹ or Rs)
-        (r'₹\s*([\d,]+\.\d{1,2})', 'rupee_symbol_decimal'),  # ₹156.00 / ₹156.0
-        (r'₹\s*([1-9]\d{0,6}(?:\.\d{1,2})?)', 'rupee_symbol'),  # ₹156
-        (r'Rs\.?\s*([\d,]+\.\d{1,2})', 'rs_abbrev_decimal'),  # Rs156.00 / Rs156.0
-        (r'Rs\.?\s*([1-9]\d{0,6}(?:\.\d{1,2})?)', 'rs_abbrev'),  # Rs156
-        (r'INR\s*([\d,]+\.\d{1,2})', 'inr_code_decimal'),  # INR 156.00 / INR 156.0
-        (r'INR\s*([1-9]\d{0,6}(?:\.\d{1,2})?)', 'inr_code'),  # INR 156
-        
-        # TIER 2: TOTAL/AMOUNT KEYWORDS WITH RUPEE (must have keyword + currency indicator)
-        (r'(?:total\s+(?:amount|paid|fare|price)|amount\s+paid|final\s+amount|grand\s+total|net\s+amount|bill\s+amount|sub\s+total)[\s:]*₹\s*([\d,]+\.?\d*)', 'total_rupee_final'),
-        (r'(?:total|amount|price|cost|due|payable|net|fare|bill)[\s:]*₹\s*([\d,]+\.?\d*)', 'total_rupee'),
+    # Bump whenever extraction logic or patterns change; cached results of
+    # other versions are then ignored (see ExtractionCacheService)
+    EXTRACTOR_VERSION = "8"
+    
+    # Keywords that label the amount actually paid (tier 1 when a currency follows)
+    FINAL_TOTAL_KEYWORDS = (
+        r'grand\s*total|net\s+total|sub\s*total|total\s+(?:amount|paid|fare|price)|'
+        r'amount\s+paid|final\s+amount|net\s+amount|bill\s+amount'
+    )
+    # Other amount keywords (tier 2 when a currency follows)
+    AMOUNT_KEYWORDS = r'total|amount|price|cost|due|payable|net|fare|paid|bill|sum|charge'
 
-        # TIER 2B: TOTAL KEYWORDS WITHOUT CURRENCY (common in tables like "Total 1349")
-        (r'(?:grand\s+total|net\s+total|total)\s*[:\-]?\s*([1-9]\d{0,6}(?:\.\d{1,2})?)', 'total_no_currency'),
-        
-        # TIER 3: TEXT KEYWORDS + CURRENCY WORDS (very explicit)
-        (r'(?:total|amount|price|cost|due|payable|fare|paid|bill|sum|charge)\s+(?:is|:|=)?\s*(?:Rs|rupees?|INR)\s*[\.]?\s*([\d,]+\.\d{1,2})', 'text_total'),
-        (r'rupees?\s+([\d,]+\.\d{1,2})', 'rupees_text'),
-        
-        # TIER 4: AMOUNTS STRICTLY WITH CURRENCY SYMBOL NEARBY
-        (r'([\d,]+\.\d{1,2})\s*(?:Rs|INR|₹)', 'table_amount'),
-        
-        # NOTE: All patterns without explicit currency context removed
-        # This prevents UPI IDs and other numbers from being extracted
-    ]
+    # Single-pass amount scanner for Indian currency amounts, run over lower-cased
+    # text. Each match is a number together with what labels it: an amount keyword
+    # (optionally followed by a currency marker: ₹, Rs, INR, rupees), a currency
+    # marker alone, or a currency marker right after the number ("1,200.00 INR").
+    # Bare numbers (UPI IDs, phone numbers, quantities) are skipped by the regex
+    # engine itself; _scan_amounts turns each match into one typed AmountCandidate.
+    # The branches start with literals so the engine can skip ahead quickly; word
+    # boundaries are checked in _scan_amounts instead of with lookbehinds.
+    _CURRENCY = r'₹|rs\.?|inr|rupees?'
+    _NUMBER = r'\d(?:[\d,]*\d)?(?:\.\d+)?'
+    AMOUNT_SCANNER = re.compile(
+        r'(?P<keyword>' + FINAL_TOTAL_KEYWORDS + '|' + AMOUNT_KEYWORDS + r')[\s:=\-]*(?:is\s+)?'
+        r'(?:(?P<keyword_currency>' + _CURRENCY + r')\s*)?(?P<keyword_number>' + _NUMBER + r')'
+        r'|(?P<currency>' + _CURRENCY + r')\s*(?P<currency_number>' + _NUMBER + r')'
+        r'|(?P<number>' + _NUMBER + r')(?=\s*(?:rs|inr|₹))'
+    )
+    _CURRENCY_SUFFIX = re.compile(r'\s*(?:rs|inr|₹)')
+    _FINAL_KEYWORD = re.compile(r'(?:' + FINAL_TOTAL_KEYWORDS + r')$')
+    _CURRENCY_PATTERNS = {'₹': 'rupee_symbol', 'rs': 'rs_abbrev', 'inr': 'inr_code', 'rupee': 'rupees_text', 'rupees': 'rupees_text'}
+    _NON_AMOUNT_CHARS = re.compile(r'[^\d.,]')
+    
+    # PDF pages worth running table extraction on, and the total rows in those tables
+    _TOTAL_HINT = re.compile(r'total|net\s+amount|amount\s+(?:paid|payable|due)', re.IGNORECASE)
+    _TABLE_TOTAL_ROW = re.compile(r'\b(total|grand\s+total|net\s+total)\b', re.IGNORECASE)
+    _TABLE_NUMBER = re.compile(r'([1-9]\d{0,6}(?:\.\d{2})?)')
+    
+    # Spreadsheet rows kept per sheet: the first rows (headers, dates) and a rolling
+    # window of the latest ones, so memory stays bounded on exports of any length
+    _SHEET_HEAD_ROWS = 200
+    _SHEET_TAIL_ROWS = 800
+    # Rows still read after a total row before the sheet is considered done
+    _TOTAL_LOOKAHEAD_ROWS = 5
     
     @staticmethod
     def _normalize_amount(amount_str: str) -> Optional[float]:
@@ -115,7 +83,7 @@ class ImprovedReceiptExtractor:
         amount_str = amount_str.strip()
         
         # Remove common unwanted characters but keep decimal points and commas
-        amount_str = re.sub(r'[^\d.,]', '', amount_str)
+        amount_str = ImprovedReceiptExtractor._NON_AMOUNT_CHARS.sub('', amount_str)
         
         # Handle empty string after cleanup
         if not amount_str:
@@ -180,353 +148,491 @@ class ImprovedReceiptExtractor:
         return None
     
     @staticmethod
-    def extract_from_pdf(file_path: str) -> Tuple[Optional[float], str, str]:
+    def _inside_word(text: str, index: int) -> bool:
+        return index > 0 and text[index - 1].isalpha()
+    
+    @staticmethod
+    def _scan_amounts(text: str, debug: bool = False) -> List[AmountCandidate]:
+        """Scan the text once and return a typed candidate for every labelled amount."""
+        candidates: List[AmountCandidate] = []
+        text = text.lower()
+        inside_word = ImprovedReceiptExtractor._inside_word
+        currency_suffix = ImprovedReceiptExtractor._CURRENCY_SUFFIX.match
+        for match in ImprovedReceiptExtractor.AMOUNT_SCANNER.finditer(text):
+            # lastgroup is the number group of the branch that matched
+            number_group = match.lastgroup
+            keyword = currency = None
+            if number_group == 'keyword_number':
+                keyword, currency = match.group('keyword', 'keyword_currency')
+                # Keywords only count as whole words ("net" in "cabinet")
+                keyword = None if inside_word(text, match.start()) else ' '.join(keyword.split())
+            elif number_group == 'currency_number':
+                currency = match.group('currency')
+                # Rs/INR only count as whole words ("rs" in "hours")
+                if currency != '₹' and inside_word(text, match.start()):
+                    currency = None
+            if currency:
+                currency = currency.rstrip('.')
+            has_suffix = number_group == 'number' or currency_suffix(text, match.end()) is not None
+
+            if currency or has_suffix:
+                if keyword and ImprovedReceiptExtractor._FINAL_KEYWORD.match(keyword):
+                    tier, pattern = 1, 'total_rupee_final'
+                elif keyword:
+                    tier, pattern = 2, 'total_rupee'
+                elif currency:
+                    tier, pattern = 3, ImprovedReceiptExtractor._CURRENCY_PATTERNS[currency]
+                else:
+                    tier, pattern = 3, 'table_amount'
+            elif keyword and 'total' in keyword:
+                tier, pattern = None, 'total_no_currency'
+            else:
+                continue
+
+            amount = ImprovedReceiptExtractor._normalize_amount(match.group(number_group))
+            if amount and amount >= 10:  # Filter out very small numbers
+                candidates.append(AmountCandidate(
+                    amount, pattern, tier, keyword, currency or ('suffix' if has_suffix else None), match.start(number_group)
+                ))
+
+        if debug:
+            print(f"[DEBUG] Amount scan: {len(candidates)} candidates "
+                  f"{[(c.amount, c.pattern) for c in candidates[:10]]}")
+        return candidates
+    
+    @staticmethod
+    def _select_amount(candidates: List[AmountCandidate]) -> Tuple[float, str]:
         """
-        Extract amount from PDF file using pdfplumber.
-        Returns: (amount, confidence, status_message)
+        Pick the final amount from candidates by tier: the largest amount of the
+        best tier present (the final total is usually the largest labelled amount).
+        Returns: (amount, confidence)
+        """
+        for tier, confidence in ((1, "high"), (2, "high"), (3, "medium")):
+            amounts = [c.amount for c in candidates if c.tier == tier]
+            if amounts:
+                return max(amounts), confidence
+        # Fall back to largest amount found
+        return max(c.amount for c in candidates), "very_low"
+    
+    @staticmethod
+    def _finish(document: ReceiptDocument, source: str, not_found_label: str) -> Tuple[Optional[float], str, str]:
+        """Scan the document's normalized text and record the selected amount on it."""
+        document.amount_candidates = ImprovedReceiptExtractor._scan_amounts(
+            document.normalized_text, debug=(document.file_type == 'pdf')
+        )
+        if document.amount_candidates:
+            final_amount, confidence = ImprovedReceiptExtractor._select_amount(document.amount_candidates)
+            return ImprovedReceiptExtractor._result(document, final_amount, confidence, f"{source} successful: ₹{final_amount:.2f}")
+        return ImprovedReceiptExtractor._result(document, None, "low", f"No amount pattern found in {not_found_label}")
+    
+    @staticmethod
+    def _result(document: ReceiptDocument, amount: Optional[float], confidence: str, note: str) -> Tuple[Optional[float], str, str]:
+        document.amount = amount
+        document.confidence = confidence
+        document.note = note
+        return amount, confidence, note
+    
+    @staticmethod
+    def _collect_table_total(document: ReceiptDocument, row: list):
+        """Record the numbers of a PDF table row labelled total/grand total/net total"""
+        row_text = " ".join([c for c in row if isinstance(c, str)])
+        if row_text and ImprovedReceiptExtractor._TABLE_TOTAL_ROW.search(row_text):
+            for cell in row:
+                if cell and isinstance(cell, str):
+                    match = ImprovedReceiptExtractor._TABLE_NUMBER.search(cell.replace(',', ''))
+                    if match:
+                        try:
+                            value = float(match.group(1))
+                            if value >= 10:
+                                document.table_totals.append(value)
+                        except ValueError:
+                            pass
+    
+    @staticmethod
+    def read_pdf_pages(file_path: str, indexes: List[int]) -> List[str]:
+        """Text of the given PDF pages ("" for pages that cannot be read)"""
+        texts = [""] * len(indexes)
+        if not PDF_SUPPORT or not indexes:
+            return texts
+        try:
+            with LazyBackends.load("pdfplumber").open(file_path) as pdf:
+                for position, index in enumerate(indexes):
+                    try:
+                        texts[position] = pdf.pages[index].extract_text() or ""
+                    except Exception:
+                        pass
+        except Exception as e:
+            print(f"[DEBUG] Could not read PDF pages {indexes}: {e}")
+        return texts
+    
+    @staticmethod
+    def _ocr_levels(setting: str) -> List[int]:
+        """Comma-separated resolutions from an OCR_*_LEVELS setting, lowest first"""
+        return sorted(int(value) for value in setting.split(",") if value.strip())
+    
+    @staticmethod
+    def _normalize_ocr_text(text: str) -> str:
+        """Collapse whitespace and undo common OCR misreads on receipts"""
+        text = (text or "").replace("\u00a0", " ")
+        text = re.sub(r"\s+", " ", text)
+        # Some receipts OCR ₹ as 'n' or similar. Map a standalone 'n' before digits to ₹.
+        return re.sub(r"(?<!\w)n\s*(?=\d)", "₹", text, flags=re.IGNORECASE)
+    
+    @staticmethod
+    def _has_currency_total(text: str) -> bool:
+        """Whether OCR text contains a keyword-labelled amount with a currency marker (tier 1/2)"""
+        candidates = ImprovedReceiptExtractor._scan_amounts(ImprovedReceiptExtractor._normalize_ocr_text(text))
+        return any(candidate.tier in (1, 2) for candidate in candidates)
+    
+    @staticmethod
+    def _ocr_pdf_pass(pdf, indexes: List[int], dpi: int) -> dict:
+        """
+        Render the given pages at dpi and OCR them on the pool. Each page is submitted
+        as soon as it is rendered, so pages are read in parallel while the next ones
+        render; at most OCRPool.size() pages are in flight, which bounds both the
+        engines one extraction keeps busy and the rendered pages held in memory.
+        Returns {page index: (text, confidence)} for the pages that were read.
+        """
+        from app.utils.ocr_preprocessor import OCRPreprocessor
+        
+        results = {}
+        
+        def collect(index, future):
+            try:
+                text, confidence = future.result(timeout=settings.CPU_TASK_TIMEOUT_SECONDS)
+                results[index] = (text or "", confidence)
+            except Exception as e:
+                print(f"[DEBUG] OCR of PDF page {index + 1} at {dpi} dpi failed: {e}")
+        
+        in_flight = OCRPool.size()
+        pending = deque()
+        for index in indexes:
+            if len(pending) >= in_flight:
+                collect(*pending.popleft())
+            try:
+                # pdfium is not thread-safe, so rendering stays on this thread
+                image = pdf.pages[index].to_image(resolution=dpi).original.convert("L")
+                pending.append((index, OCRPool.submit(OCRPreprocessor.clean(image), scored=True)))
+            except Exception as e:
+                print(f"[DEBUG] OCR of PDF page {index + 1} at {dpi} dpi not started: {e}")
+        while pending:
+            collect(*pending.popleft())
+        return results
+    
+    @staticmethod
+    def _ocr_pdf_pages(pdf, document: ReceiptDocument) -> List[Tuple[int, str]]:
+        """
+        OCR a PDF without a text layer, last page first, up to OCR_PDF_MAX_PAGES pages.
+        The first pass renders at the lowest of OCR_PDF_DPI_LEVELS; pages read with
+        low word confidence are rendered again at the next level, and so is the last
+        page while no currency-tagged total has been read. The highest level a kept
+        page needed is recorded on the document. Returns (page index, text) in page order.
         """
+        indexes = list(range(len(pdf.pages) - 1, -1, -1))[:max(1, settings.OCR_PDF_MAX_PAGES)]
+        best = {}
+        todo = indexes
+        for dpi in ImprovedReceiptExtractor._ocr_levels(settings.OCR_PDF_DPI_LEVELS):
+            for index, (text, confidence) in ImprovedReceiptExtractor._ocr_pdf_pass(pdf, todo, dpi).items():
+                if index not in best or confidence > best[index][1]:
+                    best[index] = (text, confidence, dpi)
+            
+            todo = [index for index in indexes if index not in best or best[index][1] < settings.OCR_MIN_CONFIDENCE]
+            full_text = "\n".join(best[index][0] for index in sorted(best))
+            if indexes[0] not in todo and not ImprovedReceiptExtractor._has_currency_total(full_text):
+                todo.insert(0, indexes[0])
+            if not todo:
+                break
+        
+        ocr_pages = [(index, best[index][0]) for index in sorted(best) if len(best[index][0].strip()) > 10]
+        if ocr_pages:
+            kept = [best[index] for index, _ in ocr_pages]
+            document.ocr_level = f"{max(dpi for _, _, dpi in kept)}dpi"
+            document.ocr_confidence = round(sum(confidence for _, confidence, _ in kept) / len(kept), 1)
+        return ocr_pages
+    
+    @staticmethod
+    def _extract_pdf(document: ReceiptDocument, allow_ocr: bool = True) -> Tuple[Optional[float], str, str]:
+        """Parse a PDF into the document (pages, tables, OCR fallback) and extract the amount."""
         if not PDF_SUPPORT:
-            return None, "none", "PDF library not installed"
+            return ImprovedReceiptExtractor._result(document, None, "none", "PDF library not installed")
         
-        if not os.path.exists(file_path):
-            return None, "none", f"File not found: {file_path}"
+        if not os.path.exists(document.file_path):
+            return ImprovedReceiptExtractor._result(document, None, "none", f"File not found: {document.file_path}")
         
         try:
-            amounts_with_patterns: List[Tuple[float, str]] = []
-            
-            with pdfplumber.open(file_path) as pdf:
-                full_text = ""
-                page_count = 0
-                table_totals: List[float] = []
+            with LazyBackends.load("pdfplumber").open(document.file_path) as pdf:
+                page_count = len(pdf.pages)
+                # Walk pages from the end: the grand total is almost always on the last
+                # page of long folios/invoices. Pages before the one that settles the
+                # amount stay unread (None) until a later stage asks for the full text
+                document.pages = [None] * page_count
+                scanned_text = {}
                 
-                for page in pdf.pages:
-                    page_count += 1
-                    # Extract text with better formatting
+                for index in range(page_count - 1, -1, -1):
+                    page = pdf.pages[index]
                     page_text = page.extract_text() or ""
-                    full_text += page_text + "\n"
+                    document.pages[index] = page_text
+                    page_parts = [page_text]
+                    tables_found = len(document.table_totals)
                     
-                    # Also try to extract tables separately for better amount detection
-                    try:
-                        tables = page.extract_tables()
-                        for table in tables:
-                            for row in table:
-                                row_text = " ".join([c for c in row if isinstance(c, str)])
-                                if row_text and re.search(r'\b(total|grand\s+total|net\s+total)\b', row_text, re.IGNORECASE):
-                                    for cell in row:
-                                        if cell and isinstance(cell, str):
-                                            match = re.search(r'([1-9]\d{0,6}(?:\.\d{2})?)', cell.replace(',', ''))
-                                            if match:
-                                                try:
-                                                    value = float(match.group(1))
-                                                    if value >= 10:
-                                                        table_totals.append(value)
-                                                except ValueError:
-                                                    pass
-                                for cell in row:
-                                    if cell and isinstance(cell, str):
-                                        full_text += cell + " "
-                    except:
-                        pass
-
-                if table_totals:
-                    final_amount = max(table_totals)
-                    return final_amount, "high", f"PDF table total detected: ₹{final_amount:.2f}"
+                    # Table extraction is slow; only worth it on pages that mention a total
+                    if ImprovedReceiptExtractor._TOTAL_HINT.search(page_text):
+                        try:
+                            for table in page.extract_tables():
+                                document.tables.append(table)
+                                for row in table:
+                                    ImprovedReceiptExtractor._collect_table_total(document, row)
+                                    page_parts.extend(cell for cell in row if cell and isinstance(cell, str))
+                        except Exception:
+                            pass
+                    
+                    scanned_text[index] = " ".join(page_parts)
+                    if len(document.table_totals) > tables_found:
+                        break
+                    if any(candidate.tier == 1 for candidate in ImprovedReceiptExtractor._scan_amounts(scanned_text[index])):
+                        break
                 
-                # If no text extracted, try OCR as fallback
-                if not full_text.strip() and PYTESSERACT_SUPPORT:
+                full_text = "\n".join(scanned_text[index] for index in sorted(scanned_text))
+                
+                # If no text extracted, the PDF is a scan: OCR its pages instead
+                if not full_text.strip() and OCRPool.available():
+                    if not allow_ocr:
+                        document.needs_ocr = True
+                        return ImprovedReceiptExtractor._result(document, None, "none", "Scanned PDF: OCR required")
                     try:
-                        from PIL import Image
-                        import io
-                        
-                        # Convert PDF page to image for OCR
-                        for i, page in enumerate(pdf.pages[:3]):  # Try first 3 pages
-                            try:
-                                # Get page as image
-                                img = page.to_image(resolution=150)
-                                if img:
-                                    # OCR the image
-                                    import pytesseract
-                                    ocr_text = pytesseract.image_to_string(img)
-                                    if ocr_text and len(ocr_text.strip()) > 10:
-                                        full_text += f"\n[OCR_PAGE_{i+1}] {ocr_text}"
-                            except:
-                                continue
+                        ocr_pages = ImprovedReceiptExtractor._ocr_pdf_pages(pdf, document)
+                        if ocr_pages:
+                            document.pages = [text for _, text in ocr_pages]
+                            document.ocr_used = True
+                            full_text = "\n".join(f"[OCR_PAGE_{index + 1}] {text}" for index, text in ocr_pages)
                     except Exception as ocr_error:
                         print(f"[DEBUG] OCR fallback failed: {ocr_error}")
             
             # Clean up the extracted text
-            full_text = re.sub(r'\s+', ' ', full_text)  # Normalize whitespace
-            full_text = full_text.strip()
+            document.normalized_text = re.sub(r'\s+', ' ', full_text).strip()
             
-            # Debug: Print extracted text and metadata
-            print(f"[DEBUG] PDF processed: {page_count} pages")
-            print(f"[DEBUG] PDF extracted text: {full_text[:800]}...")
-            print(f"[DEBUG] Text length: {len(full_text)} characters")
+            if document.table_totals:
+                final_amount = max(document.table_totals)
+                return ImprovedReceiptExtractor._result(document, final_amount, "high", f"PDF table total detected: ₹{final_amount:.2f}")
             
-            # Search using all patterns
-            for pattern, pattern_name in ImprovedReceiptExtractor.AMOUNT_PATTERNS:
-                matches = re.finditer(pattern, full_text, re.IGNORECASE)
-                for match in matches:
-                    amount_str = match.group(1)
-                    print(f"[DEBUG] Found match: pattern={pattern_name}, amount_str={amount_str}")
-                    amount = ImprovedReceiptExtractor._normalize_amount(amount_str)
-                    if amount and amount >= 10:  # Filter out very small numbers
-                        # Additional filter: reject year-like amounts (1900-2099) from fallback pattern
-                        # This filters out dates that match the fallback pattern
-                        if not (1900 <= amount <= 2099 and pattern_name == 'fallback_number'):
-                            print(f"[DEBUG] Valid amount: {amount} from pattern {pattern_name}")
-                            amounts_with_patterns.append((amount, pattern_name))
-            
-            if amounts_with_patterns:
-                # Priority 1: Most specific patterns
-                final_patterns = [a for a, p in amounts_with_patterns if p == 'total_rupee_final']
-                high_priority = [a for a, p in amounts_with_patterns if p in ['total_rupee', 'text_total', 'generic_total']]
-                currency_priority = [a for a, p in amounts_with_patterns if p in ['rupee_symbol', 'rs_abbrev', 'inr_code', 'rupees_text', 'currency_context', 'table_amount']]
-                decimal_priority = [a for a, p in amounts_with_patterns if p in ['decimal_amount', 'large_number', 'amt_pattern', 'pay_pattern']]
-                
-                if final_patterns:
-                    # Use the most specific pattern
-                    final_amount = max(final_patterns)
-                    confidence = "high"
-                elif high_priority:
-                    # Among high priority amounts, pick the largest (final total)
-                    final_amount = max(high_priority)
-                    confidence = "high"
-                elif currency_priority:
-                    # Use amounts with clear currency indicators
-                    final_amount = max(currency_priority)
-                    confidence = "medium"
-                elif decimal_priority:
-                    # Use amounts with decimal places (likely real amounts)
-                    final_amount = max(decimal_priority)
-                    confidence = "low"
-                else:
-                    # Fall back to largest amount found
-                    final_amount = max(amounts_with_patterns, key=lambda x: x[0])[0]
-                    confidence = "very_low"
-                
-                return final_amount, confidence, f"PDF extraction successful: ₹{final_amount:.2f}"
+            # Debug: Print extracted text and metadata
+            print(f"[DEBUG] PDF processed: {len(scanned_text)} of {page_count} pages scanned (last page first)")
+            print(f"[DEBUG] PDF extracted text: {document.normalized_text[:800]}...")
+            print(f"[DEBUG] Text length: {len(document.normalized_text)} characters")
             
-            return None, "low", "No amount pattern found in PDF"
+            return ImprovedReceiptExtractor._finish(document, "PDF extraction", "PDF")
         
         except Exception as e:
-            return None, "none", f"PDF extraction error: {str(e)}"
+            return ImprovedReceiptExtractor._result(document, None, "none", f"PDF extraction error: {str(e)}")
     
     @staticmethod
-    def extract_from_image(file_path: str) -> Tuple[Optional[float], str, str]:
-        """
-        Extract amount from image using OCR (if available).
-        Without pytesseract, image extraction is not supported.
-        
-        Returns: (amount, confidence, status_message)
-        """
+    def _extract_image(document: ReceiptDocument) -> Tuple[Optional[float], str, str]:
+        """OCR an image into the document and extract the amount."""
         if not IMAGE_SUPPORT:
-            return None, "none", "Image library not installed"
+            return ImprovedReceiptExtractor._result(document, None, "none", "Image library not installed")
         
-        if not os.path.exists(file_path):
-            return None, "none", f"File not found: {file_path}"
+        if not os.path.exists(document.file_path):
+            return ImprovedReceiptExtractor._result(document, None, "none", f"File not found: {document.file_path}")
         
         if not PYTESSERACT_SUPPORT:
-            return None, "none", "OCR not available - pytesseract not installed. Install with: pip install pytesseract tesseract-ocr"
+            return ImprovedReceiptExtractor._result(document, None, "none", "OCR not available - pytesseract not installed. Install with: pip install pytesseract tesseract-ocr")
+        
+        from app.utils.ocr_preprocessor import OCRPreprocessor
         
         try:
-            from PIL import Image, ImageEnhance
-            
-            amounts_with_patterns: List[Tuple[float, str]] = []
-            
-            # Open and preprocess image
-            image = Image.open(file_path)
-            
+            # Fast pass on a small copy first; larger copies and the faint-print
+            # enhancement only when Tesseract is unsure or no total was read
+            sides = ImprovedReceiptExtractor._ocr_levels(settings.OCR_IMAGE_SIDE_LEVELS)
+            passes = [(f"{side}px", side) for side in sides] + [("enhanced", None)]
+            config = OCRPreprocessor.tesseract_config()
+            best = None
+            native_size = False
             try:
-                # First attempt: direct OCR
-                text = pytesseract.image_to_string(image)
+                for level, side in passes:
+                    if side is None:
+                        image = OCRPreprocessor.enhance(OCRPreprocessor.load(document.file_path))
+                    elif native_size:
+                        # The image was not downscaled, so a larger size would repeat the last pass
+                        continue
+                    else:
+                        image, grayscale = OCRPreprocessor.prepare(document.file_path, side)
+                        native_size = max(grayscale.size) < side
+                    text, confidence = OCRPool.image_to_scored_text(image, config=config)
+                    text = text or ""
+                    score = (ImprovedReceiptExtractor._has_currency_total(text), confidence)
+                    if best is None or score > best[0]:
+                        best = (score, level, text)
+                    if score[0] and confidence >= settings.OCR_MIN_CONFIDENCE:
+                        break
                 
-                # Second attempt: enhanced image if first didn't work
-                if not text or len(text.strip()) < 10:
-                    # Enhance contrast and convert to grayscale
-                    enhancer = ImageEnhance.Contrast(image.convert('L'))
-                    enhanced = enhancer.enhance(2)
-                    text = pytesseract.image_to_string(enhanced)
-
-                # Normalize OCR text (common OCR misreads on receipts)
-                text = text.replace("\u00a0", " ")
-                text = re.sub(r"\s+", " ", text)
-                # Some receipts OCR ₹ as 'n' or similar. Map a standalone 'n' before digits to ₹.
-                text = re.sub(r"(?<!\w)n\s*(?=\d)", "₹", text, flags=re.IGNORECASE)
+                (_, confidence), level, text = best
                 
-                # Search patterns in OCR text
-                for pattern, pattern_name in ImprovedReceiptExtractor.AMOUNT_PATTERNS:
-                    matches = re.finditer(pattern, text, re.IGNORECASE)
-                    for match in matches:
-                        amount_str = match.group(1)
-                        amount = ImprovedReceiptExtractor._normalize_amount(amount_str)
-                        if amount and amount >= 10:
-                            amounts_with_patterns.append((amount, pattern_name))
+                # Last resort: plain grayscale with automatic page segmentation
+                if len(text.strip()) < 10:
+                    text = OCRPool.image_to_string(OCRPreprocessor.load(document.file_path))
+                    level = "grayscale"
+                
+                document.pages = [text or ""]
+                document.ocr_used = True
+                document.ocr_level = level
+                document.ocr_confidence = round(confidence, 1)
+                document.normalized_text = ImprovedReceiptExtractor._normalize_ocr_text(text)
             
             except Exception as ocr_err:
-                return None, "low", f"OCR processing failed: {str(ocr_err)}. Make sure Tesseract is installed."
-            
-            if amounts_with_patterns:
-                # Priority 1: Most specific patterns
-                final_patterns = [a for a, p in amounts_with_patterns if p == 'total_rupee_final']
-                high_priority = [a for a, p in amounts_with_patterns if p in ['total_rupee', 'text_total', 'generic_total']]
-                currency_priority = [a for a, p in amounts_with_patterns if p in ['rupee_symbol', 'rs_abbrev', 'inr_code', 'rupees_text', 'currency_context', 'table_amount']]
-                decimal_priority = [a for a, p in amounts_with_patterns if p in ['decimal_amount', 'large_number', 'amt_pattern', 'pay_pattern']]
-                
-                if final_patterns:
-                    final_amount = max(final_patterns)
-                    confidence = "high"
-                elif high_priority:
-                    final_amount = max(high_priority)
-                    confidence = "high"
-                elif currency_priority:
-                    final_amount = max(currency_priority)
-                    confidence = "medium"
-                elif decimal_priority:
-                    final_amount = max(decimal_priority)
-                    confidence = "low"
-                else:
-                    final_amount = max(amounts_with_patterns, key=lambda x: x[0])[0]
-                    confidence = "very_low"
-                
-                return final_amount, confidence, f"Image OCR successful: ₹{final_amount:.2f}"
+                return ImprovedReceiptExtractor._result(document, None, "low", f"OCR processing failed: {str(ocr_err)}. Make sure Tesseract is installed.")
             
-            return None, "low", "No amount pattern found in image OCR"
+            return ImprovedReceiptExtractor._finish(document, "Image OCR", "image OCR")
         
         except Exception as e:
-            return None, "none", f"Image extraction error: {str(e)}"
+            return ImprovedReceiptExtractor._result(document, None, "none", f"Image extraction error: {str(e)}")
     
     @staticmethod
-    def extract_from_excel(file_path: str) -> Tuple[Optional[float], str, str]:
-        """
-        Extract amount from Excel file (.xlsx, .xls) using openpyxl.
-        
-        Returns: (amount, confidence, status_message)
-        """
+    def _extract_excel(document: ReceiptDocument) -> Tuple[Optional[float], str, str]:
+        """Read an Excel workbook into the document and extract the amount."""
         if not EXCEL_SUPPORT:
-            return None, "none", "Excel library not installed (openpyxl required)"
+            return ImprovedReceiptExtractor._result(document, None, "none", "Excel library not installed (openpyxl required)")
         
-        if not os.path.exists(file_path):
-            return None, "none", f"File not found: {file_path}"
+        if not os.path.exists(document.file_path):
+            return ImprovedReceiptExtractor._result(document, None, "none", f"File not found: {document.file_path}")
         
         try:
-            amounts_with_patterns: List[Tuple[float, str]] = []
-            
-            workbook = load_workbook(file_path, data_only=True)
-            full_text = ""
-            
-            for sheet_name in workbook.sheetnames:
-                worksheet = workbook[sheet_name]
-                for row in worksheet.iter_rows(values_only=True):
-                    for value in row:
-                        if value is None:
+            # Read-only mode streams rows from the file instead of building every cell
+            workbook = LazyBackends.load("openpyxl").load_workbook(document.file_path, read_only=True, data_only=True)
+            try:
+                for worksheet in workbook.worksheets:
+                    # Exported sheets often carry a wrong dimension record; read to the real end
+                    worksheet.reset_dimensions()
+                    head = []
+                    tail = deque(maxlen=ImprovedReceiptExtractor._SHEET_TAIL_ROWS)
+                    omitted = False
+                    rows_after_total = None
+                    for row in worksheet.iter_rows(values_only=True):
+                        values = [str(value) for value in row if value is not None]
+                        if not values:
                             continue
-                        full_text += str(value) + " "
-            
-            full_text = re.sub(r'\s+', ' ', full_text).strip()
-            
-            for pattern, pattern_name in ImprovedReceiptExtractor.AMOUNT_PATTERNS:
-                matches = re.finditer(pattern, full_text, re.IGNORECASE)
-                for match in matches:
-                    amount_str = match.group(1)
-                    amount = ImprovedReceiptExtractor._normalize_amount(amount_str)
-                    if amount and amount >= 10:
-                        amounts_with_patterns.append((amount, pattern_name))
+                        line = " ".join(values)
+                        if len(head) < ImprovedReceiptExtractor._SHEET_HEAD_ROWS:
+                            head.append(line)
+                        else:
+                            omitted = omitted or len(tail) == tail.maxlen
+                            tail.append(line)
+                        
+                        # Stop a few rows after the last total row (tax/grand total lines follow subtotals)
+                        if ImprovedReceiptExtractor._TABLE_TOTAL_ROW.search(line) and ImprovedReceiptExtractor._TABLE_NUMBER.search(line):
+                            rows_after_total = 0
+                        elif rows_after_total is not None:
+                            rows_after_total += 1
+                            if rows_after_total >= ImprovedReceiptExtractor._TOTAL_LOOKAHEAD_ROWS:
+                                break
+                    
+                    document.pages.append("\n".join(head + (["[rows omitted]"] if omitted else []) + list(tail)))
+                    if rows_after_total is not None:
+                        break
+            finally:
+                workbook.close()
             
-            if amounts_with_patterns:
-                final_patterns = [a for a, p in amounts_with_patterns if p == 'total_rupee_final']
-                high_priority = [a for a, p in amounts_with_patterns if p in ['total_rupee', 'text_total', 'generic_total']]
-                currency_priority = [a for a, p in amounts_with_patterns if p in ['rupee_symbol', 'rs_abbrev', 'inr_code', 'rupees_text', 'currency_context', 'table_amount']]
-                decimal_priority = [a for a, p in amounts_with_patterns if p in ['decimal_amount', 'large_number', 'amt_pattern', 'pay_pattern']]
-                
-                if final_patterns:
-                    final_amount = max(final_patterns)
-                    confidence = "high"
-                elif high_priority:
-                    final_amount = max(high_priority)
-                    confidence = "high"
-                elif currency_priority:
-                    final_amount = max(currency_priority)
-                    confidence = "medium"
-                elif decimal_priority:
-                    final_amount = max(decimal_priority)
-                    confidence = "low"
-                else:
-                    final_amount = max(amounts_with_patterns, key=lambda x: x[0])[0]
-                    confidence = "very_low"
-                
-                return final_amount, confidence, f"Excel extraction successful: ₹{final_amount:.2f}"
+            document.normalized_text = re.sub(r'\s+', ' ', " ".join(document.pages)).strip()
             
-            return None, "low", "No amount pattern found in Excel"
+            return ImprovedReceiptExtractor._finish(document, "Excel extraction", "Excel")
         
         except Exception as e:
-            return None, "none", f"Excel extraction error: {str(e)}"
+            return ImprovedReceiptExtractor._result(document, None, "none", f"Excel extraction error: {str(e)}")
     
     @staticmethod
-    def extract_from_word(file_path: str) -> Tuple[Optional[float], str, str]:
-        """
-        Extract amount from Word document (.docx) using python-docx.
-        
-        Returns: (amount, confidence, status_message)
-        """
+    def _extract_word(document: ReceiptDocument) -> Tuple[Optional[float], str, str]:
+        """Read a Word document (paragraphs and tables) into the document and extract the amount."""
         if not DOCX_SUPPORT:
-            return None, "none", "Word document library not installed (python-docx required)"
+            return ImprovedReceiptExtractor._result(document, None, "none", "Word document library not installed (python-docx required)")
         
-        if not os.path.exists(file_path):
-            return None, "none", f"File not found: {file_path}"
+        if not os.path.exists(document.file_path):
+            return ImprovedReceiptExtractor._result(document, None, "none", f"File not found: {document.file_path}")
         
         try:
-            amounts_with_patterns: List[Tuple[float, str]] = []
-            
-            doc = Document(file_path)
-            full_text = ""
-            
-            for paragraph in doc.paragraphs:
-                full_text += paragraph.text + " "
+            doc = LazyBackends.load("docx").Document(document.file_path)
+            parts = [paragraph.text for paragraph in doc.paragraphs]
             
             for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        full_text += (cell.text or "") + " "
-            
-            full_text = re.sub(r'\s+', ' ', full_text).strip()
+                rows = [[(cell.text or "") for cell in row.cells] for row in table.rows]
+                parts.extend(cell_text for cells in rows for cell_text in cells)
+                document.tables.append(rows)
             
-            for pattern, pattern_name in ImprovedReceiptExtractor.AMOUNT_PATTERNS:
-                matches = re.finditer(pattern, full_text, re.IGNORECASE)
-                for match in matches:
-                    amount_str = match.group(1)
-                    amount = ImprovedReceiptExtractor._normalize_amount(amount_str)
-                    if amount and amount >= 10:
-                        amounts_with_patterns.append((amount, pattern_name))
+            full_text = " ".join(parts)
+            document.pages = [full_text]
+            document.normalized_text = re.sub(r'\s+', ' ', full_text).strip()
             
-            if amounts_with_patterns:
-                final_patterns = [a for a, p in amounts_with_patterns if p == 'total_rupee_final']
-                high_priority = [a for a, p in amounts_with_patterns if p in ['total_rupee', 'text_total', 'generic_total']]
-                currency_priority = [a for a, p in amounts_with_patterns if p in ['rupee_symbol', 'rs_abbrev', 'inr_code', 'rupees_text', 'currency_context', 'table_amount']]
-                decimal_priority = [a for a, p in amounts_with_patterns if p in ['decimal_amount', 'large_number', 'amt_pattern', 'pay_pattern']]
-                
-                if final_patterns:
-                    final_amount = max(final_patterns)
-                    confidence = "high"
-                elif high_priority:
-                    final_amount = max(high_priority)
-                    confidence = "high"
-                elif currency_priority:
-                    final_amount = max(currency_priority)
-                    confidence = "medium"
-                elif decimal_priority:
-                    final_amount = max(decimal_priority)
-                    confidence = "low"
-                else:
-                    final_amount = max(amounts_with_patterns, key=lambda x: x[0])[0]
-                    confidence = "very_low"
-                
-                return final_amount, confidence, f"Word extraction successful: ₹{final_amount:.2f}"
-            
-            return None, "low", "No amount pattern found in Word document"
+            return ImprovedReceiptExtractor._finish(document, "Word extraction", "Word document")
         
         except Exception as e:
-            return None, "none", f"Word extraction error: {str(e)}"
+            return ImprovedReceiptExtractor._result(document, None, "none", f"Word extraction error: {str(e)}")
+    
+    @staticmethod
+    def extract_from_pdf(file_path: str) -> Tuple[Optional[float], str, str]:
+        """
+        Extract amount from PDF file using pdfplumber.
+        Returns: (amount, confidence, status_message)
+        """
+        return ImprovedReceiptExtractor._extract_pdf(ReceiptDocument(file_path, 'pdf'))
+    
+    @staticmethod
+    def extract_from_image(file_path: str) -> Tuple[Optional[float], str, str]:
+        """
+        Extract amount from image using OCR (if available).
+        Without pytesseract, image extraction is not supported.
+        
+        Returns: (amount, confidence, status_message)
+        """
+        return ImprovedReceiptExtractor._extract_image(ReceiptDocument(file_path, 'image'))
+    
+    @staticmethod
+    def extract_from_excel(file_path: str) -> Tuple[Optional[float], str, str]:
+        """
+        Extract amount from Excel file (.xlsx, .xls) using openpyxl.
+        
+        Returns: (amount, confidence, status_message)
+        """
+        return ImprovedReceiptExtractor._extract_excel(ReceiptDocument(file_path, 'xlsx'))
+    
+    @staticmethod
+    def extract_from_word(file_path: str) -> Tuple[Optional[float], str, str]:
+        """
+        Extract amount from Word document (.docx) using python-docx.
+        
+        Returns: (amount, confidence, status_message)
+        """
+        return ImprovedReceiptExtractor._extract_word(ReceiptDocument(file_path, 'docx'))
+    
+    @staticmethod
+    def extract_document(
+        file_path: str,
+        file_type: str,
+        file_hash: Optional[str] = None,
+        allow_ocr: bool = True
+    ) -> ReceiptDocument:
+        """
+        Parse a receipt once into a ReceiptDocument (text, pages, tables, amount
+        candidates, dates, hash) that every later stage can reuse.
+        
+        Args:
+            file_path: Full path to the receipt file
+            file_type: File type (pdf, xlsx, docx, jpg, png, etc.); uploads carry the
+                type sniffed from their content, see ReceiptBackends
+            file_hash: SHA-256 of the file if already known (computed lazily otherwise)
+            allow_ocr: False leaves a PDF without a text layer unread and sets
+                document.needs_ocr, so the caller can schedule the OCR elsewhere
+        """
+        document = ReceiptDocument(file_path, file_type, file_hash=file_hash)
+        backend = ReceiptBackends.get(document.file_type)
+        
+        if backend is None:
+            ImprovedReceiptExtractor._result(
+                document, None, "none",
+                f"Unsupported file type: {document.file_type}. Supported: PDF, Excel (xlsx), Word (docx), Images (jpg/png/gif/bmp/tiff/webp)"
+            )
+        elif backend.parser == "_extract_pdf":
+            ImprovedReceiptExtractor._extract_pdf(document, allow_ocr)
+        else:
+            getattr(ImprovedReceiptExtractor, backend.parser)(document)
+        return document
     
     @staticmethod
     def extract_amount(file_path: str, file_type: str) -> Tuple[Optional[float], str, str]:
@@ -547,18 +653,8 @@ class ImprovedReceiptExtractor:
             (extracted_amount, confidence_level, status_message)
             confidence_level: 'high', 'medium', 'low', 'none'
         """
-        file_type = file_type.lower()
-        
-        if file_type == 'pdf':
-            return ImprovedReceiptExtractor.extract_from_pdf(file_path)
-        elif file_type in ['xlsx', 'xls']:
-            return ImprovedReceiptExtractor.extract_from_excel(file_path)
-        elif file_type in ['docx', 'doc']:
-            return ImprovedReceiptExtractor.extract_from_word(file_path)
-        elif file_type in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'tiff', 'webp']:
-            return ImprovedReceiptExtractor.extract_from_image(file_path)
-        else:
-            return None, "none", f"Unsupported file type: {file_type}. Supported: PDF, Excel (xlsx/xls), Word (docx/doc), Images (jpg/png/gif/bmp/tiff/webp)"
+        document = ImprovedReceiptExtractor.extract_document(file_path, file_type)
+        return document.amount, document.confidence, document.note
     
     @staticmethod
     def check_capabilities() -> dict:
@@ -0,0 +1,79 @@
+"""
+Heavy receipt-parsing libraries, imported on first use.
+
+pdfplumber, Pillow, pytesseract, tesserocr, openpyxl, python-docx and NumPy
+together add a noticeable amount to startup time and to the memory of every
+process that imports them. Importing app.main only needs to know whether they
+are installed; the modules themselves are loaded by the first extraction that
+uses them, so workers (and test processes) that never read a receipt never
+pay for them.
+"""
+
+import importlib
+import importlib.util
+import os
+import platform
+import threading
+from typing import Callable, Dict
+
+
+def _configure_pytesseract(pytesseract):
+    """Point pytesseract at a standard Windows install (on Linux/Mac tesseract is on PATH)"""
+    if platform.system() == 'Windows':
+        for path in (
+            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+        ):
+            if os.path.exists(path):
+                pytesseract.pytesseract.tesseract_cmd = path
+                break
+
+
+class LazyBackends:
+    # Run once, right after a module is first imported
+    _SETUP: Dict[str, Callable] = {
+        "pytesseract": _configure_pytesseract,
+    }
+
+    _modules: Dict[str, object] = {}
+    _available: Dict[str, bool] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def available(name: str) -> bool:
+        """Whether a module is installed, without importing it"""
+        if name not in LazyBackends._available:
+            try:
+                LazyBackends._available[name] = importlib.util.find_spec(name) is not None
+            except (ImportError, ValueError):
+                LazyBackends._available[name] = False
+        return LazyBackends._available[name]
+
+    @staticmethod
+    def load(name: str):
+        """
+        Import a module on first use and return it.
+
+        Raises:
+            ImportError: the module is not installed or fails to import
+        """
+        module = LazyBackends._modules.get(name)
+        if module is not None:
+            return module
+        # No lock of ours is held across the import: the import system already
+        # serializes concurrent imports of one module, and a lock held for the
+        # seconds an import can take would be inherited, held, by any process
+        # forked meanwhile
+        module = importlib.import_module(name)
+        with LazyBackends._lock:
+            if name not in LazyBackends._modules:
+                setup = LazyBackends._SETUP.get(name)
+                if setup:
+                    setup(module)
+                LazyBackends._modules[name] = module
+            return LazyBackends._modules[name]
+
+    @staticmethod
+    def loaded() -> list:
+        """Names of the backends imported so far in this process"""
+        return sorted(LazyBackends._modules)
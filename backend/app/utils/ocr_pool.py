@@ -0,0 +1,180 @@
+"""
+Long-lived OCR workers.
+
+pytesseract starts a new tesseract process for every call, which reloads the
+language data each time (hundreds of milliseconds) and, under load, forks one
+process per image being read. OCRPool keeps a few worker threads per process
+instead, each holding a warm Tesseract engine (tesserocr, when installed) that
+is built on the worker's first job, recycled after OCR_WORKER_MAX_JOBS jobs and
+released after ENGINE_IDLE_SECONDS without work. Jobs go through a bounded
+queue, so bursts wait briefly and then fail instead of piling up.
+
+OCR runs inside the CPU executor's worker processes, one extraction per process
+at a time: an image receipt needs one engine, a scanned PDF one per page in
+flight. So the pool is sized per process (see size()) to split the machine's
+cores across the executor's processes, and scanned PDFs keep at most size()
+pages in flight; CPU_EXECUTOR_WORKERS x size() bounds the engines resident
+across the whole executor.
+
+Without tesserocr the workers fall back to pytesseract, which still caps the
+number of tesseract processes running at once.
+
+Scored jobs also return Tesseract's mean word confidence (0-100), which the
+extractor uses to decide whether a page needs another pass at higher resolution.
+"""
+
+import multiprocessing
+import os
+import queue
+import re
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+from app.config import settings
+from app.utils.lazy_backends import LazyBackends
+
+# Imported by the first worker that needs them (see LazyBackends)
+PYTESSERACT_SUPPORT = LazyBackends.available("pytesseract")
+TESSEROCR_SUPPORT = LazyBackends.available("tesserocr")
+
+
+class OCRPool:
+    # A worker that waits this long for a job releases its engine
+    ENGINE_IDLE_SECONDS = 300
+
+    _queue: Optional[queue.Queue] = None
+    _workers: List[threading.Thread] = []
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+
+    _PSM = re.compile(r"--psm\s+(\d+)")
+
+    @staticmethod
+    def available() -> bool:
+        return TESSEROCR_SUPPORT or PYTESSERACT_SUPPORT
+
+    @staticmethod
+    def size() -> int:
+        """
+        Worker threads (and at most that many engines) in this process: OCR_POOL_WORKERS,
+        or when it is 0 the cores divided across the CPU executor's worker processes
+        (all of them in the API process, which runs OCR only on the thread fallback)
+        """
+        if settings.OCR_POOL_WORKERS > 0:
+            return settings.OCR_POOL_WORKERS
+        processes = 1
+        if multiprocessing.parent_process() is not None:
+            processes = max(1, settings.CPU_EXECUTOR_WORKERS)
+        return max(1, min(settings.OCR_PDF_MAX_PAGES, (os.cpu_count() or 1) // processes))
+
+    @staticmethod
+    def _start():
+        with OCRPool._lock:
+            # A forked worker process inherits the pool object but not its threads
+            if OCRPool._queue is not None and OCRPool._pid == os.getpid():
+                return
+            jobs: queue.Queue = queue.Queue(maxsize=max(1, settings.OCR_POOL_MAX_QUEUE))
+            OCRPool._workers = [
+                threading.Thread(target=OCRPool._worker_loop, args=(jobs,), name=f"ocr-worker-{i}", daemon=True)
+                for i in range(OCRPool.size())
+            ]
+            for worker in OCRPool._workers:
+                worker.start()
+            OCRPool._queue = jobs
+            OCRPool._pid = os.getpid()
+
+    @staticmethod
+    def _new_engine():
+        """A warm tesserocr engine, or None to use the tesseract CLI through pytesseract"""
+        if TESSEROCR_SUPPORT:
+            try:
+                return LazyBackends.load("tesserocr").PyTessBaseAPI(lang=settings.OCR_LANGUAGE)
+            except Exception as e:
+                print(f"[OCR-POOL] tesserocr engine unavailable ({e}); using the tesseract CLI")
+        return None
+
+    @staticmethod
+    def _scored_cli(image, config: str) -> Tuple[str, float]:
+        """Text and mean word confidence from one tesseract CLI run (TSV output)"""
+        pytesseract = LazyBackends.load("pytesseract")
+        data = pytesseract.image_to_data(image, lang=settings.OCR_LANGUAGE, config=config, output_type=pytesseract.Output.DICT)
+        lines = {}
+        confidences = []
+        for word, conf, block, par, line in zip(data["text"], data["conf"], data["block_num"], data["par_num"], data["line_num"]):
+            if not word or not word.strip():
+                continue
+            lines.setdefault((block, par, line), []).append(word)
+            if float(conf) >= 0:
+                confidences.append(float(conf))
+        text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+        return text, (sum(confidences) / len(confidences) if confidences else 0.0)
+
+    @staticmethod
+    def _recognize(engine, image, config: str, scored: bool):
+        if engine is None:
+            if scored:
+                return OCRPool._scored_cli(image, config)
+            return LazyBackends.load("pytesseract").image_to_string(image, lang=settings.OCR_LANGUAGE, config=config)
+        psm = OCRPool._PSM.search(config or "")
+        engine.SetPageSegMode(int(psm.group(1)) if psm else LazyBackends.load("tesserocr").PSM.AUTO)
+        engine.SetImage(image)
+        text = engine.GetUTF8Text()
+        return (text, float(engine.MeanTextConf())) if scored else text
+
+    @staticmethod
+    def _worker_loop(jobs: queue.Queue):
+        # Engines are built on first use: a worker that never gets a job never loads Tesseract
+        engine = None
+        engine_ready = False
+        engine_jobs = 0
+        while True:
+            try:
+                image, config, scored, future = jobs.get(timeout=OCRPool.ENGINE_IDLE_SECONDS if engine is not None else None)
+            except queue.Empty:
+                engine.End()
+                engine, engine_ready = None, False
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            if not engine_ready:
+                engine, engine_ready, engine_jobs = OCRPool._new_engine(), True, 0
+            try:
+                future.set_result(OCRPool._recognize(engine, image, config, scored))
+            except Exception as e:
+                future.set_exception(e)
+
+            engine_jobs += 1
+            if engine is not None and engine_jobs >= max(1, settings.OCR_WORKER_MAX_JOBS):
+                # Recycle the engine to release memory Tesseract accumulates across images
+                engine.End()
+                engine, engine_ready = None, False
+
+    @staticmethod
+    def submit(image, config: str = "", scored: bool = False) -> Future:
+        """
+        Queue a PIL image for OCR and return a Future with its text, or with
+        (text, mean word confidence 0-100) when scored.
+
+        Raises:
+            RuntimeError: no OCR backend installed, or the queue stayed full for
+                OCR_POOL_QUEUE_TIMEOUT_SECONDS
+        """
+        if not OCRPool.available():
+            raise RuntimeError("OCR not available - install tesserocr or pytesseract and Tesseract")
+        OCRPool._start()
+        future: Future = Future()
+        try:
+            OCRPool._queue.put((image, config, scored, future), timeout=settings.OCR_POOL_QUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            raise RuntimeError("OCR workers are busy. Please retry shortly.")
+        return future
+
+    @staticmethod
+    def image_to_string(image, config: str = "") -> str:
+        """Drop-in for pytesseract.image_to_string, run on a pooled worker"""
+        return OCRPool.submit(image, config).result(timeout=settings.CPU_TASK_TIMEOUT_SECONDS)
+
+    @staticmethod
+    def image_to_scored_text(image, config: str = "") -> Tuple[str, float]:
+        """Text and mean word confidence (0-100), run on a pooled worker"""
+        return OCRPool.submit(image, config, scored=True).result(timeout=settings.CPU_TASK_TIMEOUT_SECONDS)
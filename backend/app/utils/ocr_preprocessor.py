@@ -0,0 +1,197 @@
+"""
+Image preparation for receipt OCR.
+
+Phone photos of receipts arrive at 8-12 MP with a tilted receipt on a table.
+Tesseract gains nothing from that resolution and is much slower on it, so the
+image is decoded at reduced scale, converted to grayscale, binarized with a
+local (adaptive) threshold, deskewed and cropped to the text before OCR.
+enhance() is the extra step for faint prints (thermal paper), used only when
+a normal pass reads poorly.
+"""
+
+import math
+from typing import Optional, Tuple
+from app.config import settings
+from app.utils.lazy_backends import LazyBackends
+
+# Pillow and NumPy are imported by the first receipt that needs them (see LazyBackends)
+IMAGE_SUPPORT = LazyBackends.available("PIL")
+NUMPY_SUPPORT = LazyBackends.available("numpy")
+
+
+class OCRPreprocessor:
+    # Bradley-Roth threshold: a pixel is ink when darker than its neighbourhood mean by this fraction
+    BINARIZE_SENSITIVITY = 0.15
+    # Rows/columns with less ink than this fraction of the image size are treated as noise when cropping
+    CROP_INK_FRACTION = 0.005
+    CROP_MARGIN = 20
+
+    @staticmethod
+    def tesseract_config() -> str:
+        """Page segmentation for receipts: a single column of lines of varying size (psm 4)"""
+        return f"--psm {settings.OCR_TESSERACT_PSM}"
+
+    @staticmethod
+    def _target_scale(image: "Image.Image", max_side: int) -> float:
+        """Scale (<= 1) that brings the image down to OCR_TARGET_DPI and max_side"""
+        scale = 1.0
+        dpi = image.info.get("dpi")
+        if dpi and dpi[0] and float(dpi[0]) > settings.OCR_TARGET_DPI:
+            scale = settings.OCR_TARGET_DPI / float(dpi[0])
+        longest = max(image.size) * scale
+        if longest > max_side:
+            scale *= max_side / longest
+        return scale
+
+    @staticmethod
+    def load(file_path: str, max_side: Optional[int] = None) -> "Image.Image":
+        """
+        Open an image as grayscale at OCR resolution (longest side at most max_side,
+        default OCR_MAX_IMAGE_SIDE). JPEGs are decoded directly at 1/2, 1/4 or 1/8
+        scale (Pillow draft mode) instead of decoding every pixel of a 12 MP photo
+        and shrinking it afterwards.
+        """
+        Image = LazyBackends.load("PIL.Image")
+        ImageOps = LazyBackends.load("PIL.ImageOps")
+        image = Image.open(file_path)
+        scale = OCRPreprocessor._target_scale(image, max_side or settings.OCR_MAX_IMAGE_SIDE)
+        target_longest = max(image.size) * scale
+        if scale < 1.0 and image.format == "JPEG":
+            image.draft("L", (int(image.width * scale), int(image.height * scale)))
+        # Phone photos store their orientation in EXIF
+        image = ImageOps.exif_transpose(image).convert("L")
+        if max(image.size) > target_longest * 1.01:
+            ratio = target_longest / max(image.size)
+            size = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+            image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        return image
+
+    @staticmethod
+    def binarize(gray: "np.ndarray") -> "np.ndarray":
+        """
+        Adaptive threshold (Bradley-Roth): compare every pixel with the mean of its
+        neighbourhood using an integral image, so shadows and uneven lighting do not
+        wipe out text the way a single global threshold does. Pixels whose whole
+        neighbourhood is darker than the paper (the table a photographed receipt lies
+        on) are left white instead of becoming a solid frame. Returns 0 = ink, 255 = paper.
+        """
+        np = LazyBackends.load("numpy")
+        height, width = gray.shape
+        window = max(15, min(height, width) // 16) | 1
+        half = window // 2
+
+        rows = np.arange(height)
+        cols = np.arange(width)
+        top, bottom = np.clip(rows - half, 0, height), np.clip(rows + half + 1, 0, height)
+        left, right = np.clip(cols - half, 0, width), np.clip(cols + half + 1, 0, width)
+
+        # Box sums via cumulative sums, one axis at a time (an integral image, separably)
+        column_sums = np.zeros((height + 1, width), dtype=np.int64)
+        np.cumsum(gray, axis=0, dtype=np.int64, out=column_sums[1:])
+        vertical = column_sums[bottom] - column_sums[top]
+        row_sums = np.zeros((height, width + 1), dtype=np.int64)
+        np.cumsum(vertical, axis=1, out=row_sums[:, 1:])
+        sums = row_sums[:, right] - row_sums[:, left]
+
+        counts = (bottom - top)[:, None] * (right - left)[None, :]
+        mean = (sums / counts).astype(np.float32)
+        ink = (gray < mean * (1.0 - OCRPreprocessor.BINARIZE_SENSITIVITY)) & (mean > OCRPreprocessor.otsu_threshold(gray))
+        return np.where(ink, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def otsu_threshold(gray: "np.ndarray") -> float:
+        """Global gray level that best separates dark and bright pixels (Otsu)"""
+        np = LazyBackends.load("numpy")
+        histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+        levels = np.arange(256, dtype=np.float64)
+        weight_dark = np.cumsum(histogram)
+        weight_bright = weight_dark[-1] - weight_dark
+        cumulative = np.cumsum(histogram * levels)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_dark = cumulative / weight_dark
+            mean_bright = (cumulative[-1] - cumulative) / weight_bright
+            between = weight_dark * weight_bright * (mean_dark - mean_bright) ** 2
+        return float(np.nanargmax(between))
+
+    @staticmethod
+    def skew_angle(binary: "np.ndarray") -> float:
+        """
+        Angle (degrees, counter-clockwise) the text lines are tilted by: the one
+        whose projection of ink pixels onto the vertical axis is sharpest. Estimated on a
+        reduced copy, coarse (1 degree) then fine (0.1 degree).
+        """
+        max_angle = settings.OCR_DESKEW_MAX_ANGLE
+        if max_angle <= 0:
+            return 0.0
+        np = LazyBackends.load("numpy")
+        step = max(1, max(binary.shape) // 800)
+        ys, xs = np.nonzero(binary[::step, ::step] == 0)
+        if len(ys) < 100:
+            return 0.0
+        ys = ys.astype(np.float64)
+        xs = xs.astype(np.float64)
+
+        def sharpness(angle: float) -> float:
+            offsets = np.round(ys + xs * math.tan(math.radians(angle))).astype(np.int64)
+            profile = np.bincount(offsets - offsets.min()).astype(np.float64)
+            return float(np.dot(profile, profile))
+
+        coarse = max(np.arange(-max_angle, max_angle + 0.5, 1.0), key=sharpness)
+        fine = max(np.arange(coarse - 1.0, coarse + 1.05, 0.1), key=sharpness)
+        return round(float(fine), 1)
+
+    @staticmethod
+    def crop_to_text(binary: "np.ndarray") -> "np.ndarray":
+        """Crop to the rows/columns that carry ink (plus a margin); unchanged if none do"""
+        np = LazyBackends.load("numpy")
+        ink = binary == 0
+        height, width = ink.shape
+        rows = np.nonzero(ink.sum(axis=1) > max(2, width * OCRPreprocessor.CROP_INK_FRACTION))[0]
+        cols = np.nonzero(ink.sum(axis=0) > max(2, height * OCRPreprocessor.CROP_INK_FRACTION))[0]
+        if len(rows) == 0 or len(cols) == 0:
+            return binary
+        margin = OCRPreprocessor.CROP_MARGIN
+        return binary[
+            max(0, rows[0] - margin):min(height, rows[-1] + margin + 1),
+            max(0, cols[0] - margin):min(width, cols[-1] + margin + 1)
+        ]
+
+    @staticmethod
+    def clean(gray: "Image.Image") -> "Image.Image":
+        """Binarize, deskew and crop a grayscale image (returned unchanged without NumPy)"""
+        if not NUMPY_SUPPORT:
+            return LazyBackends.load("PIL.ImageOps").autocontrast(gray)
+        np = LazyBackends.load("numpy")
+        Image = LazyBackends.load("PIL.Image")
+        binary = OCRPreprocessor.binarize(np.asarray(gray))
+        angle = OCRPreprocessor.skew_angle(binary)
+        if angle:
+            rotated = Image.fromarray(binary).rotate(-angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=255)
+            binary = np.where(np.asarray(rotated) < 128, 0, 255).astype(np.uint8)
+        return Image.fromarray(OCRPreprocessor.crop_to_text(binary))
+
+    @staticmethod
+    def enhance(gray: "Image.Image") -> "Image.Image":
+        """
+        Extra pass for faint or low-contrast prints: stretch the contrast, sharpen
+        the strokes, enlarge small images to at least 2000 px and clean as usual.
+        """
+        Image = LazyBackends.load("PIL.Image")
+        ImageFilter = LazyBackends.load("PIL.ImageFilter")
+        ImageOps = LazyBackends.load("PIL.ImageOps")
+        gray = ImageOps.autocontrast(gray, cutoff=2)
+        gray = gray.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
+        if max(gray.size) < 2000:
+            ratio = 2000 / max(gray.size)
+            gray = gray.resize((round(gray.width * ratio), round(gray.height * ratio)), Image.Resampling.LANCZOS)
+        return OCRPreprocessor.clean(gray)
+
+    @staticmethod
+    def prepare(file_path: str, max_side: Optional[int] = None) -> Tuple["Image.Image", "Image.Image"]:
+        """
+        Load and clean an image file for OCR.
+        Returns: (prepared, grayscale) - the binarized, deskewed, cropped image for
+        the OCR pass and the downscaled grayscale image it was made from.
+        """
+        gray = OCRPreprocessor.load(file_path, max_side)
+        return OCRPreprocessor.clean(gray), gray
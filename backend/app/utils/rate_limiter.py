@@ -0,0 +1,46 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+from fastapi import HTTPException, status
+
+
+class RateLimiter:
+    """
+    In-process sliding-window limit on requests per key (usually a user id).
+
+    Each instance keeps the timestamps of the last `limit` requests per key
+    within `window_seconds`; one more request inside the window is rejected
+    with 429 and a Retry-After header. Limits are per worker process.
+    """
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = max(1, limit)
+        self.window_seconds = window_seconds
+        self._hits: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def check(self, key: str):
+        """
+        Record a request for key.
+
+        Raises:
+            HTTPException(429): key already made `limit` requests in the window
+        """
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.setdefault(key, deque())
+            while hits and now - hits[0] >= self.window_seconds:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                retry_after = max(1, int(self.window_seconds - (now - hits[0])) + 1)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests. Please retry shortly.",
+                    headers={"Retry-After": str(retry_after)}
+                )
+            hits.append(now)
+            # Drop idle keys now and then so the table does not grow with every user seen
+            if len(self._hits) > 10000:
+                for idle in [k for k, v in self._hits.items() if not v or now - v[-1] >= self.window_seconds]:
+                    del self._hits[idle]
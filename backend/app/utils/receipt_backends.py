@@ -0,0 +1,111 @@
+"""
+Receipt format detection and parser routing.
+
+Uploads are identified by their content (magic bytes), not by their file name,
+so a JPEG renamed .pdf is OCR'd instead of failing inside pdfplumber, and a
+legacy .doc/.xls (which python-docx/openpyxl cannot read) is rejected at upload
+instead of after a slow failing parse. Each backend declares a cost class that
+decides where ExtractionCacheService runs it.
+"""
+
+import zipfile
+from typing import Dict, NamedTuple, Optional
+
+# Text-layer parsing: quick enough for the small light worker pool (CPUExecutor.run_light)
+COST_LIGHT = "light"
+# Rasterizing and OCR: sent to the CPU process pool
+COST_OCR = "ocr"
+
+
+class ReceiptBackend(NamedTuple):
+    """A parser for one receipt format: ImprovedReceiptExtractor method name and cost class"""
+    parser: str
+    cost: str
+
+
+class ReceiptBackends:
+    BACKENDS: Dict[str, ReceiptBackend] = {
+        "pdf": ReceiptBackend("_extract_pdf", COST_LIGHT),
+        "xlsx": ReceiptBackend("_extract_excel", COST_LIGHT),
+        "docx": ReceiptBackend("_extract_word", COST_LIGHT),
+        "jpg": ReceiptBackend("_extract_image", COST_OCR),
+        "png": ReceiptBackend("_extract_image", COST_OCR),
+        "gif": ReceiptBackend("_extract_image", COST_OCR),
+        "bmp": ReceiptBackend("_extract_image", COST_OCR),
+        "tiff": ReceiptBackend("_extract_image", COST_OCR),
+        "webp": ReceiptBackend("_extract_image", COST_OCR),
+    }
+    # File extensions naming the same format
+    ALIASES = {"jpeg": "jpg", "tif": "tiff"}
+
+    # Legacy Office files (.doc, .xls, .ppt) share the OLE2 compound file signature
+    OLE2_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+    @staticmethod
+    def get(file_type: str) -> Optional[ReceiptBackend]:
+        file_type = (file_type or "").lower()
+        return ReceiptBackends.BACKENDS.get(ReceiptBackends.ALIASES.get(file_type, file_type))
+
+    @staticmethod
+    def sniff(file_path: str) -> Optional[str]:
+        """
+        Format of a file from its content: a key of BACKENDS, "ole2" for legacy
+        Office files, "zip" for other ZIP containers, or None when unrecognised.
+        """
+        with open(file_path, "rb") as f:
+            header = f.read(1024)
+
+        if header.startswith(b"\xff\xd8\xff"):
+            return "jpg"
+        if header.startswith(b"\x89PNG\r\n\x1a\n"):
+            return "png"
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return "gif"
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return "webp"
+        if header[:4] in (b"II*\x00", b"MM\x00*"):
+            return "tiff"
+        if header.startswith(b"BM") and header[6:10] == b"\x00\x00\x00\x00":
+            return "bmp"
+        # The PDF header may follow a little leading junk
+        if b"%PDF-" in header:
+            return "pdf"
+        if header.startswith(ReceiptBackends.OLE2_SIGNATURE):
+            return "ole2"
+        if header.startswith(b"PK\x03\x04"):
+            try:
+                with zipfile.ZipFile(file_path) as archive:
+                    names = set(archive.namelist())
+            except zipfile.BadZipFile:
+                return None
+            if "word/document.xml" in names:
+                return "docx"
+            if "xl/workbook.xml" in names:
+                return "xlsx"
+            return "zip"
+        return None
+
+    @staticmethod
+    def resolve(file_path: str, file_type: Optional[str] = None) -> Optional[str]:
+        """
+        Format of a stored receipt: the stored type when it names a backend
+        (uploads store the sniffed type), otherwise sniffed from the file, for
+        attachments that store a MIME type or nothing.
+        """
+        file_type = (file_type or "").lower()
+        if ReceiptBackends.get(file_type) is not None:
+            return ReceiptBackends.ALIASES.get(file_type, file_type)
+        try:
+            return ReceiptBackends.sniff(file_path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def unsupported_reason(detected: Optional[str]) -> Optional[str]:
+        """Why a sniffed file cannot be read as a receipt (None when a backend supports it)"""
+        if detected in ReceiptBackends.BACKENDS:
+            return None
+        if detected == "ole2":
+            return "Legacy Office files (.doc, .xls, .ppt) cannot be read. Save the receipt as PDF, DOCX or XLSX."
+        supported = ", ".join(sorted(ReceiptBackends.BACKENDS))
+        return f"Receipt content is not a supported format. Supported: {supported}"
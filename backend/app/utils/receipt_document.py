@@ -0,0 +1,201 @@
+import re
+import hashlib
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+# Date formats seen on receipts; shared by every stage that looks for dates
+DATE_PATTERNS = [
+    r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',  # DD/MM/YYYY
+    r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b',    # YYYY/MM/DD
+    r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4}\b'  # DD Month YYYY
+]
+
+
+class AmountCandidate(NamedTuple):
+    """
+    One amount found by the extractor's scanner.
+
+    tier: 1 = final-total keyword + currency, 2 = other amount keyword + currency,
+    3 = currency marker only, None = no currency (only used as a last resort).
+    keyword/currency are the matched words (lower-cased; currency is "suffix"
+    when the marker follows the number), position the offset of the number in
+    the scanned text.
+    """
+    amount: float
+    pattern: str
+    tier: Optional[int]
+    keyword: Optional[str]
+    currency: Optional[str]
+    position: int
+
+
+class ReceiptDocument:
+    """
+    A receipt parsed once per upload.
+
+    Holds everything the submit pipeline needs from the file so that extraction,
+    LLM review, genuineness validation and cross-checking all work from the same
+    parse instead of re-opening the file and re-running their own regexes.
+    Populated by ImprovedReceiptExtractor.extract_document().
+    """
+
+    def __init__(self, file_path: str, file_type: str, file_hash: Optional[str] = None):
+        self.file_path: str = file_path
+        self.file_type: str = (file_type or "").lower()
+        self.file_hash: Optional[str] = file_hash
+
+        # Raw text per page (a single entry for non-paged formats). None marks a
+        # PDF page the extractor skipped; it is read on first access to text
+        self.pages: List[Optional[str]] = []
+        # Tables as rows of cell strings (PDF tables, Word tables)
+        self.tables: List[List[List[Optional[str]]]] = []
+        # Whitespace-normalized text used for amount scanning
+        self.normalized_text: str = ""
+        self.ocr_used: bool = False
+        # Adaptive OCR pass whose text was kept (e.g. "1600px", "enhanced", "200dpi")
+        # and its mean Tesseract word confidence (0-100)
+        self.ocr_level: Optional[str] = None
+        self.ocr_confidence: Optional[float] = None
+        # True when rebuilt from the extraction cache instead of parsing the file
+        self.from_cache: bool = False
+        # PDF without a text layer left unread because OCR was not allowed on this pass
+        self.needs_ocr: bool = False
+        # Perceptual hash of the receipt image (ReceiptImageHash); set per upload, not cached
+        self.image_hash: Optional[str] = None
+
+        # Amount extraction results
+        self.amount_candidates: List[AmountCandidate] = []
+        self.table_totals: List[float] = []
+        self.amount: Optional[float] = None
+        self.confidence: str = "none"
+        self.note: str = ""
+
+        self._date_strings: Optional[List[str]] = None
+        self._dates: Optional[List[datetime]] = None
+
+    @property
+    def text(self) -> str:
+        """Full text with page/line structure preserved (used by validation and the LLM)"""
+        if self.pending_pages:
+            self.load_pending_pages()
+        return "\n".join(self.pages)
+
+    @property
+    def pending_pages(self) -> List[int]:
+        """Indexes of pages not read yet (PDF pages skipped by last-page-first scanning)"""
+        return [index for index, page in enumerate(self.pages) if page is None]
+
+    def fill_pages(self, page_texts: List[str], indexes: List[int]):
+        """Store text read for pending pages and drop anything derived from the partial text"""
+        for index, page_text in zip(indexes, page_texts):
+            self.pages[index] = page_text
+        self._date_strings = None
+        self._dates = None
+
+    def load_pending_pages(self):
+        """Read skipped pages from the file (blocking; async callers go through ExtractionCacheService)"""
+        from app.utils.improved_receipt_extractor import ImprovedReceiptExtractor
+
+        indexes = self.pending_pages
+        self.fill_pages(ImprovedReceiptExtractor.read_pdf_pages(self.file_path, indexes), indexes)
+
+    @property
+    def has_text(self) -> bool:
+        return bool(self.text.strip())
+
+    @property
+    def text_hash(self) -> Optional[str]:
+        """MD5 of the extracted text for similarity checks (None when nothing was extracted)"""
+        if not self.has_text:
+            return None
+        return hashlib.md5(self.text.encode()).hexdigest()
+
+    @property
+    def date_strings(self) -> List[str]:
+        """All date-like strings found in the text, in pattern order"""
+        if self._date_strings is None:
+            text = self.text
+            self._date_strings = []
+            for pattern in DATE_PATTERNS:
+                self._date_strings.extend(re.findall(pattern, text, re.IGNORECASE))
+        return self._date_strings
+
+    @property
+    def dates(self) -> List[datetime]:
+        """Date strings that parse as DD/MM/YYYY, YYYY/MM/DD or DD Month YYYY"""
+        if self._dates is None:
+            self._dates = []
+            for match in self.date_strings:
+                try:
+                    if '/' in match:
+                        if len(match.split('/')[0]) == 4:  # YYYY/MM/DD
+                            date_obj = datetime.strptime(match, '%Y/%m/%d')
+                        else:  # DD/MM/YYYY
+                            date_obj = datetime.strptime(match, '%d/%m/%Y')
+                    else:
+                        date_obj = datetime.strptime(match, '%d %B %Y')
+                    self._dates.append(date_obj)
+                except ValueError:
+                    continue
+        return self._dates
+
+    def compute_file_hash(self) -> Optional[str]:
+        """SHA-256 of the file, read once and cached"""
+        if self.file_hash is None:
+            try:
+                file_hash = hashlib.sha256()
+                with open(self.file_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(8192), b""):
+                        file_hash.update(chunk)
+                self.file_hash = file_hash.hexdigest()
+            except OSError:
+                self.file_hash = None
+        return self.file_hash
+
+    def to_dict(self) -> dict:
+        """Serializable form of the parse results (used by the extraction cache)"""
+        return {
+            "file_type": self.file_type,
+            "file_hash": self.file_hash,
+            "pages": self.pages,
+            "tables": self.tables,
+            "normalized_text": self.normalized_text,
+            "ocr_used": self.ocr_used,
+            "ocr_level": self.ocr_level,
+            "ocr_confidence": self.ocr_confidence,
+            "amount_candidates": [list(candidate) for candidate in self.amount_candidates],
+            "table_totals": self.table_totals,
+            "amount": self.amount,
+            "confidence": self.confidence,
+            "note": self.note,
+        }
+
+    @classmethod
+    def from_dict(cls, file_path: str, data: dict) -> "ReceiptDocument":
+        """Rebuild a document from to_dict() output without touching the file"""
+        document = cls(file_path, data.get("file_type", ""), file_hash=data.get("file_hash"))
+        document.pages = data.get("pages", [])
+        document.tables = data.get("tables", [])
+        document.normalized_text = data.get("normalized_text", "")
+        document.ocr_used = data.get("ocr_used", False)
+        document.ocr_level = data.get("ocr_level")
+        document.ocr_confidence = data.get("ocr_confidence")
+        document.amount_candidates = [AmountCandidate(*candidate) for candidate in data.get("amount_candidates", [])]
+        document.table_totals = data.get("table_totals", [])
+        document.amount = data.get("amount")
+        document.confidence = data.get("confidence", "none")
+        document.note = data.get("note", "")
+        document.from_cache = True
+        return document
+
+    @property
+    def metrics_label(self) -> str:
+        """File type plus how it was read, e.g. "pdf", "jpg/ocr", "pdf/cached" (latency metrics)"""
+        label = self.file_type or "unknown"
+        if self.from_cache:
+            return f"{label}/cached"
+        return f"{label}/ocr" if self.ocr_used else label
+
+    def text_for_validation(self) -> str:
+        """Text handed to validation stages; falls back to the extraction note like before"""
+        return self.text if self.has_text else self.note
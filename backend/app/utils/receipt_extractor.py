@@ -3,20 +3,16 @@ import os
 from typing import Optional, Tuple
 from pathlib import Path
 from app.config import settings
+from app.utils.lazy_backends import LazyBackends
+from app.utils.ocr_pool import OCRPool
 
-try:
-    import pdfplumber
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
+# Imported on first use (see LazyBackends)
+PDF_SUPPORT = LazyBackends.available("pdfplumber")
+if not PDF_SUPPORT:
     print("Warning: pdfplumber not installed. PDF amount extraction will be disabled.")
 
-try:
-    from PIL import Image
-    import pytesseract
-    OCR_SUPPORT = True
-except ImportError:
-    OCR_SUPPORT = False
+OCR_SUPPORT = LazyBackends.available("PIL") and LazyBackends.available("pytesseract")
+if not OCR_SUPPORT:
     print("Warning: pytesseract/Pillow not installed. Image OCR will be disabled.")
 
 
@@ -77,7 +73,7 @@ class ReceiptExtractor:
         try:
             amounts_found = []
             
-            with pdfplumber.open(file_path) as pdf:
+            with LazyBackends.load("pdfplumber").open(file_path) as pdf:
                 # Extract text from all pages
                 full_text = ""
                 for page in pdf.pages:
@@ -117,8 +113,8 @@ class ReceiptExtractor:
         
         try:
             # Open image and extract text using OCR
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
+            image = LazyBackends.load("PIL.Image").open(file_path)
+            text = OCRPool.image_to_string(image)
             
             amounts_found = []
             
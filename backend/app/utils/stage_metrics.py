@@ -0,0 +1,80 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional, Tuple
+from app.config import settings
+
+
+class StageMetrics:
+    """
+    In-process latency histograms for the receipt/submission pipeline.
+
+    Each (stage, label) pair keeps the most recent PIPELINE_METRICS_SAMPLES
+    durations, where label is usually the file type (e.g. "pdf", "jpg/ocr").
+    Percentiles are computed from those samples on demand, so the numbers
+    describe recent traffic rather than the whole process lifetime.
+    """
+
+    _samples: Dict[Tuple[str, str], Deque[float]] = {}
+    _counts: Dict[Tuple[str, str], int] = {}
+    _lock = threading.Lock()
+    _started_at: float = time.time()
+
+    @staticmethod
+    def record(stage: str, seconds: float, label: Optional[str] = None):
+        key = (stage, label or "all")
+        with StageMetrics._lock:
+            samples = StageMetrics._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=max(1, settings.PIPELINE_METRICS_SAMPLES))
+                StageMetrics._samples[key] = samples
+            samples.append(seconds)
+            StageMetrics._counts[key] = StageMetrics._counts.get(key, 0) + 1
+
+    @staticmethod
+    @contextmanager
+    def span(stage: str, label: Optional[str] = None):
+        """Time a block (sync or async code) and record it, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            StageMetrics.record(stage, time.perf_counter() - started, label)
+
+    @staticmethod
+    def _percentile(ordered: list, pct: float) -> float:
+        # Nearest-rank percentile on an already sorted list
+        rank = math.ceil(pct / 100.0 * len(ordered))
+        return ordered[max(0, min(len(ordered), rank) - 1)]
+
+    @staticmethod
+    def snapshot() -> dict:
+        """p50/p95/p99/max (milliseconds) per stage and label"""
+        with StageMetrics._lock:
+            items = [(key, list(samples), StageMetrics._counts[key]) for key, samples in StageMetrics._samples.items()]
+
+        stages: Dict[str, dict] = {}
+        for (stage, label), samples, count in sorted(items):
+            ordered = sorted(samples)
+            stages.setdefault(stage, {})[label] = {
+                "count": count,
+                "samples": len(ordered),
+                "p50_ms": round(StageMetrics._percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(StageMetrics._percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(StageMetrics._percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        return {
+            "since": StageMetrics._started_at,
+            "window": settings.PIPELINE_METRICS_SAMPLES,
+            "stages": stages,
+        }
+
+    @staticmethod
+    def reset():
+        with StageMetrics._lock:
+            StageMetrics._samples.clear()
+            StageMetrics._counts.clear()
+            StageMetrics._started_at = time.time()
@@ -0,0 +1,81 @@
+"""
+MinHash signatures of receipt text for near-duplicate detection.
+
+An MD5 of the extracted text only matches byte-identical text, so one OCR
+character read differently defeats it. The text is normalized (case,
+punctuation, whitespace) and split into overlapping character shingles; the
+MinHash signature estimates the Jaccard similarity of two shingle sets from
+the fraction of equal slots. Signatures are stored per expense
+(Expense.text_minhash) and indexed by MinHashIndexService.
+
+Slot values come from fixed CRC32 shingle hashes and fixed-seed permutations,
+so signatures computed by different processes (and releases) are comparable.
+Changing NUM_PERM, SHINGLE_SIZE, the normalization or the seed invalidates
+every stored signature.
+"""
+
+import re
+import zlib
+from typing import Optional
+from app.utils.lazy_backends import LazyBackends
+
+NUMPY_SUPPORT = LazyBackends.available("numpy")
+
+
+class TextMinHash:
+    NUM_PERM = 128
+    SHINGLE_SIZE = 5
+    # Texts shorter than this (after normalization) are too short to compare
+    MIN_TEXT_LENGTH = 40
+    # Largest prime below 2**32: permutations are (a * x + b) mod PRIME
+    PRIME = 4294967291
+    SEED = 20240917
+
+    _permutations = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase, punctuation to spaces, runs of whitespace collapsed"""
+        text = re.sub(r"[^0-9a-z]+", " ", (text or "").lower())
+        return text.strip()
+
+    @staticmethod
+    def _coefficients():
+        if TextMinHash._permutations is None:
+            np = LazyBackends.load("numpy")
+            # RandomState streams are stable across NumPy releases
+            rng = np.random.RandomState(TextMinHash.SEED)
+            a = rng.randint(1, TextMinHash.PRIME, size=TextMinHash.NUM_PERM).astype(np.uint64)
+            b = rng.randint(0, TextMinHash.PRIME, size=TextMinHash.NUM_PERM).astype(np.uint64)
+            TextMinHash._permutations = (a[:, None], b[:, None])
+        return TextMinHash._permutations
+
+    @staticmethod
+    def signature(text: str) -> Optional[bytes]:
+        """
+        MinHash signature of the text as NUM_PERM little-endian uint32 values,
+        or None when the text is too short or NumPy is not installed.
+        """
+        if not NUMPY_SUPPORT:
+            return None
+        text = TextMinHash.normalize(text)
+        if len(text) < TextMinHash.MIN_TEXT_LENGTH:
+            return None
+
+        np = LazyBackends.load("numpy")
+        size = TextMinHash.SHINGLE_SIZE
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+        # a, b and the hashes are below 2**32, so a * x + b cannot overflow uint64
+        a, b = TextMinHash._coefficients()
+        slots = ((a * hashes[None, :] + b) % np.uint64(TextMinHash.PRIME)).min(axis=1)
+        return slots.astype("<u4").tobytes()
+
+    @staticmethod
+    def similarity(signature1: Optional[bytes], signature2: Optional[bytes]) -> float:
+        """Estimated Jaccard similarity (0-1) of the texts behind two signatures"""
+        if not signature1 or not signature2 or len(signature1) != len(signature2):
+            return 0.0
+        np = LazyBackends.load("numpy")
+        return float(np.mean(np.frombuffer(signature1, dtype="<u4") == np.frombuffer(signature2, dtype="<u4")))
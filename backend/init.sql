@@ -210,6 +210,12 @@ CREATE TABLE IF NOT EXISTS expenses (
         'PAID'
     ) DEFAULT 'SUBMITTED',
     rejection_remarks TEXT,
+    file_hash VARCHAR(64),
+    extracted_text_hash VARCHAR(32),
+    text_minhash BLOB,
+    validation_score DECIMAL(5,2),
+    is_ai_validated BOOLEAN DEFAULT FALSE,
+    risk_factors TEXT,
     policy_check_result JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
@@ -235,6 +241,7 @@ CREATE TABLE IF NOT EXISTS expense_attachments (
     file_type VARCHAR(50) NOT NULL,
     file_size INT,
     file_hash VARCHAR(255) NOT NULL,
+    image_hash VARCHAR(16),
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 
     CONSTRAINT fk_attach_expense
@@ -311,6 +318,27 @@ CREATE TABLE IF NOT EXISTS notifications (
         ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
+-- =========================
+-- 19. RECEIPT EXTRACTION CACHE
+-- =========================
+CREATE TABLE IF NOT EXISTS receipt_extractions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    file_hash VARCHAR(64) NOT NULL,
+    extractor_version VARCHAR(20) NOT NULL,
+    file_type VARCHAR(50) NOT NULL,
+    payload MEDIUMBLOB NOT NULL,
+    amount DECIMAL(10,2),
+    confidence VARCHAR(20),
+    date_strings JSON,
+    text_length INT,
+    ocr_used BOOLEAN DEFAULT FALSE,
+    extraction_ms INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_receipt_extraction_hash_version
+        UNIQUE (file_hash, extractor_version)
+) ENGINE=InnoDB;
+
 -- =====================================================================
 -- INSERT DEFAULT DATA
 -- =====================================================================
@@ -419,3 +447,6 @@ CREATE INDEX idx_audit_entity ON audit_logs(entity_type, entity_id);
 CREATE INDEX idx_otp_email ON email_otps(email, is_used);
 CREATE INDEX idx_refresh_token_user ON refresh_tokens(user_id);
 CREATE INDEX idx_attachments_expense ON expense_attachments(expense_id);
+CREATE INDEX idx_attachments_file_hash ON expense_attachments(file_hash);
+CREATE INDEX idx_expenses_user_date_amount ON expenses(user_id, expense_date, amount);
+CREATE INDEX idx_expenses_text_hash ON expenses(extracted_text_hash);
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for ImprovedReceiptExtractor._scan_amounts.
+
+Compares the single-pass AMOUNT_SCANNER against the previous approach (one
+re.finditer per entry of the old AMOUNT_PATTERNS list, i.e. ~12 passes over
+the text) on synthetic multi-page invoices, and checks that both pick the
+same final amount.
+
+Usage (from the repository root):
+    python tests/benchmarks/amount_scanner_benchmark.py
+    python tests/benchmarks/amount_scanner_benchmark.py --pages 1,10,50 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(BENCH_DIR, "..", "..", "backend")))
+
+from app.utils.improved_receipt_extractor import ImprovedReceiptExtractor
+
+# The per-pattern list the scanner replaced (baseline only)
+LEGACY_AMOUNT_PATTERNS = [
+    (r'₹\s*([\d,]+\.\d{1,2})', 'rupee_symbol_decimal'),
+    (r'₹\s*([1-9]\d{0,6}(?:\.\d{1,2})?)', 'rupee_symbol'),
+    (r'Rs\.?\s*([\d,]+\.\d{1,2})', 'rs_abbrev_decimal'),
+    (r'Rs\.?\s*([1-9]\d{0,6}(?:\.\d{1,2})?)', 'rs_abbrev'),
+    (r'INR\s*([\d,]+\.\d{1,2})', 'inr_code_decimal'),
+    (r'INR\s*([1-9]\d{0,6}(?:\.\d{1,2})?)', 'inr_code'),
+    (r'(?:total\s+(?:amount|paid|fare|price)|amount\s+paid|final\s+amount|grand\s+total|net\s+amount|bill\s+amount|sub\s+total)[\s:]*₹\s*([\d,]+\.?\d*)', 'total_rupee_final'),
+    (r'(?:total|amount|price|cost|due|payable|net|fare|bill)[\s:]*₹\s*([\d,]+\.?\d*)', 'total_rupee'),
+    (r'(?:grand\s+total|net\s+total|total)\s*[:\-]?\s*([1-9]\d{0,6}(?:\.\d{1,2})?)', 'total_no_currency'),
+    (r'(?:total|amount|price|cost|due|payable|fare|paid|bill|sum|charge)\s+(?:is|:|=)?\s*(?:Rs|rupees?|INR)\s*[\.]?\s*([\d,]+\.\d{1,2})', 'text_total'),
+    (r'rupees?\s+([\d,]+\.\d{1,2})', 'rupees_text'),
+    (r'([\d,]+\.\d{1,2})\s*(?:Rs|INR|₹)', 'table_amount'),
+]
+
+
+def legacy_scan(text):
+    candidates = []
+    for pattern, pattern_name in LEGACY_AMOUNT_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            amount = ImprovedReceiptExtractor._normalize_amount(match.group(1))
+            if amount and amount >= 10:
+                candidates.append((amount, pattern_name))
+    return candidates
+
+
+def legacy_select(candidates):
+    final = [a for a, p in candidates if p == 'total_rupee_final']
+    high = [a for a, p in candidates if p in ('total_rupee', 'text_total')]
+    currency = [a for a, p in candidates if p in ('rupee_symbol', 'rs_abbrev', 'inr_code', 'rupees_text', 'table_amount')]
+    for group in (final, high, currency):
+        if group:
+            return max(group)
+    return max(a for a, _ in candidates)
+
+
+def make_invoice(pages, rng):
+    """Multi-page invoice: line items with ₹/Rs amounts, phone/UPI noise and a grand total on the last page"""
+    lines = []
+    running = 0.0
+    for page in range(pages):
+        lines.append(f"TAX INVOICE  Page {page + 1} of {pages}")
+        lines.append(f"Invoice No: INV-{rng.randint(100000, 999999)}  Date: {rng.randint(1, 28):02d}/10/2026")
+        lines.append(f"GSTIN: 29ABCDE{rng.randint(1000, 9999)}F1Z5  Phone: 98{rng.randint(10000000, 99999999)}")
+        for _ in range(40):
+            price = round(rng.uniform(20, 900), 2)
+            qty = rng.randint(1, 5)
+            running += price * qty
+            lines.append(f"{rng.choice(['Coffee', 'Room', 'Taxi', 'Printing', 'Lunch'])} x{qty} @ Rs. {price:.2f}  {price * qty:,.2f} INR")
+        lines.append(f"Page subtotal ₹{running:,.2f}")
+        lines.append(f"UPI Ref 4{rng.randint(10 ** 10, 10 ** 11)}")
+    lines.append(f"Grand Total: ₹{running:,.2f}")
+    lines.append("Thank you")
+    return " ".join(lines)
+
+
+def timed(func, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the receipt amount scanner")
+    parser.add_argument("--pages", default="1,5,20,50", help="Comma-separated invoice page counts")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement (best is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'pages':>6} {'chars':>9} {'legacy ms':>10} {'scanner ms':>11} {'speedup':>8}  same amount")
+    for pages in [int(p) for p in args.pages.split(",") if p.strip()]:
+        text = make_invoice(pages, rng)
+        legacy_seconds, legacy_candidates = timed(legacy_scan, text, args.repeat)
+        scanner_seconds, candidates = timed(ImprovedReceiptExtractor._scan_amounts, text, args.repeat)
+        legacy_amount = legacy_select(legacy_candidates)
+        amount, _ = ImprovedReceiptExtractor._select_amount(candidates)
+        print(f"{pages:>6} {len(text):>9} {legacy_seconds * 1000:>10.2f} {scanner_seconds * 1000:>11.2f} "
+              f"{legacy_seconds / scanner_seconds:>7.1f}x  {legacy_amount == amount} ({amount:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Accuracy and latency benchmark for the receipt extractor implementations.
+
+Runs every extractor the backend carries over the same synthetic GST-style
+corpus (receipt_factory.generate_indian_corpus: ₹/Rs./INR, lakh grouping,
+CGST/SGST lines, UPI IDs as distractors) and reports per extractor and
+format:
+
+- accuracy (extracted amount == ground truth) and misses (no amount)
+- confidence calibration: receipts and accuracy per reported confidence
+- p50/p95 extraction time
+- peak Python memory (tracemalloc) of a single extraction
+
+Extractors that cannot be imported (improved_receipt_extractor_backup.py
+does not currently compile) are listed as unavailable. Image receipts are
+only read when Tesseract is installed. Everything runs offline.
+
+Usage (from the repository root):
+    python tests/benchmarks/extractor_benchmark.py --count 10
+    python tests/benchmarks/extractor_benchmark.py --formats pdf,xlsx,docx --json
+
+The same measurements run as a pytest-benchmark target:
+    pytest tests/benchmarks/test_extractor_benchmark.py --benchmark-only
+"""
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(BENCH_DIR, "..", "..", "backend"))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from receipt_factory import generate_indian_corpus
+
+FORMATS = ["pdf", "png", "jpg", "xlsx", "docx"]
+
+
+def load_extractors():
+    """
+    {name: extract(path, file_type) -> (amount, confidence)} for every extractor
+    that imports, and {name: reason} for those that do not. ReceiptExtractor
+    reports no confidence (None).
+    """
+    extractors, unavailable = {}, {}
+
+    try:
+        from app.utils.receipt_extractor import ReceiptExtractor
+
+        def receipt_extractor(path, file_type):
+            amount, _ = ReceiptExtractor.extract_amount(path, file_type)
+            return amount, None
+        extractors["ReceiptExtractor"] = receipt_extractor
+    except Exception as e:
+        unavailable["ReceiptExtractor"] = f"{type(e).__name__}: {e}"
+
+    try:
+        from app.utils.improved_receipt_extractor import ImprovedReceiptExtractor
+
+        def improved_extractor(path, file_type):
+            amount, confidence, _ = ImprovedReceiptExtractor.extract_amount(path, file_type)
+            return amount, confidence
+        extractors["ImprovedReceiptExtractor"] = improved_extractor
+    except Exception as e:
+        unavailable["ImprovedReceiptExtractor"] = f"{type(e).__name__}: {e}"
+
+    # Not a package module anyone imports; load it from its file
+    backup_path = os.path.join(BACKEND_DIR, "app", "utils", "improved_receipt_extractor_backup.py")
+    try:
+        spec = importlib.util.spec_from_file_location("improved_receipt_extractor_backup", backup_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        backup = module.ImprovedReceiptExtractor
+
+        def backup_extractor(path, file_type):
+            amount, confidence, _ = backup.extract_amount(path, file_type)
+            return amount, confidence
+        extractors["improved_receipt_extractor_backup"] = backup_extractor
+    except (Exception, SyntaxError) as e:
+        unavailable["improved_receipt_extractor_backup"] = f"{type(e).__name__}: {e}"
+
+    return extractors, unavailable
+
+
+def is_correct(amount, expected) -> bool:
+    return amount is not None and abs(float(amount) - expected) < 0.005
+
+
+def run_extractor(extract, receipts):
+    """Extract every receipt once; returns [(amount, confidence, seconds)]"""
+    results = []
+    for receipt in receipts:
+        started = time.perf_counter()
+        try:
+            amount, confidence = extract(receipt["path"], receipt["file_type"])
+        except Exception:
+            amount, confidence = None, "error"
+        results.append((amount, confidence, time.perf_counter() - started))
+    return results
+
+
+def peak_memory(extract, receipts) -> float:
+    """Largest tracemalloc peak (MB) of a single extraction (a separate pass: tracing slows extraction down)"""
+    peak = 0
+    tracemalloc.start()
+    try:
+        for receipt in receipts:
+            tracemalloc.reset_peak()
+            try:
+                extract(receipt["path"], receipt["file_type"])
+            except Exception:
+                pass
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1e6, 2)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def score(receipts, results) -> dict:
+    """Accuracy, misses, calibration and timing for one extractor on one format"""
+    calibration = defaultdict(lambda: {"receipts": 0, "correct": 0})
+    correct = 0
+    for receipt, (amount, confidence, _) in zip(receipts, results):
+        hit = is_correct(amount, receipt["amount"])
+        correct += hit
+        row = calibration[str(confidence)]
+        row["receipts"] += 1
+        row["correct"] += hit
+    seconds = [elapsed for _, _, elapsed in results]
+    return {
+        "receipts": len(receipts),
+        "accuracy": round(correct / len(receipts), 3) if receipts else 0.0,
+        "missed": sum(1 for amount, _, _ in results if amount is None),
+        "calibration": {
+            label: dict(row, accuracy=round(row["correct"] / row["receipts"], 3))
+            for label, row in sorted(calibration.items())
+        },
+        "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 2),
+    }
+
+
+def run_benchmark(corpus, extractors) -> dict:
+    by_format = defaultdict(list)
+    for receipt in corpus:
+        by_format[receipt["file_type"]].append(receipt)
+
+    report = {}
+    for name, extract in extractors.items():
+        report[name] = {}
+        for file_type, receipts in sorted(by_format.items()):
+            # Warm-up (imports, OCR workers) outside the measurement
+            run_extractor(extract, receipts[:1])
+            row = score(receipts, run_extractor(extract, receipts))
+            row["peak_mb"] = peak_memory(extract, receipts)
+            report[name][file_type] = row
+    return report
+
+
+def print_report(report, unavailable, corpus_size):
+    print("\n" + "=" * 78)
+    print(f"  EXTRACTOR BENCHMARK  ({corpus_size} synthetic Indian-format receipts)")
+    print("=" * 78)
+    print(f"  {'extractor':<26} {'format':<6} {'accuracy':>8} {'missed':>7} {'p50 ms':>9} {'p95 ms':>9} {'peak MB':>8}")
+    for name, formats in report.items():
+        for file_type, row in formats.items():
+            print(f"  {name:<26} {file_type:<6} {row['accuracy'] * 100:>7.1f}% {row['missed']:>7} "
+                  f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['peak_mb']:>8}")
+    print("\n  Confidence calibration (accuracy per reported confidence)")
+    for name, formats in report.items():
+        for file_type, row in formats.items():
+            cells = "  ".join(f"{label}: {cal['correct']}/{cal['receipts']}" for label, cal in row["calibration"].items())
+            print(f"  {name:<26} {file_type:<6} {cells}")
+    for name, reason in unavailable.items():
+        print(f"\n  {name} unavailable: {reason}")
+    print("=" * 78 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare receipt extractor accuracy and latency")
+    parser.add_argument("--count", type=int, default=10, help="Receipts per format")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated formats (pdf,png,jpg,xlsx,docx)")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed (same seed, same receipts)")
+    parser.add_argument("--workdir", default=None, help="Directory for the corpus")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="extractor_bench_")
+    corpus = generate_indian_corpus(workdir, args.count * len(formats), formats=formats, seed=args.seed)
+    extractors, unavailable = load_extractors()
+    report = run_benchmark(corpus, extractors)
+
+    if args.json:
+        print(json.dumps({"extractors": report, "unavailable": unavailable}, indent=2))
+    else:
+        print_report(report, unavailable, len(corpus))
+
+
+if __name__ == "__main__":
+    main()
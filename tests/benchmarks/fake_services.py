@@ -0,0 +1,168 @@
+"""
+Local stand-ins for the external services the submit pipeline talks to.
+
+FakeOllamaServer answers POST /api/generate like Ollama does (non-streaming,
+JSON response) after a configurable delay. FakeSMTPServer accepts mail over
+SMTP with STARTTLS and AUTH so app.utils.email.send_email runs its real code
+path; messages are counted and discarded.
+"""
+
+import json
+import os
+import socketserver
+import ssl
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllamaServer:
+    def __init__(self, latency_ms: float = 0.0, decision: str = "allow"):
+        self.latency_ms = latency_ms
+        self.decision = decision
+        self.requests = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                fake.requests += 1
+                if fake.latency_ms:
+                    time.sleep(fake.latency_ms / 1000.0)
+                verdict = {
+                    "decision": fake.decision,
+                    "risk_level": "low",
+                    "reasons": ["Synthetic benchmark receipt"],
+                    "extracted_total_amount_guess": None,
+                }
+                body = json.dumps({"model": "fake", "response": json.dumps(verdict), "done": True}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _self_signed_certificate(directory: str):
+    """Write a throwaway localhost certificate for STARTTLS (cryptography ships with python-jose)"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.utcnow() - timedelta(days=1))
+        .not_valid_after(datetime.utcnow() + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "smtp.crt")
+    key_path = os.path.join(directory, "smtp.key")
+    with open(cert_path, "wb") as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption()
+        ))
+    return cert_path, key_path
+
+
+class FakeSMTPServer:
+    def __init__(self):
+        self.messages = 0
+        self._server = None
+        self._thread = None
+        self._tmpdir = tempfile.mkdtemp(prefix="fake_smtp_")
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "FakeSMTPServer":
+        fake = self
+        cert_path, key_path = _self_signed_certificate(self._tmpdir)
+        tls_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        tls_context.load_cert_chain(cert_path, key_path)
+
+        class Handler(socketserver.StreamRequestHandler):
+            def _reply(self, line: str):
+                self.wfile.write((line + "\r\n").encode())
+                self.wfile.flush()
+
+            def handle(self):
+                self._reply("220 fake-smtp ready")
+                while True:
+                    raw = self.rfile.readline()
+                    if not raw:
+                        return
+                    command = raw.decode(errors="replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.wfile.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250 STARTTLS\r\n")
+                        self.wfile.flush()
+                    elif verb == "STARTTLS":
+                        self._reply("220 ready to start TLS")
+                        self.request = tls_context.wrap_socket(self.request, server_side=True)
+                        self.rfile = self.request.makefile("rb")
+                        self.wfile = self.request.makefile("wb")
+                    elif verb == "AUTH":
+                        self._reply("235 authenticated")
+                    elif verb == "DATA":
+                        self._reply("354 end data with <CR><LF>.<CR><LF>")
+                        while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                            pass
+                        fake.messages += 1
+                        self._reply("250 queued")
+                    elif verb == "QUIT":
+                        self._reply("221 bye")
+                        return
+                    else:
+                        self._reply("250 ok")
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
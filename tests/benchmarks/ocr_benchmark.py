@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+OCR benchmark for photographed receipts.
+
+Generates phone-camera style receipts (12 MP JPEG, tilted receipt on a dark,
+unevenly lit table) with known totals and compares:
+
+  legacy   - pytesseract on the full-size photo, retried on a contrast-enhanced
+             grayscale copy when the first pass finds almost nothing
+  current  - ImprovedReceiptExtractor._extract_image (OCRPreprocessor: reduced
+             JPEG decode, adaptive binarization, deskew, crop, psm 4)
+
+and reports seconds per image and the hit rate (extracted amount == ground
+truth). Without the Tesseract binary only the preprocessing time is reported.
+
+Usage (from the repository root):
+    python tests/benchmarks/ocr_benchmark.py --count 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.abspath(os.path.join(BENCH_DIR, "..", "..", "backend")))
+
+from receipt_factory import generate_corpus
+from app.utils.improved_receipt_extractor import ImprovedReceiptExtractor
+from app.utils.ocr_preprocessor import OCRPreprocessor
+from app.utils.receipt_document import ReceiptDocument
+
+
+def tesseract_available() -> bool:
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def legacy_ocr(path: str):
+    """The extractor's behaviour before preprocessing, kept here as the baseline"""
+    import pytesseract
+    from PIL import Image, ImageEnhance
+
+    image = Image.open(path)
+    text = pytesseract.image_to_string(image)
+    if not text or len(text.strip()) < 10:
+        text = pytesseract.image_to_string(ImageEnhance.Contrast(image.convert("L")).enhance(2))
+    document = ReceiptDocument(path, "jpg")
+    document.pages = [text]
+    document.normalized_text = " ".join(text.split())
+    candidates = ImprovedReceiptExtractor._scan_amounts(document.normalized_text)
+    return ImprovedReceiptExtractor._select_amount(candidates)[0] if candidates else None
+
+
+OCR_LEVELS = Counter()
+
+
+def current_ocr(path: str):
+    document = ImprovedReceiptExtractor.extract_document(path, "jpg")
+    OCR_LEVELS[document.ocr_level] += 1
+    return document.amount
+
+
+def run(label, func, corpus):
+    hits = 0
+    started = time.perf_counter()
+    for receipt in corpus:
+        amount = func(receipt["path"])
+        if amount is not None and abs(amount - receipt["amount"]) < 0.005:
+            hits += 1
+    seconds = (time.perf_counter() - started) / len(corpus)
+    print(f"  {label:<8} {seconds:>8.2f} s/image   hit rate {hits}/{len(corpus)} ({hits / len(corpus) * 100:.0f}%)")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR of photographed receipts")
+    parser.add_argument("--count", type=int, default=6, help="Number of synthetic photos")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--workdir", default=None)
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ocr_bench_")
+    corpus = generate_corpus(workdir, args.count, formats=["photo"], seed=args.seed)
+    print(f"\n  {len(corpus)} photos in {workdir}")
+
+    started = time.perf_counter()
+    for receipt in corpus:
+        prepared, _ = OCRPreprocessor.prepare(receipt["path"])
+    print(f"  preprocessing {(time.perf_counter() - started) / len(corpus):.2f} s/image "
+          f"(last prepared size {prepared.size[0]}x{prepared.size[1]})")
+
+    if not tesseract_available():
+        print("  Tesseract not installed: OCR timings and hit rates skipped\n")
+        return
+    legacy = run("legacy", legacy_ocr, corpus)
+    current = run("current", current_ocr, corpus)
+    print(f"  speedup {legacy / current:.1f}x")
+    print(f"  adaptive OCR passes kept: {dict(OCR_LEVELS)}\n")
+
+
+if __name__ == "__main__":
+    main()
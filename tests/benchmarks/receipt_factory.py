@@ -0,0 +1,378 @@
+"""
+Synthetic receipts with known ground-truth amounts.
+
+Generates PDF, JPEG/PNG, XLSX and DOCX receipts (and "photo" JPEGs: a tilted
+receipt photographed on a table at 12 MP) that look like the bills the
+extractor sees in practice (vendor, date, invoice number, GSTIN, line items
+and a "Bill Total Rs. ..." line). Every receipt is unique (invoice number,
+items and total differ), so the duplicate checks do not reject them.
+
+generate_indian_corpus() makes harder, GST-style invoices in Indian formats:
+₹/Rs./INR amounts with lakh grouping (1,23,456.78), item rows, subtotal and
+CGST/SGST lines, and a UPI ID and 12-digit UPI reference as distractors.
+
+Only the standard library is needed for PDFs; images need Pillow, XLSX needs
+openpyxl and DOCX needs python-docx (all backend requirements).
+"""
+
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+VENDORS = [
+    "Cafe Coffee Day Restaurant",
+    "Hotel Grand Palace",
+    "Saravana Bhavan Restaurant",
+    "Blue Dart Courier Services",
+    "Reliance Digital Store",
+    "Indian Oil Fuel Station",
+    "Meru Cabs Travel",
+]
+
+ITEMS = ["Coffee", "Lunch buffet", "Dinner", "Room service", "Snacks", "Taxi fare", "Parking", "Printing"]
+
+FORMATS = ["pdf", "jpg", "png", "photo", "xlsx", "docx"]
+
+CURRENCIES = ["₹", "Rs.", "INR"]
+TOTAL_LABELS = ["Grand Total", "Total Amount", "Net Amount", "Amount Paid", "Bill Amount"]
+UPI_HANDLES = ["okaxis", "okicici", "oksbi", "ybl", "paytm"]
+
+
+def format_inr(amount: float) -> str:
+    """Indian digit grouping: 1234567.5 -> 12,34,567.50"""
+    whole, fraction = f"{amount:.2f}".split(".")
+    if len(whole) > 3:
+        head, groups = whole[:-3], [whole[-3:]]
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        whole = ",".join([head] + groups)
+    return f"{whole}.{fraction}"
+
+
+def _split_amount(rng: random.Random, amount: float, count: int) -> List[float]:
+    """count positive prices (2 decimals) that add up to amount"""
+    weights = [rng.uniform(1, 3) for _ in range(count)]
+    total_weight = sum(weights)
+    prices = []
+    remaining = round(amount, 2)
+    for i, weight in enumerate(weights):
+        price = remaining if i == count - 1 else round(amount * weight / total_weight, 2)
+        remaining = round(remaining - price, 2)
+        prices.append(price)
+    return prices
+
+
+def _receipt_lines(rng: random.Random, amount: float, invoice_no: int, receipt_date: date) -> Dict:
+    """Receipt content with line items that add up to amount"""
+    items = [(rng.choice(ITEMS), price) for price in _split_amount(rng, amount, rng.randint(1, 4))]
+    return {
+        "vendor": rng.choice(VENDORS),
+        "date": receipt_date.strftime("%d/%m/%Y"),
+        "invoice": f"INV-{invoice_no:06d}",
+        "gstin": "29ABCDE1234F1Z5",
+        "phone": f"98{rng.randint(10000000, 99999999)}",
+        "items": items,
+        "total": amount,
+    }
+
+
+def _text_lines(content: Dict) -> List[str]:
+    lines = [
+        content["vendor"],
+        f"Date: {content['date']}",
+        f"Invoice No: {content['invoice']}",
+        f"GSTIN: {content['gstin']}",
+        f"Phone: {content['phone']}",
+    ]
+    lines += [f"{name} Rs. {price:.2f}" for name, price in content["items"]]
+    lines.append(f"Bill Total Rs. {content['total']:.2f}")
+    lines.append("Thank you for your visit")
+    return lines
+
+
+def _indian_receipt(rng: random.Random, amount: float, invoice_no: int, receipt_date: date, ascii_only: bool) -> Dict:
+    """
+    GST invoice content: header lines, table rows (items, subtotal, CGST/SGST,
+    total) and footer lines with UPI distractors. ascii_only avoids ₹ (the
+    generated PDFs use a Latin-1 font).
+    """
+    currency = rng.choice(CURRENCIES[1:] if ascii_only else CURRENCIES)
+
+    def money(value: float) -> str:
+        return f"₹{format_inr(value)}" if currency == "₹" else f"{currency} {format_inr(value)}"
+
+    gst_rate = rng.choice([5, 12, 18])
+    subtotal = round(amount / (1 + gst_rate / 100), 2)
+    cgst = round((amount - subtotal) / 2, 2)
+    sgst = round(amount - subtotal - cgst, 2)
+    vendor = rng.choice(VENDORS)
+
+    rows = [["Item", "Qty", "Amount"]]
+    for price in _split_amount(rng, subtotal, rng.randint(2, 6)):
+        rows.append([rng.choice(ITEMS), str(rng.randint(1, 3)), money(price)])
+    rows += [
+        ["Sub Total", "", money(subtotal)],
+        [f"CGST @ {gst_rate / 2:g}%", "", money(cgst)],
+        [f"SGST @ {gst_rate / 2:g}%", "", money(sgst)],
+        [rng.choice(TOTAL_LABELS), "", money(amount)],
+    ]
+    return {
+        "header": [
+            vendor,
+            f"GSTIN: 29ABCDE{rng.randint(1000, 9999)}F1Z5",
+            f"Invoice No: INV-{invoice_no:06d}",
+            f"Date: {receipt_date.strftime('%d/%m/%Y')}",
+            f"Phone: +91 98{rng.randint(10000000, 99999999)}",
+        ],
+        "rows": rows,
+        "footer": [
+            f"Paid via UPI: {vendor.split()[0].lower()}{rng.randint(10, 99)}@{rng.choice(UPI_HANDLES)}",
+            f"UPI Ref No: {rng.randint(10 ** 11, 10 ** 12 - 1)}",
+            "Thank you, visit again",
+        ],
+        "invoice": f"INV-{invoice_no:06d}",
+    }
+
+
+def _indian_text_lines(content: Dict) -> List[str]:
+    return content["header"] + ["  ".join(cell for cell in row if cell) for row in content["rows"]] + content["footer"]
+
+
+def write_pdf(lines: List[str], path: str):
+    """Minimal single-page text PDF (Helvetica), readable by pdfplumber"""
+    def escape(line: str) -> str:
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    stream = ("BT /F1 11 Tf 50 780 Td 14 TL\n"
+              + "".join(f"({escape(line)}) Tj T*\n" for line in lines)
+              + "ET").encode("latin-1")
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [4 0 R] /Count 1 >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        4: b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 5 0 R "
+           b"/Resources << /Font << /F1 3 0 R >> >> >>",
+        5: b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    }
+    out = b"%PDF-1.4\n"
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for number in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_image(lines: List[str], path: str):
+    """Black-on-white receipt image sized for Tesseract"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 28)
+    except OSError:
+        font = ImageFont.load_default()
+    image = Image.new("RGB", (900, 60 + 44 * len(lines)), "white")
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((40, 30 + 44 * i), line, fill="black", font=font)
+    image.save(path)
+
+
+def write_photo(lines: List[str], path: str, rng: random.Random):
+    """Phone-camera style JPEG: the receipt tilted a few degrees on a dark, unevenly lit table at 4000x3000"""
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 64)
+    except OSError:
+        font = ImageFont.load_default()
+    receipt = Image.new("L", (1500, 160 + 96 * len(lines)), 235)
+    draw = ImageDraw.Draw(receipt)
+    for i, line in enumerate(lines):
+        draw.text((90, 80 + 96 * i), line, fill=30, font=font)
+    receipt = receipt.rotate(rng.uniform(-6, 6), resample=Image.Resampling.BICUBIC, expand=True, fillcolor=0)
+    mask = receipt.point(lambda value: 255 if value > 0 else 0)
+
+    table = Image.linear_gradient("L").resize((4000, 3000)).point(lambda value: 40 + value // 4)
+    table.paste(receipt, (rng.randint(200, 4000 - receipt.width - 200) if receipt.width < 3600 else 0,
+                          rng.randint(0, max(0, 3000 - receipt.height))), mask)
+    noise = Image.effect_noise((4000, 3000), 12)
+    photo = Image.blend(table, noise, 0.08).filter(ImageFilter.GaussianBlur(1.2))
+    photo.convert("RGB").save(path, "JPEG", quality=85)
+
+
+def write_xlsx(content: Dict, path: str):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Receipt"
+    for line in _text_lines(content)[:5]:
+        sheet.append([line])
+    sheet.append(["Item", "Amount"])
+    for name, price in content["items"]:
+        sheet.append([name, f"Rs. {price:.2f}"])
+    sheet.append(["Bill Total", f"Rs. {content['total']:.2f}"])
+    workbook.save(path)
+
+
+def write_xlsx_rows(content: Dict, path: str):
+    """Indian invoice as a sheet: header cells, the item/tax/total table, footer cells"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Invoice"
+    for line in content["header"]:
+        sheet.append([line])
+    for row in content["rows"]:
+        sheet.append(row)
+    for line in content["footer"]:
+        sheet.append([line])
+    workbook.save(path)
+
+
+def write_docx_table(content: Dict, path: str):
+    """Indian invoice as a Word document with the item/tax/total rows in a table"""
+    from docx import Document
+
+    document = Document()
+    for line in content["header"]:
+        document.add_paragraph(line)
+    table = document.add_table(rows=0, cols=3)
+    for row in content["rows"]:
+        cells = table.add_row().cells
+        for cell, value in zip(cells, row):
+            cell.text = value
+    for line in content["footer"]:
+        document.add_paragraph(line)
+    document.save(path)
+
+
+def write_docx(content: Dict, path: str):
+    from docx import Document
+
+    document = Document()
+    for line in _text_lines(content):
+        document.add_paragraph(line)
+    document.save(path)
+
+
+def make_receipt(
+    directory: str,
+    file_type: str,
+    amount: float,
+    invoice_no: int,
+    receipt_date: Optional[date] = None,
+    rng: Optional[random.Random] = None
+) -> Dict:
+    """
+    Write one receipt and return {path, file_type, amount, invoice, date}.
+    "photo" receipts are written as .jpg and reported with file_type "jpg".
+    """
+    rng = rng or random.Random(invoice_no)
+    receipt_date = receipt_date or date.today()
+    content = _receipt_lines(rng, amount, invoice_no, receipt_date)
+    extension = "jpg" if file_type == "photo" else file_type
+    path = os.path.join(directory, f"receipt_{invoice_no:06d}.{extension}")
+
+    if file_type == "pdf":
+        write_pdf(_text_lines(content), path)
+    elif file_type in ("jpg", "jpeg", "png"):
+        write_image(_text_lines(content), path)
+    elif file_type == "photo":
+        write_photo(_text_lines(content), path, rng)
+    elif file_type == "xlsx":
+        write_xlsx(content, path)
+    elif file_type == "docx":
+        write_docx(content, path)
+    else:
+        raise ValueError(f"Unsupported synthetic receipt type: {file_type}")
+
+    return {
+        "path": path,
+        "file_type": extension,
+        "amount": amount,
+        "invoice": content["invoice"],
+        "date": receipt_date.isoformat(),
+    }
+
+
+def generate_corpus(
+    directory: str,
+    count: int,
+    formats: List[str] = None,
+    seed: int = 42,
+    min_amount: float = 600.0,
+    max_amount: float = 4500.0
+) -> List[Dict]:
+    """
+    Generate count receipts cycling through formats, with amounts in a range the
+    cross-check accepts for every category. Deterministic for a given seed.
+    """
+    formats = formats or ["pdf", "jpg", "xlsx"]
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        amount = round(rng.uniform(min_amount, max_amount), 2)
+        receipt_date = date.today() - timedelta(days=rng.randint(0, 5))
+        corpus.append(make_receipt(
+            directory,
+            formats[i % len(formats)],
+            amount,
+            invoice_no=seed * 100000 + i,
+            receipt_date=receipt_date,
+            rng=rng
+        ))
+    return corpus
+
+
+def make_indian_receipt(directory: str, file_type: str, amount: float, invoice_no: int,
+                        receipt_date: date, rng: random.Random) -> Dict:
+    """Write one GST-style Indian receipt (pdf, jpg, jpeg, png, xlsx or docx); same return shape as make_receipt"""
+    content = _indian_receipt(rng, amount, invoice_no, receipt_date, ascii_only=(file_type == "pdf"))
+    path = os.path.join(directory, f"invoice_{invoice_no:06d}.{file_type}")
+
+    if file_type == "pdf":
+        write_pdf(_indian_text_lines(content), path)
+    elif file_type in ("jpg", "jpeg", "png"):
+        write_image(_indian_text_lines(content), path)
+    elif file_type == "xlsx":
+        write_xlsx_rows(content, path)
+    elif file_type == "docx":
+        write_docx_table(content, path)
+    else:
+        raise ValueError(f"Unsupported synthetic receipt type: {file_type}")
+
+    return {
+        "path": path,
+        "file_type": file_type,
+        "amount": amount,
+        "invoice": content["invoice"],
+        "date": receipt_date.isoformat(),
+    }
+
+
+def generate_indian_corpus(directory: str, count: int, formats: List[str] = None, seed: int = 42) -> List[Dict]:
+    """
+    count GST-style receipts cycling through formats, with totals spread
+    log-uniformly from ₹100 to ₹9,00,000 so lakh grouping shows up. Deterministic for a given seed.
+    """
+    formats = formats or ["pdf", "png", "jpg", "xlsx", "docx"]
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        amount = round(10 ** rng.uniform(2, 5.95), 2)
+        receipt_date = date.today() - timedelta(days=rng.randint(0, 5))
+        corpus.append(make_indian_receipt(directory, formats[i % len(formats)], amount,
+                                          invoice_no=seed * 100000 + i, receipt_date=receipt_date, rng=rng))
+    return corpus
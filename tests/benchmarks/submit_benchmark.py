@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for POST /api/expenses/submit.
+
+Runs the FastAPI app in-process (httpx ASGI transport) on a throwaway SQLite
+database, with a fake Ollama server and a fake SMTP sink, and submits
+synthetic receipts with known totals at a given concurrency.
+
+Reports throughput, client-side latency percentiles, status codes, extraction
+accuracy per file type (extracted amount == ground truth) and the server's
+per-stage latency breakdown (StageMetrics).
+
+Usage (from the repository root):
+    python tests/benchmarks/submit_benchmark.py --requests 60 --concurrency 8
+    python tests/benchmarks/submit_benchmark.py --formats pdf,xlsx --ollama-latency-ms 800 --json
+
+No live backend, MySQL, Ollama or mail server is needed. Image receipts are
+only read correctly when Tesseract is installed; otherwise they show up as
+extraction misses, which is itself worth knowing.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, "..", "..", "backend")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+from fake_services import FakeOllamaServer, FakeSMTPServer
+from receipt_factory import generate_corpus
+
+CATEGORIES = [
+    (1, "Travel"), (2, "Food"), (3, "Accommodation"), (4, "Office Supplies"), (5, "Communication"),
+    (6, "Miscellaneous"), (7, "Equipment"), (8, "Meals"), (9, "Other"), (10, "Fuel"),
+]
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def configure_environment(workdir: str, ollama: FakeOllamaServer, smtp: FakeSMTPServer, use_ollama: bool):
+    """Point the app at the local stand-ins; must run before `app` is imported"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["OLLAMA_ENABLED"] = "True" if use_ollama else "False"
+    os.environ["OLLAMA_URL"] = ollama.url
+    os.environ["SMTP_SERVER"] = "127.0.0.1"
+    os.environ["SMTP_PORT"] = str(smtp.port)
+    os.environ["SMTP_EMAIL"] = "bench@example.com"
+    os.environ["SMTP_PASSWORD"] = "bench"
+
+
+def seed_database():
+    """Create tables, roles, categories, an employee and a manager; return the employee's token"""
+    from app.database import Base, engine, SessionLocal
+    from app.models import User, Role, ExpenseCategory
+    from app.utils.security import create_access_token
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for role_id, name in enumerate(["EMPLOYEE", "MANAGER", "FINANCE", "HR", "ADMIN"], 1):
+            db.add(Role(id=role_id, role_name=name, description=name.title()))
+        for category_id, name in CATEGORIES:
+            db.add(ExpenseCategory(id=category_id, name=name))
+        employee = User(first_name="Bench", last_name="Employee", email="employee@example.com",
+                        password="x", employee_id="BENCH-E1", role_id=1, is_active=True, is_verified=True)
+        manager = User(first_name="Bench", last_name="Manager", email="manager@example.com",
+                       password="x", employee_id="BENCH-M1", role_id=2, is_active=True, is_verified=True)
+        db.add_all([employee, manager])
+        db.commit()
+        return create_access_token({"sub": str(employee.id)})
+    finally:
+        db.close()
+
+
+async def run_load(app, token: str, corpus, concurrency: int, category: str):
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300.0,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+
+        async def submit(receipt):
+            with open(receipt["path"], "rb") as f:
+                content = f.read()
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/expenses/submit",
+                    data={
+                        "category": category,
+                        "description": f"Benchmark receipt {receipt['invoice']}",
+                        "date": receipt["date"],
+                    },
+                    files={"receipt": (os.path.basename(receipt["path"]), content,
+                                       CONTENT_TYPES.get(receipt["file_type"], "application/octet-stream"))},
+                )
+                elapsed = time.perf_counter() - started
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+            extracted = body.get("amount") if response.status_code == 200 else None
+            results.append({
+                "file_type": receipt["file_type"],
+                "status": response.status_code,
+                "latency": elapsed,
+                "expected": receipt["amount"],
+                "extracted": extracted,
+                "correct": extracted is not None and abs(float(extracted) - receipt["amount"]) < 0.005,
+            })
+
+        started = time.perf_counter()
+        await asyncio.gather(*(submit(receipt) for receipt in corpus))
+        wall = time.perf_counter() - started
+    return results, wall
+
+
+def summarize(results, wall, concurrency, ollama, smtp):
+    from app.utils.stage_metrics import StageMetrics
+
+    latencies = [r["latency"] for r in results]
+    by_type = defaultdict(list)
+    for r in results:
+        by_type[r["file_type"]].append(r)
+
+    return {
+        "requests": len(results),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(len(results) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1) if latencies else 0.0,
+        },
+        "status_codes": dict(Counter(r["status"] for r in results)),
+        "extraction_accuracy": {
+            file_type: {
+                "correct": sum(1 for r in rows if r["correct"]),
+                "rejected": sum(1 for r in rows if r["status"] != 200),
+                "total": len(rows),
+                "accuracy": round(sum(1 for r in rows if r["correct"]) / len(rows), 3),
+            }
+            for file_type, rows in sorted(by_type.items())
+        },
+        "ollama_requests": ollama.requests,
+        "emails_sent": smtp.messages,
+        "stages": StageMetrics.snapshot()["stages"],
+    }
+
+
+def print_report(report):
+    print("\n" + "=" * 72)
+    print(f"  SUBMIT BENCHMARK  ({report['requests']} requests, concurrency {report['concurrency']})")
+    print("=" * 72)
+    print(f"  Throughput: {report['requests_per_second']} req/s over {report['wall_seconds']}s")
+    latency = report["latency_ms"]
+    print(f"  Latency:    p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  max {latency['max']}ms")
+    print(f"  Status:     {report['status_codes']}")
+    print(f"  Ollama calls: {report['ollama_requests']}   Emails: {report['emails_sent']}")
+    print("\n  Extraction accuracy")
+    for file_type, row in report["extraction_accuracy"].items():
+        print(f"    {file_type:<6} {row['correct']:>4}/{row['total']:<4} {row['accuracy'] * 100:.1f}%"
+              f"   (rejected {row['rejected']})")
+    print("\n  Server stages (p50 / p95 / p99 ms)")
+    for stage, labels in report["stages"].items():
+        for label, row in labels.items():
+            print(f"    {stage:<13} {label:<14} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}  (n={row['count']})")
+    print("=" * 72 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/expenses/submit in-process")
+    parser.add_argument("--requests", type=int, default=30, help="Number of submissions")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent submissions")
+    parser.add_argument("--formats", default="pdf,jpg,xlsx", help="Comma-separated receipt types (pdf,jpg,png,photo,xlsx,docx)")
+    parser.add_argument("--category", default="Meals", help="Expense category for every submission")
+    parser.add_argument("--ollama-latency-ms", type=float, default=200.0, help="Simulated Ollama response time")
+    parser.add_argument("--no-ollama", action="store_true", help="Run with OLLAMA_ENABLED=False")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed (same seed, same receipts)")
+    parser.add_argument("--workdir", default=None, help="Directory for the database, uploads and corpus")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="submit_bench_")
+    ollama = FakeOllamaServer(latency_ms=args.ollama_latency_ms).start()
+    smtp = FakeSMTPServer().start()
+    try:
+        configure_environment(workdir, ollama, smtp, use_ollama=not args.no_ollama)
+
+        from app.config import settings
+        settings.UPLOAD_DIR = os.path.join(workdir, "bills")
+        from app.main import app
+        from app.utils.cpu_executor import CPUExecutor
+
+        token = seed_database()
+        corpus = generate_corpus(
+            os.path.join(workdir, "corpus"),
+            args.requests,
+            formats=[f.strip() for f in args.formats.split(",") if f.strip()],
+            seed=args.seed
+        )
+
+        results, wall = asyncio.run(run_load(app, token, corpus, args.concurrency, args.category))
+        report = summarize(results, wall, args.concurrency, ollama, smtp)
+        CPUExecutor.shutdown()
+    finally:
+        ollama.stop()
+        smtp.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+pytest-benchmark target for the receipt extractors (see extractor_benchmark.py).
+
+Times each available extractor on each format of the synthetic Indian-format
+corpus; accuracy, misses, calibration and peak memory are attached to the
+benchmark's extra_info. Runs offline.
+
+Run:
+    pytest tests/benchmarks/test_extractor_benchmark.py --benchmark-only
+    pytest tests/benchmarks/test_extractor_benchmark.py --benchmark-only --benchmark-json=extractors.json
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from extractor_benchmark import FORMATS, generate_indian_corpus, load_extractors, peak_memory, run_extractor, score
+
+RECEIPTS_PER_FORMAT = 10
+EXTRACTORS, UNAVAILABLE = load_extractors()
+
+
+@pytest.fixture(scope="session")
+def indian_corpus(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("indian_receipts")
+    return generate_indian_corpus(str(directory), RECEIPTS_PER_FORMAT * len(FORMATS), formats=FORMATS, seed=42)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("file_type", FORMATS)
+@pytest.mark.parametrize("extractor", sorted(EXTRACTORS))
+def test_extractor(benchmark, indian_corpus, extractor, file_type):
+    extract = EXTRACTORS[extractor]
+    receipts = [receipt for receipt in indian_corpus if receipt["file_type"] == file_type]
+    run_extractor(extract, receipts[:1])
+
+    benchmark.group = file_type
+    results = benchmark.pedantic(run_extractor, args=(extract, receipts), rounds=3, iterations=1)
+
+    benchmark.extra_info.update(score(receipts, results))
+    benchmark.extra_info["peak_mb"] = peak_memory(extract, receipts)
+
+
+@pytest.mark.parametrize("file_type", ["pdf", "xlsx", "docx"])
+def test_improved_extractor_reads_text_formats(indian_corpus, file_type):
+    """Ground truth sanity check: text-layer receipts need no OCR and should all be read"""
+    receipts = [receipt for receipt in indian_corpus if receipt["file_type"] == file_type]
+    results = run_extractor(EXTRACTORS["ImprovedReceiptExtractor"], receipts)
+    assert score(receipts, results)["accuracy"] == 1.0
@@ -1,3 +1,5 @@
+import os
+import sys
 import pytest
 import requests
 import random
@@ -6,6 +8,7 @@ from datetime import datetime
 
 BASE_URL = "http://localhost:8000/api"
 HEALTH_URL = "http://localhost:8000/health"
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
 
 def generate_random_email():
     timestamp = int(datetime.now().timestamp())
@@ -148,3 +151,32 @@ def test_expense(test_user, api_client):
 
     # Cleanup: optionally delete expense
     # For now, we leave expenses in DB for audit
+
+@pytest.fixture
+def backend_db():
+    """Session on a throwaway in-memory SQLite database for offline service tests (no backend server)"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    from app import models  # noqa: F401 - registers the tables
+    from app.services.minhash_index_service import MinHashIndexService
+    from app.services.image_hash_index_service import ImageHashIndexService
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    # The duplicate indexes are process-wide; start each test from empty ones
+    MinHashIndexService._buckets.clear()
+    MinHashIndexService._signatures.clear()
+    MinHashIndexService._last_id = 0
+    ImageHashIndexService._root = None
+    ImageHashIndexService._size = 0
+    ImageHashIndexService._last_id = 0
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,87 @@
+"""
+Cross-employee duplicate detection (ExpenseCrossCheckService) on an in-memory
+database; no backend server is needed.
+"""
+
+from datetime import date
+
+import pytest
+
+pytest.importorskip("numpy")
+
+HOTEL_TERMS = """Terms and conditions: Check-in time is 12:00 noon and check-out time is 11:00 am.
+Late check-out is subject to availability and will be charged at 50% of the room tariff.
+All disputes are subject to Mumbai jurisdiction only. Tariff is inclusive of applicable GST.
+Please retain this invoice for your records. Thank you for staying with us at Hotel Sea Breeze.
+Hotel Sea Breeze Pvt Ltd, 14 Marine Drive, Mumbai 400020. GSTIN 27AABCS1234F1Z5.
+Cancellations within 24 hours of arrival are charged one night's tariff. Pets are not allowed.
+Smoking inside the rooms attracts a cleaning fee of Rs 5,000. Breakfast is served 7 to 10 am."""
+
+
+def hotel_invoice(number, guest, nights, rate, invoice_date):
+    """Invoice text on Hotel Sea Breeze's template; returns (text, grand total)"""
+    room = nights * rate
+    gst = round(room * 0.12, 2)
+    text = (
+        f"HOTEL SEA BREEZE - TAX INVOICE\n"
+        f"Invoice No: {number}  Date: {invoice_date.strftime('%d/%m/%Y')}\n"
+        f"Guest: {guest}  Room nights: {nights} x Rs {rate:,.2f}\n"
+        f"Room charges: Rs {room:,.2f}\n"
+        f"GST 12%: Rs {gst:,.2f}\n"
+        f"Grand Total: Rs {room + gst:,.2f}\n"
+        f"{HOTEL_TERMS}"
+    )
+    return text, room + gst
+
+
+def store_expense(db, user_id, text, amount, expense_date):
+    from app.models.expense import Expense
+    from app.utils.text_minhash import TextMinHash
+
+    expense = Expense(user_id=user_id, category_id=3, amount=amount, expense_date=expense_date,
+                      description="Hotel stay", text_minhash=TextMinHash.signature(text))
+    db.add(expense)
+    db.commit()
+    return expense
+
+
+def cross_check(db, user_id, text, amount, expense_date):
+    from app.services.expense_cross_check_service import ExpenseCrossCheckService
+    from app.utils.receipt_document import ReceiptDocument
+
+    document = ReceiptDocument.from_dict("invoice.txt", {"file_type": "txt", "file_hash": "0" * 64, "pages": [text]})
+    return ExpenseCrossCheckService().cross_check_expense(
+        "invoice.txt", text, amount, "Accommodation", "Hotel stay", expense_date.isoformat(), user_id, db,
+        document=document
+    )
+
+
+@pytest.mark.unit
+def test_templated_invoices_from_one_vendor_are_not_duplicates(backend_db):
+    from app.utils.text_minhash import TextMinHash
+
+    first_text, first_total = hotel_invoice("SB-10231", "Priya Nair", 2, 4500, date(2025, 3, 12))
+    second_text, second_total = hotel_invoice("SB-10388", "Rahul Mehta", 3, 5200, date(2025, 3, 15))
+    # Shared terms and address put the two bills above the rejection threshold on text alone
+    assert TextMinHash.similarity(TextMinHash.signature(first_text), TextMinHash.signature(second_text)) >= 0.85
+
+    existing = store_expense(backend_db, 1, first_text, first_total, date(2025, 3, 12))
+    results = cross_check(backend_db, 2, second_text, second_total, date(2025, 3, 15))
+
+    assert results["duplicate_matches"] == []
+    assert [match["expense_id"] for match in results["review_matches"]] == [existing.id]
+    assert results["review_flags"] == ["SIMILAR_RECEIPT_TEXT"]
+
+
+@pytest.mark.unit
+def test_colleague_resubmitting_the_same_bill_is_a_duplicate(backend_db):
+    text, total = hotel_invoice("SB-10231", "Priya Nair", 2, 4500, date(2025, 3, 12))
+    existing = store_expense(backend_db, 1, text, total, date(2025, 3, 12))
+
+    # The same paper bill scanned again, with a few characters read differently
+    rescanned = text.replace("Priya Nair", "Priya Nalr").replace("SB-10231", "SB-1O231")
+    results = cross_check(backend_db, 2, rescanned, total, date(2025, 3, 12))
+
+    near_duplicates = [match for match in results["duplicate_matches"] if match["similarity_type"] == "near_duplicate_text"]
+    assert [match["expense_id"] for match in near_duplicates] == [existing.id]
+    assert not results["is_approved"]
@@ -2,6 +2,7 @@ import pytest
 import requests
 import tempfile
 import os
+import hashlib
 from datetime import datetime
 
 BASE_URL = "http://localhost:8000/api"
@@ -153,3 +154,16 @@ def test_multiple_files_same_expense(api_client, test_user):
     assert len(attachments) >= len(files_uploaded)
     for name in files_uploaded:
         assert any(att.get("file_name") == name for att in attachments)
+
+def test_receipt_hash_precheck(api_client, test_user):
+    """Test the receipt hash precheck for unknown and malformed digests"""
+    unknown_hash = hashlib.sha256(f"never uploaded {datetime.now().timestamp()}".encode()).hexdigest()
+
+    response = api_client.get(f"{BASE_URL}/receipts/by-hash/{unknown_hash}")
+    assert response.status_code == 404
+
+    response = api_client.head(f"{BASE_URL}/receipts/by-hash/{unknown_hash}")
+    assert response.status_code == 404
+
+    response = api_client.get(f"{BASE_URL}/receipts/by-hash/not-a-digest")
+    assert response.status_code == 400
@@ -114,3 +114,64 @@ def test_expense_date_validation(api_client, test_user):
     response = api_client.post(f"{BASE_URL}/expenses/submit", data=expense_payload)
     assert response.status_code == 400
     assert "cannot be in the future" in response.text
+
+def test_async_submit_job_status(api_client, test_user):
+    """Test that async_mode returns 202 with a job id that can be polled to completion"""
+    import time
+
+    expense_payload = {
+        "category": "Travel",
+        "description": "Async submission test",
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "amount": "130.00",
+        "async_mode": "true"
+    }
+    response = api_client.post(f"{BASE_URL}/expenses/submit", data=expense_payload)
+    assert response.status_code == 202
+    job_id = response.json().get("job_id")
+    assert job_id is not None
+
+    job = None
+    for _ in range(30):
+        response = api_client.get(f"{BASE_URL}/expenses/jobs/{job_id}")
+        assert response.status_code == 200
+        job = response.json()
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(1)
+
+    assert job["status"] == "completed"
+    assert job["expense"]["id"] is not None
+    assert [s["stage"] for s in job["stages"]][0] == "extraction"
+
+    # Unknown job ids are not found
+    response = api_client.get(f"{BASE_URL}/expenses/jobs/does-not-exist")
+    assert response.status_code == 404
+
+def test_submit_batch(api_client, test_user):
+    """Test that a batch submit saves valid items and reports rejected ones per item"""
+    import json
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    items = [
+        {"category": "Travel", "description": "Batch taxi to client site", "date": today, "amount": "210.00"},
+        {"category": "Food", "description": "Batch team dinner on trip", "date": today, "amount": "340.00"},
+        {"category": "Unknown", "description": "Batch invalid category", "date": today, "amount": "50.00"}
+    ]
+    response = api_client.post(f"{BASE_URL}/expenses/submit-batch", data={"items": json.dumps(items)})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["submitted"] == 2
+    assert data["rejected"] == 1
+    assert [r["status"] for r in data["results"]] == ["accepted", "accepted", "rejected"]
+    assert data["results"][0]["expense"]["id"] is not None
+    assert data["results"][2]["error"]["status_code"] == 400
+
+    # Malformed items payload is rejected as a whole
+    response = api_client.post(f"{BASE_URL}/expenses/submit-batch", data={"items": "not json"})
+    assert response.status_code == 400
+
+def test_pipeline_metrics_admin_only(api_client, test_user):
+    """Test that pipeline latency metrics are restricted to admins"""
+    response = api_client.get(f"{BASE_URL}/admin/metrics/pipeline")
+    assert response.status_code == 403
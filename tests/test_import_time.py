@@ -0,0 +1,68 @@
+"""
+Import-time budget for the backend.
+
+`import app.main` runs in every uvicorn worker and test process, so it must
+stay fast and must not pull in the receipt-parsing libraries, which are only
+loaded on first use (app/utils/lazy_backends.py). Runs in a fresh interpreter;
+no backend server is needed.
+
+The budget defaults to 2.5 seconds; override with IMPORT_TIME_BUDGET_SECONDS
+on slow CI machines.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "2.5"))
+HEAVY_MODULES = ["pdfplumber", "pdfminer", "PIL", "pytesseract", "tesserocr", "openpyxl", "docx", "numpy"]
+
+# Modules the extractor imports on first use; their import must stay light as well
+OCR_MODULES = ["app.utils.ocr_preprocessor", "app.utils.ocr_pool", "app.utils.image_hash"]
+
+IMPORT_SCRIPT = (
+    "import importlib, json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "for name in sys.argv[1:]:\n"
+    "    importlib.import_module(name)\n"
+    "print(json.dumps({'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}))\n"
+)
+
+
+def import_in_fresh_interpreter(*modules):
+    """Seconds and loaded module names of importing modules in a fresh interpreter"""
+    result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT, *modules], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        pytest.skip(f"Backend not importable here: {result.stderr.strip().splitlines()[-1]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def app_import():
+    """Seconds and loaded module names of `import app.main` in a fresh interpreter"""
+    return import_in_fresh_interpreter("app.main")
+
+
+@pytest.mark.unit
+def test_import_app_main_within_budget(app_import):
+    assert app_import["seconds"] < IMPORT_TIME_BUDGET_SECONDS, (
+        f"import app.main took {app_import['seconds']:.2f}s (budget {IMPORT_TIME_BUDGET_SECONDS}s)"
+    )
+
+
+@pytest.mark.unit
+def test_import_app_main_skips_parsing_libraries(app_import):
+    loaded = [name for name in HEAVY_MODULES if name in app_import["modules"]]
+    assert not loaded, f"import app.main loaded {loaded}; import them through LazyBackends on first use"
+
+
+@pytest.mark.unit
+def test_import_ocr_modules_skips_parsing_libraries():
+    modules = import_in_fresh_interpreter(*OCR_MODULES)["modules"]
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    assert not loaded, f"importing {OCR_MODULES} loaded {loaded}; import them through LazyBackends on first use"
@@ -0,0 +1,40 @@
+"""
+Rule-based pre-screen flags (apply_pre_screen_checks); no backend server is needed.
+"""
+
+from datetime import datetime
+
+import pytest
+
+
+def pre_screen(db, **kwargs):
+    from app.models.expense import Expense
+    from app.services.expense_submission_service import apply_pre_screen_checks
+
+    expense = Expense(user_id=1, category_id=1, amount=842.50, expense_date=datetime.utcnow().date())
+    apply_pre_screen_checks(db, expense, commit=False, **kwargs)
+    return expense.ai_analysis
+
+
+@pytest.mark.unit
+def test_readable_receipt_is_not_flagged_for_missing_text(backend_db):
+    analysis = pre_screen(backend_db, has_text=True)
+
+    assert "NO_TEXT_EXTRACTED" not in analysis["flags"]
+    assert analysis["score"] == 100.0
+
+
+@pytest.mark.unit
+def test_unreadable_receipt_is_flagged_for_missing_text(backend_db):
+    analysis = pre_screen(backend_db, has_text=False)
+
+    assert analysis["flags"] == ["NO_TEXT_EXTRACTED"]
+    assert analysis["score"] == 75.0
+
+
+@pytest.mark.unit
+def test_review_flags_are_recorded(backend_db):
+    analysis = pre_screen(backend_db, has_text=True, review_flags=["SIMILAR_RECEIPT_TEXT"])
+
+    assert analysis["flags"] == ["SIMILAR_RECEIPT_TEXT"]
+    assert analysis["recommendation"] == "⚠️ NEEDS REVIEW"
@@ -0,0 +1,66 @@
+"""
+Visibility of GET /api/receipts/by-hash/{sha256} (route called directly on an
+in-memory database); no backend server is needed.
+"""
+
+import asyncio
+import hashlib
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def receipt_owners(backend_db):
+    """Employees alice and bob, a manager, and alice's expense with one receipt; returns (users, file hash)"""
+    from app.models.user import User, Role
+    from app.models.expense import Expense, ExpenseAttachment
+    from app.services.receipt_hash_gate_service import ReceiptHashGateService
+
+    for role_id, name in enumerate(["EMPLOYEE", "MANAGER", "FINANCE", "HR", "ADMIN"], 1):
+        backend_db.add(Role(id=role_id, role_name=name, description=name.title()))
+    users = {}
+    for name, role_id in [("alice", 1), ("bob", 1), ("manager", 2)]:
+        users[name] = User(first_name=name.title(), last_name="Test", email=f"{name}@example.com", password="x",
+                           employee_id=name.upper(), role_id=role_id, is_active=True, is_verified=True)
+    backend_db.add_all(users.values())
+    backend_db.flush()
+
+    file_hash = hashlib.sha256(b"alice's taxi receipt").hexdigest()
+    expense = Expense(user_id=users["alice"].id, category_id=1, amount=420, expense_date=date(2025, 3, 12))
+    backend_db.add(expense)
+    backend_db.flush()
+    backend_db.add(ExpenseAttachment(expense_id=expense.id, file_name="taxi.pdf", file_path="taxi.pdf",
+                                     file_type="pdf", file_size=1, file_hash=file_hash))
+    backend_db.commit()
+
+    ReceiptHashGateService._size_bits = 0
+    ReceiptHashGateService._last_id = 0
+    ReceiptHashGateService._refreshed_at = 0.0
+    return users, file_hash
+
+
+def precheck(db, user, file_hash):
+    from app.routes.receipt import get_receipt_by_hash
+
+    return asyncio.run(get_receipt_by_hash(file_hash, db=db, current_user=user))
+
+
+@pytest.mark.unit
+def test_precheck_reports_own_and_managed_receipts(backend_db, receipt_owners):
+    users, file_hash = receipt_owners
+
+    assert precheck(backend_db, users["alice"], file_hash)["exists"] is True
+    assert precheck(backend_db, users["manager"], file_hash)["exists"] is True
+
+
+@pytest.mark.unit
+def test_precheck_hides_other_employees_receipts(backend_db, receipt_owners):
+    from fastapi import HTTPException
+
+    users, file_hash = receipt_owners
+
+    with pytest.raises(HTTPException) as error:
+        precheck(backend_db, users["bob"], file_hash)
+    assert error.value.status_code == 404
+    assert error.value.detail == "No submitted receipt with this hash"